@@ -4,3 +4,12 @@ from django.apps import AppConfig as DjangoAppConfig
 class AppConfig(DjangoAppConfig):
     name = "intecomm_rando"
     verbose_name = "Intecomm Randomization"
+
+    def ready(self):
+        from .models.signals import (
+            connect_randomize_patient_group_on_post_save,
+            connect_update_group_summary_receivers,
+        )
+
+        connect_randomize_patient_group_on_post_save()
+        connect_update_group_summary_receivers()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import RLock
+from typing import Any
+
+from django.conf import settings
+
+
+def get_assignment_cache_size() -> int:
+    """Returns the max number of entries per lookup in the
+    assignment cache.
+
+    Opt-in. Default is 0 (disabled).
+    """
+    return getattr(settings, "INTECOMM_RANDO_ASSIGNMENT_CACHE_SIZE", 0)
+
+
+class AssignmentCache:
+    """A process-local, bounded LRU cache of subject->assignment
+    and group_identifier->assignment lookups.
+
+    Assignments do not change once a group is randomized. Entries
+    are invalidated by the post_save signals when a group is
+    randomized or its RandomizationList row changes.
+
+    Subject entries are stored as (group_identifier, assignment)
+    so that invalidating a group also invalidates its subjects.
+    """
+
+    def __init__(self, maxsize: int | None = None):
+        self._maxsize = maxsize
+        self._lock = RLock()
+        self._subjects: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._groups: OrderedDict[str, str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return get_assignment_cache_size() if self._maxsize is None else self._maxsize
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get_subject(self, subject_identifier: str) -> tuple[str, str] | None:
+        """Returns (group_identifier, assignment) or None."""
+        return self._get(self._subjects, subject_identifier)
+
+    def set_subject(self, subject_identifier: str, group_identifier: str, assignment: str):
+        self._set(self._subjects, subject_identifier, (group_identifier, assignment))
+
+    def get_group(self, group_identifier: str) -> str | None:
+        return self._get(self._groups, group_identifier)
+
+    def set_group(self, group_identifier: str, assignment: str):
+        self._set(self._groups, group_identifier, assignment)
+
+    def invalidate_subjects(self, subject_identifiers: list[str]) -> None:
+        with self._lock:
+            for subject_identifier in subject_identifiers:
+                self._subjects.pop(subject_identifier, None)
+
+    def invalidate_group(self, group_identifier: str) -> None:
+        with self._lock:
+            self._groups.pop(group_identifier, None)
+            for subject_identifier, (value, _) in list(self._subjects.items()):
+                if value == group_identifier:
+                    del self._subjects[subject_identifier]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._subjects.clear()
+            self._groups.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict[str, int]:
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            maxsize=self.maxsize,
+            subjects=len(self._subjects),
+            groups=len(self._groups),
+        )
+
+    def _get(self, data: OrderedDict, key: str) -> Any:
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                value = data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _set(self, data: OrderedDict, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            data[key] = value
+            data.move_to_end(key)
+            while len(data) > self.maxsize:
+                data.popitem(last=False)
+
+
+assignment_cache = AssignmentCache()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import re
+import time
+from typing import TYPE_CHECKING, Iterator, Type
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Prefetch, QuerySet
+from edc_constants.constants import COMPLETE, UUID_PATTERN, YES
+from edc_randomization.randomizer import RandomizationError
+from edc_sites import site_sites
+
+from .randomize_group import RandomizeGroup, randomize_and_schedule_group
+
+if TYPE_CHECKING:
+    from intecomm_screening.models import PatientGroupRando
+
+
+class BulkRandomizer:
+    """Randomizes all complete groups with `randomize_now=YES` for
+    the given sites, in batches.
+
+    Each group is randomized with the same semantics as the
+    post_save signal (see `randomize_and_schedule_group`). Each
+    batch runs in a transaction and each group in a savepoint
+    so that a failed group is rolled back without affecting the
+    others in the batch.
+
+    Groups and their patients are fetched once per batch.
+    """
+
+    patient_group_model = "intecomm_screening.patientgrouprando"
+    randomize_group_cls = RandomizeGroup
+
+    def __init__(
+        self,
+        site_ids: list[int] | None = None,
+        country: str | None = None,
+        batch_size: int | None = None,
+    ):
+        self.site_ids = list(site_ids or [])
+        if country:
+            self.site_ids.extend(site_sites.get_by_country(country).keys())
+        self.batch_size = batch_size or 50
+        self.randomized: list[str] = []
+        self.failed: dict[str, str] = {}
+        self.elapsed: float = 0.0
+
+    @property
+    def patient_group_model_cls(self) -> Type[PatientGroupRando]:
+        return django_apps.get_model(self.patient_group_model)
+
+    def get_queryset(self) -> QuerySet[PatientGroupRando]:
+        queryset = self.patient_group_model_cls.objects.filter(
+            randomized=False,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            status=COMPLETE,
+        )
+        if self.site_ids:
+            queryset = queryset.filter(site_id__in=self.site_ids)
+        return queryset.order_by("created")
+
+    def batches(self) -> Iterator[list[PatientGroupRando]]:
+        """Yields lists of groups with patients prefetched."""
+        pks = list(self.get_queryset().values_list("pk", flat=True))
+        patient_log_model_cls = self.patient_group_model_cls._meta.get_field(
+            "patients"
+        ).related_model
+        patients = Prefetch(
+            "patients", queryset=patient_log_model_cls.objects.select_related("site")
+        )
+        for i in range(0, len(pks), self.batch_size):
+            yield list(
+                self.patient_group_model_cls.objects.filter(
+                    pk__in=pks[i : i + self.batch_size]
+                )
+                .select_related("site")
+                .prefetch_related(patients)
+                .order_by("created")
+            )
+
+    def run(self) -> Iterator[tuple[PatientGroupRando, str | None, float]]:
+        """Yields (group, error message or None, seconds) for each
+        group.
+
+        Results are yielded once their batch is committed, so the
+        caller never runs inside the batch transaction.
+        """
+        start = time.perf_counter()
+        for batch in self.batches():
+            results = []
+            with transaction.atomic():
+                for instance in batch:
+                    group_start = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            self.randomize(instance)
+                    except Exception as e:
+                        error = f"{e.__class__.__name__}: {e}"
+                    else:
+                        error = None
+                    results.append((instance, error, time.perf_counter() - group_start))
+            for instance, error, seconds in results:
+                name = str(instance.group_identifier_as_pk)
+                if error:
+                    self.failed[name] = error
+                else:
+                    self.randomized.append(name)
+                yield instance, error, seconds
+        self.elapsed = time.perf_counter() - start
+
+    def randomize(self, instance: PatientGroupRando) -> None:
+        if not re.match(UUID_PATTERN, str(instance.group_identifier)):
+            raise RandomizationError(
+                "Failed to randomize group. Group identifier is not a uuid. "
+                f"Has this group already been randomized? Got {instance.group_identifier}."
+            )
+        randomize_and_schedule_group(
+            instance,
+            randomize_group_cls=self.randomize_group_cls,
+            skip_get_current_site=True,
+        )
+
+    @property
+    def throughput(self) -> float:
+        """Returns groups randomized per second."""
+        return len(self.randomized) / self.elapsed if self.elapsed else 0.0
@@ -4,3 +4,7 @@ class GroupAlreadyRandomized(Exception):
 
 class GroupRandomizationError(Exception):
     pass
+
+
+class GroupScheduleError(Exception):
+    pass
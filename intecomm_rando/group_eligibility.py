@@ -1,5 +1,16 @@
 from __future__ import annotations
 
+import re
+from hashlib import sha256
+from typing import TYPE_CHECKING, Type
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.utils.html import format_html
+from edc_constants.constants import DM, HIV, HTN, YES
+from edc_protocol.research_protocol_config import ResearchProtocolConfig
 from intecomm_form_validators.utils import (
     PatientGroupMakeupError,
     PatientGroupRatioError,
@@ -7,14 +18,32 @@ from intecomm_form_validators.utils import (
     PatientNotConsentedError,
     PatientNotScreenedError,
     PatientNotStableError,
-    confirm_patient_group_minimum_of_each_condition_or_raise,
-    confirm_patient_group_ratio_or_raise,
-    confirm_patient_group_size_or_raise,
-    confirm_patients_stable_and_screened_and_consented_or_raise,
+    PatientUnwillingToScreenError,
+    get_min_group_size,
 )
 
 from .exceptions import GroupRandomizationError
 
+if TYPE_CHECKING:
+    from .models import GroupSummary
+
+# group makeup and NCD:HIV ratio rules, as applied by the
+# `confirm_patient_group_..._or_raise` validators in
+# intecomm_form_validators.utils
+MIN_HIV_ONLY = 2
+MIN_NCD_ONLY = 4
+MIN_NCD_HIV_RATIO = 2.0
+MAX_NCD_HIV_RATIO = 2.8
+
+
+def get_eligibility_cache_timeout() -> int:
+    """Returns the number of seconds a passed eligibility
+    assessment is cached for form validation.
+
+    Opt-in. Default is 0 (disabled).
+    """
+    return getattr(settings, "INTECOMM_RANDO_ELIGIBILITY_CACHE_TIMEOUT", 0)
+
 
 def assess_group_eligibility(instance, called_by_rando: bool | None = None):
     group_eligibility = GroupEligibility(instance, called_by_rando=called_by_rando)
@@ -22,54 +51,202 @@ def assess_group_eligibility(instance, called_by_rando: bool | None = None):
 
 
 class GroupEligibility:
+    cache_key_prefix = "intecomm_rando:group_eligibility"
+
     def __init__(self, instance, called_by_rando: bool | None = None):
         self.instance = instance
         self.called_by_rando = called_by_rando
 
     def assess(self):
-        self.confirm_patients_stable_and_screened_and_consented_or_raise()
-        self.confirm_patient_group_size_or_raise()
-        self.confirm_patient_group_minimum_of_each_condition_or_raise()
-        self.confirm_patient_group_ratio_or_raise()
+        """Assesses the group using the maintained GroupSummary, if
+        one exists (refreshed first if stale, see
+        `GroupSummaryManager.get_current`), otherwise in a single
+        pass over its patients.
 
-    def confirm_patients_stable_and_screened_and_consented_or_raise(self):
-        try:
-            confirm_patients_stable_and_screened_and_consented_or_raise(
-                patients=self.instance.patients
+        If called by the randomizer, the group is always assessed
+        from its patients; the summary is used for form validation
+        only.
+
+        The checks and exceptions are the same, and raised in the
+        same order, as the `confirm_..._or_raise` validators in
+        intecomm_form_validators.utils.
+
+        If enabled, a passed assessment is cached against a
+        fingerprint of the group's members (see `get_cache_key`).
+        If nothing has changed, e.g. between form submissions, the
+        assessment is not repeated. The cache is not used if
+        called by the randomizer.
+        """
+        cache_key = self.get_cache_key()
+        if cache_key and cache.get(cache_key):
+            return
+        if not self.called_by_rando and (group_summary := self.get_group_summary()):
+            self.assess_from_group_summary(group_summary)
+        else:
+            self.assess_from_patients()
+        if cache_key:
+            cache.set(cache_key, True, timeout=get_eligibility_cache_timeout())
+
+    def get_cache_key(self) -> str | None:
+        """Returns a cache key from a hash of the members' ids,
+        modified datetimes and conditions, the bypass flags and
+        the minimum group size, or None if caching is disabled or
+        if called by the randomizer.
+        """
+        patients = getattr(self.instance, "patients", None)
+        if (
+            self.called_by_rando
+            or not get_eligibility_cache_timeout()
+            or not isinstance(patients, models.Manager)
+        ):
+            return None
+        members = sorted(
+            (str(pk), str(modified), str(condition))
+            for pk, modified, condition in patients.values_list(
+                "id", "modified", "conditions__id"
             )
-        except (PatientNotStableError, PatientNotScreenedError, PatientNotConsentedError) as e:
-            if self.called_by_rando:
-                raise GroupRandomizationError(e)
-            raise
+        )
+        fingerprint = repr(
+            (
+                str(self.instance.pk),
+                self.instance.bypass_group_size_min,
+                self.instance.bypass_group_ratio,
+                get_min_group_size(),
+                members,
+            )
+        )
+        return f"{self.cache_key_prefix}:{sha256(fingerprint.encode()).hexdigest()}"
 
-    def confirm_patient_group_minimum_of_each_condition_or_raise(self):
+    def assess_from_patients(self):
+        """Patients and their conditions are loaded once and
+        all counts are calculated in one walk.
+        """
+        patients = list(self.instance.patients.prefetch_related("conditions"))
+        if not patients:
+            raise PatientGroupSizeError("Patient group has no patients.")
+        hiv_only = 0
+        ncd_only = 0
+        ncd = 0
+        hiv = 0
+        for patient in patients:
+            self.confirm_patient_stable_and_screened_and_consented_or_raise(patient)
+            conditions = [condition.name for condition in patient.conditions.all()]
+            hiv_only += conditions.count(HIV)
+            ncd_only += len([c for c in conditions if c in [DM, HTN]])
+            if len(conditions) == 1:
+                if conditions[0] in [DM, HTN]:
+                    ncd += 1
+                elif conditions[0] == HIV:
+                    hiv += 1
+        self.confirm_group_or_raise(len(patients), hiv_only, ncd_only, ncd, hiv)
+
+    def assess_from_group_summary(self, group_summary: GroupSummary):
+        """Size, makeup and ratio are checked from the summary
+        counts.
+
+        Patients are only walked if the summary shows a patient
+        is not stable, screened and consented (to find the
+        patient for the message).
+        """
+        if not group_summary.size:
+            raise PatientGroupSizeError("Patient group has no patients.")
+        if not group_summary.all_patients_eligible:
+            for patient in self.instance.patients.all():
+                self.confirm_patient_stable_and_screened_and_consented_or_raise(patient)
+        self.confirm_group_or_raise(
+            group_summary.size,
+            group_summary.hiv,
+            group_summary.dm + group_summary.htn,
+            group_summary.ncd_single,
+            group_summary.hiv_single,
+        )
+
+    def get_group_summary(self) -> GroupSummary | None:
+        """Returns the group's GroupSummary, refreshed if stale, or
+        None.
+        """
+        if getattr(self.instance, "group_identifier_as_pk", None) and isinstance(
+            getattr(self.instance, "patients", None), models.Manager
+        ):
+            return self.group_summary_model_cls.objects.get_current(self.instance)
+        return None
+
+    @property
+    def group_summary_model_cls(self) -> Type[GroupSummary]:
+        return django_apps.get_model("intecomm_rando.groupsummary")
+
+    def confirm_group_or_raise(
+        self, size: int, hiv_only: int, ncd_only: int, ncd: int, hiv: int
+    ):
         try:
-            confirm_patient_group_minimum_of_each_condition_or_raise(
-                patients=self.instance.patients,
-            )
-        except PatientGroupMakeupError as e:
+            self.confirm_group_size_or_raise(size)
+            self.confirm_minimum_of_each_condition_or_raise(hiv_only, ncd_only)
+            self.confirm_ratio_or_raise(ncd, hiv)
+        except (PatientGroupSizeError, PatientGroupMakeupError, PatientGroupRatioError) as e:
             if self.called_by_rando:
                 raise GroupRandomizationError(e)
             raise
 
-    def confirm_patient_group_size_or_raise(self):
+    def confirm_patient_stable_and_screened_and_consented_or_raise(self, patient_log):
+        """Single patient version of
+        `confirm_patients_stable_and_screened_and_consented_or_raise`.
+        """
+        link = format_html(
+            f'<a href="{patient_log.get_changelist_url()}?'
+            f'q={str(patient_log.id)}">{patient_log}</a>'
+        )
         try:
-            confirm_patient_group_size_or_raise(
-                bypass_group_size_min=self.instance.bypass_group_size_min,
-                patients=self.instance.patients,
-            )
-        except PatientGroupSizeError as e:
+            if patient_log.stable != YES:
+                raise PatientNotStableError(
+                    format_html(
+                        "Patient is not known to be stable and in-care. "
+                        f"See patient log for {link}."
+                    )
+                )
+            if patient_log.willing_to_screen != YES:
+                raise PatientUnwillingToScreenError(
+                    format_html(f"Patient reported as unwilling to screen. See {link}.")
+                )
+            if not re.match(r"^[A-Z0-9]{8}$", patient_log.screening_identifier):
+                raise PatientNotScreenedError(
+                    format_html(f"Patient has not screened for eligibility. See {link}.")
+                )
+            if not re.match(
+                ResearchProtocolConfig().subject_identifier_pattern,
+                patient_log.subject_identifier,
+            ):
+                raise PatientNotConsentedError(
+                    format_html(f"Patient has not consented. See {link}.")
+                )
+        except (PatientNotStableError, PatientNotScreenedError, PatientNotConsentedError) as e:
             if self.called_by_rando:
                 raise GroupRandomizationError(e)
             raise
 
-    def confirm_patient_group_ratio_or_raise(self):
-        try:
-            confirm_patient_group_ratio_or_raise(
-                patients=self.instance.patients.all(),
-                bypass_group_ratio=self.instance.bypass_group_ratio,
+    def confirm_group_size_or_raise(self, count: int):
+        group_count_min = get_min_group_size()
+        if not self.instance.bypass_group_size_min and count < group_count_min:
+            raise PatientGroupSizeError(
+                f"Patient group must have at least {group_count_min} patients. Got {count}."
             )
-        except PatientGroupRatioError as e:
-            if self.called_by_rando:
-                raise GroupRandomizationError(e)
-            raise
+
+    @staticmethod
+    def confirm_minimum_of_each_condition_or_raise(hiv_only: int, ncd_only: int):
+        if hiv_only < MIN_HIV_ONLY:
+            raise PatientGroupMakeupError(
+                f"Patient group must have at least {MIN_HIV_ONLY} HIV only patients. "
+                f"Got {hiv_only}."
+            )
+        if ncd_only < MIN_NCD_ONLY:
+            raise PatientGroupMakeupError(
+                f"Patient group must have at least {MIN_NCD_ONLY} NCD only patients. "
+                f"Got {ncd_only}."
+            )
+
+    def confirm_ratio_or_raise(self, ncd: int, hiv: int):
+        if not self.instance.bypass_group_ratio:
+            ratio = 0.0 if not ncd or not hiv else ncd / hiv
+            if not (MIN_NCD_HIV_RATIO <= ratio <= MAX_NCD_HIV_RATIO):
+                raise PatientGroupRatioError(
+                    f"Ratio NDC:HIV not met. Expected at least 2:1. Got {ncd}:{hiv}. "
+                )
@@ -1,13 +1,39 @@
+from __future__ import annotations
+
+from threading import Lock
+
 from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import connection, transaction
 from edc_identifier.research_identifier import ResearchIdentifier
 from edc_utils import get_utcnow
 
+# {(name, device_id, site_id): [next sequence number, last sequence number, owner]}
+# owner is None once the reservation is committed
+sequence_blocks: dict[tuple[str, int, int], list] = {}
+sequence_blocks_lock = Lock()
+
+
+def get_group_identifier_block_size() -> int:
+    """Returns the number of sequence numbers reserved at a time
+    in hi/lo mode.
+
+    Opt-in. Default is 0 (disabled).
+    """
+    return getattr(settings, "INTECOMM_RANDO_GROUP_IDENTIFIER_BLOCK_SIZE", 0)
+
 
 class GroupIdentifier(ResearchIdentifier):
     """Create and save unique group identifier.
 
     Creates and updates the RegisteredGroup model with the newly
     created GroupIdentifier.
+
+    In hi/lo mode (see `get_group_identifier_block_size`), a block
+    of sequence numbers is reserved per site in the
+    GroupIdentifierSequence model and handed out from memory.
+    Numbers not used before the process exits are skipped.
+    Do not mix hi/lo and default mode for the same site.
     """
 
     template: str = "{site_id}{sequence}"
@@ -16,6 +42,7 @@ class GroupIdentifier(ResearchIdentifier):
 
     def __init__(self, group_identifier_as_pk=None, **kwargs):
         self.group_identifier_as_pk = group_identifier_as_pk
+        self._sequence_number = None
         super().__init__(**kwargs)
 
     def pre_identifier(self) -> None:
@@ -24,12 +51,93 @@ class GroupIdentifier(ResearchIdentifier):
     def post_identifier(self) -> None:
         """Creates a registered group instance for this
         group identifier.
+
+        The instance is created with the new identifier in one
+        insert (one history record).
         """
         model_cls = django_apps.get_model("intecomm_rando.registeredgroup")
-        obj = model_cls.objects.create(
+        model_cls.objects.create(
             group_identifier_as_pk=self.group_identifier_as_pk,
+            group_identifier=self.identifier,
             site=self.site,
             registration_datetime=get_utcnow(),
         )
-        obj.group_identifier = self.identifier
-        obj.save()
+
+    @property
+    def sequence_number(self) -> int:
+        """Returns the next sequence number to use.
+
+        Evaluated once per instance.
+        """
+        if self._sequence_number is None:
+            if block_size := get_group_identifier_block_size():
+                self._sequence_number = self.get_sequence_number_from_block(block_size)
+            else:
+                self._sequence_number = super().sequence_number
+        return self._sequence_number
+
+    def get_sequence_number_from_block(self, block_size: int) -> int:
+        """Returns the next sequence number from this process's
+        block, reserving a new block if needed.
+
+        A block reserved inside a transaction may only be used by
+        that transaction, and only while the reservation is pending
+        commit (see `is_block_usable`). If the transaction, or the
+        savepoint the block was reserved in, is rolled back, so is
+        the reservation, and the block is not used again.
+        """
+        key = (self.label, self.device_id, self.site.pk)
+        with sequence_blocks_lock:
+            block = sequence_blocks.get(key)
+            if not block or block[0] > block[1] or not self.is_block_usable(block):
+                block = [*self.reserve_block(block_size), None]
+                sequence_blocks[key] = block
+                if connection.in_atomic_block:
+
+                    def release():
+                        self.release_block_owner(key, release)
+
+                    block[2] = release
+                    transaction.on_commit(release)
+            sequence_number = block[0]
+            block[0] += 1
+        return sequence_number
+
+    @staticmethod
+    def is_block_usable(block: list) -> bool:
+        """Returns True if the block's reservation is committed or
+        is pending commit in this connection's transaction.
+
+        The owner of an uncommitted block is its on_commit callback.
+        Django discards the callbacks of a rolled back transaction
+        or savepoint, so a rolled back reservation has no pending
+        callback.
+        """
+        owner = block[2]
+        return owner is None or any(item[1] is owner for item in connection.run_on_commit)
+
+    def reserve_block(self, block_size: int) -> tuple[int, int]:
+        """Returns the first and last sequence number of a newly
+        reserved block.
+        """
+        model_cls = django_apps.get_model("intecomm_rando.groupidentifiersequence")
+        with transaction.atomic():
+            obj, _ = model_cls.objects.select_for_update().get_or_create(
+                name=self.label,
+                device_id=self.device_id,
+                site=self.site,
+                defaults=dict(reserved_sequence_number=super().sequence_number - 1),
+            )
+            first = obj.reserved_sequence_number + 1
+            obj.reserved_sequence_number += block_size
+            obj.save(update_fields=["reserved_sequence_number", "modified"])
+        return first, obj.reserved_sequence_number
+
+    @staticmethod
+    def release_block_owner(key: tuple[str, int, int], owner) -> None:
+        """Makes a block available to other transactions once the
+        reservation is committed.
+        """
+        with sequence_blocks_lock:
+            if (block := sequence_blocks.get(key)) and block[2] is owner:
+                block[2] = None
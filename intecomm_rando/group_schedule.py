@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django_audit_fields.models.audit_model_mixin import update_device_fields
+from edc_appointment.constants import NEW_APPT, SCHEDULED_APPT
+from edc_appointment.creators.appointment_creator import (
+    CreateAppointmentDateError,
+    CreateAppointmentError,
+)
+from edc_appointment.utils import (
+    get_appointment_type_model_cls,
+    get_appt_reason_default,
+    get_appt_type_default,
+)
+from edc_consent.exceptions import (
+    ConsentDefinitionNotConfiguredForUpdate,
+    NotConsentedError,
+)
+from edc_consent.site_consents import site_consents
+from edc_facility.exceptions import FacilityError
+from edc_facility.utils import get_facility
+from edc_registration.models import RegisteredSubject
+from edc_sites.site import sites as site_sites
+from edc_sites.utils import get_site_model_cls
+from edc_utils import formatted_date, formatted_datetime, to_utc
+from edc_visit_schedule.constants import ON_SCHEDULE
+from edc_visit_schedule.site_visit_schedules import site_visit_schedules
+from simple_history.exceptions import NotHistoricalModelError
+from simple_history.utils import bulk_create_with_history, get_history_manager_for_model
+
+from .exceptions import GroupScheduleError
+
+if TYPE_CHECKING:
+    from django.contrib.sites.models import Site
+    from edc_appointment.models import AppointmentType
+    from edc_consent.consent_definition import ConsentDefinition
+    from edc_facility.facility import Facility
+    from edc_visit_schedule.visit import Visit
+
+
+class GroupSchedule:
+    """Puts all patients of a newly randomized group on the
+    schedule for the group's assignment.
+
+    All patients in a group share the same onschedule datetime
+    and assignment, so the visit timeline (timepoint and
+    appointment datetimes) is calculated once per site and the
+    onschedule, schedule history and appointment instances are
+    inserted in bulk.
+
+    Before anything is inserted, each patient's consent is
+    checked as in `schedule.put_on_schedule` but with one query
+    per consent definition instead of one per patient.
+
+    The bulk inserts do not call `save` or send `post_save` for
+    the onschedule and appointment instances. The few fields set
+    by those saves and receivers for a new appointment are set
+    here instead (see tests for parity with `put_on_schedule`).
+
+    Patients already on the schedule are passed to
+    `schedule.put_on_schedule` one at a time as before.
+    """
+
+    def __init__(
+        self,
+        subject_identifiers: list[str],
+        onschedule_model: str,
+        onschedule_datetime: datetime,
+        skip_get_current_site: bool | None = None,
+    ):
+        self.subject_identifiers = list(subject_identifiers)
+        self.onschedule_datetime = onschedule_datetime
+        self.skip_get_current_site = skip_get_current_site
+        self.visit_schedule, self.schedule = site_visit_schedules.get_by_onschedule_model(
+            onschedule_model
+        )
+
+    def put_on_schedule(self) -> None:
+        already_on_schedule = list(
+            self.schedule.onschedule_model_cls.objects.filter(
+                subject_identifier__in=self.subject_identifiers
+            ).values_list("subject_identifier", flat=True)
+        )
+        subject_identifiers = [
+            subject_identifier
+            for subject_identifier in self.subject_identifiers
+            if subject_identifier not in already_on_schedule
+        ]
+        sites = self.get_sites(subject_identifiers)
+        self.confirm_consented_or_raise(sites)
+        with transaction.atomic():
+            self.bulk_create_onschedules(subject_identifiers, sites)
+            self.bulk_create_history(subject_identifiers, sites)
+            self.bulk_create_appointments(subject_identifiers, sites)
+        for subject_identifier in already_on_schedule:
+            self.schedule.put_on_schedule(
+                subject_identifier=subject_identifier,
+                onschedule_datetime=self.onschedule_datetime,
+                skip_get_current_site=self.skip_get_current_site,
+            )
+
+    def get_sites(self, subject_identifiers: list[str]) -> dict[str, Site]:
+        """Returns a dict of {subject_identifier: site} from
+        RegisteredSubject or raises.
+
+        Unless `skip_get_current_site`, each patient's site must
+        be the current site.
+        """
+        sites = {
+            obj.subject_identifier: obj.site
+            for obj in RegisteredSubject.objects.filter(
+                subject_identifier__in=subject_identifiers
+            ).select_related("site")
+        }
+        if missing := [s for s in subject_identifiers if s not in sites]:
+            raise GroupScheduleError(f"Patient is not registered. Got {', '.join(missing)}.")
+        if not self.skip_get_current_site:
+            current_site = get_site_model_cls().objects.get_current()
+            for subject_identifier, site in sites.items():
+                if site.id != current_site.id:
+                    raise GroupScheduleError(
+                        f"Invalid site for subject. {subject_identifier}. "
+                        f"Expected `{site.name}`. Got `{current_site.name}`"
+                    )
+        return sites
+
+    def confirm_consented_or_raise(self, sites: dict[str, Site]) -> None:
+        """Raises if any patient has not completed a consent valid
+        for the onschedule datetime.
+
+        Same checks as `schedule.put_on_schedule` and
+        `site_consents.get_consent_or_raise` but in bulk.
+        """
+        cdefs: dict[str, ConsentDefinition] = {}
+        schedule_cdefs: dict[str, list[ConsentDefinition]] = {}
+        subject_identifiers_by_cdef: dict[str, list[str]] = {}
+        for site_id in sorted({site.id for site in sites.values()}):
+            single_site = site_sites.get(site_id)
+            consent_definitions = site_consents.filter_cdefs_by_site_or_raise(
+                site=single_site,
+                consent_definitions=self.schedule.consent_definitions,
+                errror_messages=[f"site={single_site}"],
+            )
+            cdef = site_consents.get_consent_definition(
+                report_datetime=self.onschedule_datetime, site=single_site
+            )
+            cdefs[cdef.name] = cdef
+            schedule_cdefs[cdef.name] = consent_definitions
+            subject_identifiers_by_cdef.setdefault(cdef.name, []).extend(
+                [s for s, site in sites.items() if site.id == site_id]
+            )
+        for name, subject_identifiers in subject_identifiers_by_cdef.items():
+            cdef = cdefs[name]
+            consent_datetimes = self.get_consent_datetimes(cdef, subject_identifiers)
+            if missing := [s for s in subject_identifiers if s not in consent_datetimes]:
+                self.raise_not_consented(missing, schedule_cdefs[name])
+            if consented_after := [
+                s
+                for s in subject_identifiers
+                if to_utc(self.onschedule_datetime) < consent_datetimes[s]
+            ]:
+                if not cdef.updates:
+                    dte = formatted_date(self.onschedule_datetime)
+                    raise ConsentDefinitionNotConfiguredForUpdate(
+                        f"Consent not configured to update any previous versions. "
+                        f"Got '{cdef.version}'. "
+                        f"Has subject '{consented_after[0]}' completed version "
+                        f"'{cdef.version}' of consent on or after report_datetime='{dte}'?"
+                    )
+                consent_datetimes = self.get_consent_datetimes(cdef.updates, consented_after)
+                if missing := [s for s in consented_after if s not in consent_datetimes]:
+                    self.raise_not_consented(missing, schedule_cdefs[name])
+
+    @staticmethod
+    def get_consent_datetimes(
+        cdef: ConsentDefinition, subject_identifiers: list[str]
+    ) -> dict[str, datetime]:
+        return dict(
+            cdef.model_cls.objects.filter(
+                subject_identifier__in=subject_identifiers, version=cdef.version
+            ).values_list("subject_identifier", "consent_datetime")
+        )
+
+    def raise_not_consented(
+        self, subject_identifiers: list[str], consent_definitions: list[ConsentDefinition]
+    ) -> None:
+        dte = formatted_datetime(self.onschedule_datetime)
+        raise NotConsentedError(
+            f"Consent not found. Has subject '{', '.join(subject_identifiers)}' "
+            f"completed a consent before {dte}? Possible consent definitions are "
+            f"{consent_definitions}."
+        )
+
+    def bulk_create_onschedules(
+        self, subject_identifiers: list[str], sites: dict[str, Site]
+    ) -> None:
+        model_cls = self.schedule.onschedule_model_cls
+        self.bulk_create(
+            model_cls,
+            [
+                model_cls(
+                    subject_identifier=subject_identifier,
+                    onschedule_datetime=self.onschedule_datetime,
+                    report_datetime=self.onschedule_datetime,
+                    site=sites[subject_identifier],
+                )
+                for subject_identifier in subject_identifiers
+            ],
+        )
+
+    def bulk_create_history(
+        self, subject_identifiers: list[str], sites: dict[str, Site]
+    ) -> None:
+        model_cls = self.schedule.history_model_cls
+        self.bulk_create(
+            model_cls,
+            [
+                model_cls(
+                    subject_identifier=subject_identifier,
+                    onschedule_model=self.schedule.onschedule_model,
+                    offschedule_model=self.schedule.offschedule_model,
+                    schedule_name=self.schedule.name,
+                    visit_schedule_name=self.visit_schedule.name,
+                    onschedule_datetime=self.onschedule_datetime,
+                    schedule_status=ON_SCHEDULE,
+                    site=sites[subject_identifier],
+                )
+                for subject_identifier in subject_identifiers
+            ],
+        )
+
+    def bulk_create_appointments(
+        self, subject_identifiers: list[str], sites: dict[str, Site]
+    ) -> None:
+        model_cls = self.schedule.appointment_model_cls
+        timelines: dict[int, list[tuple[Visit, Facility, datetime, datetime]]] = {}
+        appt_type = self.get_default_appt_type()
+        appt_reason = self.get_default_appt_reason()
+        user_created = model_cls._meta.get_field("user_created").get_os_username()
+        appointments = []
+        for subject_identifier in subject_identifiers:
+            site = sites[subject_identifier]
+            if site.id not in timelines:
+                timelines[site.id] = self.get_timeline(site)
+            for visit, facility, timepoint_datetime, appt_datetime in timelines[site.id]:
+                appointments.append(
+                    model_cls(
+                        subject_identifier=subject_identifier,
+                        visit_schedule_name=self.visit_schedule.name,
+                        schedule_name=self.schedule.name,
+                        visit_code=visit.code,
+                        visit_code_sequence=0,
+                        timepoint=visit.timepoint,
+                        site=site,
+                        facility_name=facility.name,
+                        timepoint_datetime=timepoint_datetime,
+                        appt_datetime=appt_datetime,
+                        appt_type=appt_type,
+                        appt_reason=appt_reason,
+                        appt_status=NEW_APPT,
+                        ignore_window_period=False,
+                        # set by edc_timepoint's post_save receiver
+                        timepoint_opened_datetime=appt_datetime,
+                        # set by the saves after the first save
+                        user_created=user_created,
+                        user_modified=user_created,
+                    )
+                )
+        self.bulk_create(model_cls, appointments)
+
+    def get_timeline(self, site: Site) -> list[tuple[Visit, Facility, datetime, datetime]]:
+        """Returns a list of (visit, facility, timepoint_datetime,
+        appt_datetime) for each visit in the schedule.
+
+        Same rules as edc_appointment's AppointmentsCreator.
+        """
+        timeline = []
+        taken_datetimes = []
+        base_appt_datetime = self.onschedule_datetime.astimezone(ZoneInfo("UTC"))
+        timepoint_dates = self.schedule.visits.timepoint_dates(dt=base_appt_datetime)
+        for visit, timepoint_datetime in timepoint_dates.items():
+            try:
+                facility = get_facility(visit.facility_name)
+            except FacilityError as e:
+                raise CreateAppointmentError(
+                    f"{e} See {repr(visit)}. Got facility_name={visit.facility_name}"
+                )
+            try:
+                appt_datetime = facility.available_arr(
+                    suggested_datetime=timepoint_datetime,
+                    forward_delta=visit.rupper,
+                    reverse_delta=visit.rlower,
+                    taken_datetimes=taken_datetimes,
+                    site=site,
+                ).datetime
+            except FacilityError as e:
+                raise CreateAppointmentDateError(f"{e} Visit={repr(visit)}.")
+            taken_datetimes.append(appt_datetime)
+            timeline.append((visit, facility, timepoint_datetime, appt_datetime))
+        return timeline
+
+    @staticmethod
+    def get_default_appt_type() -> AppointmentType | None:
+        return (
+            get_appointment_type_model_cls()
+            .objects.filter(name=get_appt_type_default())
+            .first()
+        )
+
+    @staticmethod
+    def get_default_appt_reason() -> str:
+        try:
+            return get_appt_reason_default() or SCHEDULED_APPT
+        except AttributeError:
+            return SCHEDULED_APPT
+
+    @staticmethod
+    def bulk_create(model_cls, objs: list) -> None:
+        """Bulk creates model instances, with history, if the
+        model has historical records.
+
+        The device fields and UUID primary key are set here since
+        `bulk_create` does not call `save` or the field's `pre_save`.
+        """
+        for obj in objs:
+            obj.device_created, obj.device_modified = update_device_fields(obj)
+            obj.id = obj.id or uuid4()
+        if objs:
+            try:
+                get_history_manager_for_model(model_cls)
+            except NotHistoricalModelError:
+                model_cls.objects.bulk_create(objs)
+            else:
+                bulk_create_with_history(objs, model_cls)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+# sent after each instrumented stage with kwargs stage, seconds,
+# queries, failed and any context, e.g. group_identifier_as_pk.
+randomization_stage_timed = Signal()
+
+
+def get_instrumentation_enabled() -> bool:
+    """Returns True if the stages of a group randomization are
+    timed.
+
+    Opt-in. Default is False.
+    """
+    return getattr(settings, "INTECOMM_RANDO_INSTRUMENTATION", False)
+
+
+class StageHistogram:
+    """A process-local histogram of durations (seconds) and SQL
+    query counts by stage.
+
+    `render` returns the histogram in the Prometheus text format.
+    """
+
+    buckets: tuple[float, ...] = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._lock = Lock()
+        self._stages: dict[str, dict] = {}
+
+    def observe(self, stage: str, seconds: float, queries: int) -> None:
+        with self._lock:
+            data = self._stages.setdefault(
+                stage,
+                dict(bucket_counts=[0] * (len(self.buckets) + 1), count=0, sum=0.0, queries=0),
+            )
+            data["bucket_counts"][bisect_left(self.buckets, seconds)] += 1
+            data["count"] += 1
+            data["sum"] += seconds
+            data["queries"] += queries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stages = {}
+
+    def snapshot(self) -> dict[str, dict]:
+        """Returns a dict of count, sum, cumulative buckets and
+        total queries by stage.
+        """
+        snapshot = {}
+        with self._lock:
+            for stage, data in self._stages.items():
+                buckets, cumulative = {}, 0
+                for upper_bound, count in zip(
+                    [*self.buckets, float("inf")], data["bucket_counts"]
+                ):
+                    cumulative += count
+                    buckets[upper_bound] = cumulative
+                snapshot[stage] = dict(
+                    count=data["count"],
+                    sum=data["sum"],
+                    buckets=buckets,
+                    queries=data["queries"],
+                )
+        return snapshot
+
+    def render(self) -> str:
+        name = "intecomm_rando_stage"
+        lines = [
+            f"# TYPE {name}_seconds histogram",
+            f"# TYPE {name}_queries_total counter",
+        ]
+        for stage, data in sorted(self.snapshot().items()):
+            for upper_bound, count in data["buckets"].items():
+                le = "+Inf" if upper_bound == float("inf") else upper_bound
+                lines.append(f'{name}_seconds_bucket{{stage="{stage}",le="{le}"}} {count}')
+            lines.append(f'{name}_seconds_sum{{stage="{stage}"}} {data["sum"]}')
+            lines.append(f'{name}_seconds_count{{stage="{stage}"}} {data["count"]}')
+            lines.append(f'{name}_queries_total{{stage="{stage}"}} {data["queries"]}')
+        return "\n".join(lines) + "\n"
+
+
+stage_histogram = StageHistogram()
+
+
+class RetryCounter:
+    """A process-local count of randomization retries by reason,
+    e.g. deadlock.
+
+    Always on. `render` returns the counts in the Prometheus text
+    format.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counts: dict[str, int] = {}
+
+    def increment(self, reason: str) -> None:
+        with self._lock:
+            self._counts[reason] = self._counts.get(reason, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts = {}
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def render(self) -> str:
+        name = "intecomm_rando_randomize_retries_total"
+        lines = [f"# TYPE {name} counter"]
+        for reason, count in sorted(self.snapshot().items()):
+            lines.append(f'{name}{{reason="{reason}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+retry_counter = RetryCounter()
+
+
+class QueryCounter:
+    """A database execute wrapper that counts queries."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def instrument(stage: str, **context):
+    """Times a stage and counts its SQL queries, if enabled.
+
+    Results are added to `stage_histogram`, logged and sent with
+    the `randomization_stage_timed` signal.
+    """
+    if not get_instrumentation_enabled():
+        yield
+        return
+    query_counter = QueryCounter()
+    failed = True
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(query_counter):
+            yield
+        failed = False
+    finally:
+        seconds = time.perf_counter() - start
+        stage_histogram.observe(stage, seconds, query_counter.count)
+        logger.info(
+            "Randomization stage %s %s in %.3fs with %s queries.",
+            stage,
+            "failed" if failed else "completed",
+            seconds,
+            query_counter.count,
+            extra=dict(
+                stage=stage,
+                seconds=seconds,
+                queries=query_counter.count,
+                failed=failed,
+                **context,
+            ),
+        )
+        randomization_stage_timed.send(
+            sender=None,
+            stage=stage,
+            seconds=seconds,
+            queries=query_counter.count,
+            failed=failed,
+            **context,
+        )
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from django.apps import apps as django_apps
+from django.db.models import Count, Q
+from edc_randomization.constants import RANDOMIZED
+from edc_utils import get_utcnow
+
+
+def get_list_exhaustion_forecast(
+    days: int | None = None, report_datetime: datetime | None = None
+) -> list[dict]:
+    """Returns, by site_name, the unallocated RandomizationList
+    rows, the allocation rate over the last `days` and the
+    projected date the list runs out.
+
+    Uses two aggregate queries regardless of the size of the list.
+    If the list is exhausted, `days_remaining` is 0 and
+    `exhaustion_datetime` is `report_datetime`. Otherwise,
+    `exhaustion_datetime` is None if there were no allocations in
+    the period.
+    """
+    days = days or 28
+    report_datetime = report_datetime or get_utcnow()
+    randomization_list_model_cls = django_apps.get_model("intecomm_rando.randomizationlist")
+    registered_group_model_cls = django_apps.get_model("intecomm_rando.registeredgroup")
+    recent_allocations = {
+        obj["site__name"]: obj["allocations"]
+        for obj in registered_group_model_cls.objects.filter(
+            registration_status=RANDOMIZED,
+            randomization_datetime__gt=report_datetime - timedelta(days=days),
+            randomization_datetime__lte=report_datetime,
+        )
+        .values("site__name")
+        .annotate(allocations=Count("id"))
+        .order_by()
+    }
+    forecast = []
+    for obj in (
+        randomization_list_model_cls.objects.values("site_name")
+        .annotate(total=Count("id"), unallocated=Count("id", filter=Q(allocated=False)))
+        .order_by("site_name")
+    ):
+        allocations = recent_allocations.get(obj["site_name"], 0)
+        rate = allocations / days
+        if not obj["unallocated"]:
+            days_remaining = 0
+        else:
+            days_remaining = obj["unallocated"] / rate if rate else None
+        forecast.append(
+            dict(
+                site_name=obj["site_name"],
+                total=obj["total"],
+                unallocated=obj["unallocated"],
+                allocations=allocations,
+                allocations_per_day=rate,
+                days_remaining=days_remaining,
+                exhaustion_datetime=(
+                    None
+                    if days_remaining is None
+                    else report_datetime + timedelta(days=days_remaining)
+                ),
+            )
+        )
+    return forecast
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from intecomm_rando.models import GroupSummary
+
+
+class Command(BaseCommand):
+    help = "Create or update the GroupSummary for all existing patient groups"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--patient-group-model",
+            dest="patient_group_model",
+            default="intecomm_screening.patientgroup",
+            help="the patient group model. Default: intecomm_screening.patientgroup",
+        )
+
+    def handle(self, *args, **options):
+        count = GroupSummary.objects.backfill(
+            patient_group_model=options["patient_group_model"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {count} group summaries."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from intecomm_rando.models import SubjectRandomization
+
+
+class Command(BaseCommand):
+    help = "Create or update SubjectRandomization for all patients of randomized groups"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=500,
+            help="number of patients per insert. Default: 500",
+        )
+
+    def handle(self, *args, **options):
+        count = SubjectRandomization.objects.backfill(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {count} subject randomizations."))
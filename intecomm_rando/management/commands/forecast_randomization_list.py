@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from intecomm_rando.list_forecast import get_list_exhaustion_forecast
+
+
+class Command(BaseCommand):
+    help = "Forecast when the randomization list runs out for each site"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            dest="days",
+            type=int,
+            default=28,
+            help="number of recent days used for the allocation rate. Default: 28",
+        )
+
+        parser.add_argument(
+            "--warn-days",
+            dest="warn_days",
+            type=int,
+            default=90,
+            help="warn if a site's list runs out within this many days. Default: 90",
+        )
+
+    def handle(self, *args, **options):
+        forecast = get_list_exhaustion_forecast(days=options["days"])
+        for obj in forecast:
+            msg = (
+                f"  - {obj['site_name']}: {obj['unallocated']}/{obj['total']} unallocated, "
+                f"{obj['allocations_per_day']:.2f} allocations/day "
+                f"(last {options['days']} days). "
+            )
+            if not obj["unallocated"]:
+                self.stdout.write(self.style.WARNING(f"{msg}Exhausted."))
+            elif obj["exhaustion_datetime"] is None:
+                self.stdout.write(f"{msg}No recent allocations.")
+            else:
+                msg = (
+                    f"{msg}Runs out in {obj['days_remaining']:.0f} days "
+                    f"on {obj['exhaustion_datetime'].strftime('%Y-%m-%d')}."
+                )
+                if obj["days_remaining"] <= options["warn_days"]:
+                    self.stdout.write(self.style.WARNING(msg))
+                else:
+                    self.stdout.write(msg)
+        if not forecast:
+            self.stdout.write(self.style.WARNING("Randomization list is empty."))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from intecomm_rando.bulk_randomize import BulkRandomizer
+
+
+class Command(BaseCommand):
+    help = "Randomize all complete groups with randomize_now=YES for a site or country"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--site",
+            dest="site_ids",
+            type=int,
+            action="append",
+            default=None,
+            help="site id. May be repeated",
+        )
+
+        parser.add_argument("--country", dest="country", default=None, help="country")
+
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=50,
+            help="number of groups per transaction. Default: 50",
+        )
+
+    def handle(self, *args, **options):
+        if not options["site_ids"] and not options["country"]:
+            raise CommandError("Specify --site and/or --country.")
+        bulk_randomizer = BulkRandomizer(
+            site_ids=options["site_ids"],
+            country=options["country"],
+            batch_size=options["batch_size"],
+        )
+        if not bulk_randomizer.site_ids:
+            raise CommandError(f"No sites found. Got country={options['country']}.")
+        for instance, error, seconds in bulk_randomizer.run():
+            if error:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"  - {instance.group_identifier_as_pk} FAILED "
+                        f"({seconds:.2f}s). {error}"
+                    )
+                )
+            else:
+                self.stdout.write(
+                    f"  - {instance.group_identifier_as_pk} -> "
+                    f"{instance.group_identifier} ({seconds:.2f}s)"
+                )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Randomized {len(bulk_randomizer.randomized)} groups, "
+                f"{len(bulk_randomizer.failed)} failed, in {bulk_randomizer.elapsed:.2f}s "
+                f"({bulk_randomizer.throughput:.2f} groups/s)."
+            )
+        )
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from intecomm_rando.reconcile import RandomizationReconciler
+
+
+class Command(BaseCommand):
+    help = (
+        "Find patients of randomized groups not updated with the group's "
+        "randomization and, optionally, repair them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair",
+            dest="repair",
+            action="store_true",
+            default=False,
+            help=(
+                "update patient logs, consents, registered subjects and subject "
+                "randomizations. Default: False"
+            ),
+        )
+
+        parser.add_argument(
+            "--user",
+            dest="user",
+            default="reconcile_randomization",
+            help=(
+                "username set as user_modified on repaired rows. "
+                "Default: reconcile_randomization"
+            ),
+        )
+
+        parser.add_argument(
+            "--show",
+            dest="show",
+            type=int,
+            default=10,
+            help="number of identifiers to show per inconsistency. Default: 10",
+        )
+
+    def handle(self, *args, **options):
+        reconciler = RandomizationReconciler()
+        inconsistencies = reconciler.inconsistencies()
+        for label, identifiers in inconsistencies.items():
+            if identifiers:
+                shown = ", ".join(str(i) for i in identifiers[: options["show"]])
+                more = "" if len(identifiers) <= options["show"] else ", ..."
+                self.stdout.write(
+                    self.style.WARNING(f"  - {label}: {len(identifiers)} ({shown}{more})")
+                )
+            else:
+                self.stdout.write(f"  - {label}: 0")
+        if options["repair"]:
+            for label, updated in reconciler.repair(user_modified=options["user"]).items():
+                self.stdout.write(self.style.SUCCESS(f"Repaired {updated} {label}(s)."))
+        elif any(inconsistencies.values()):
+            self.stdout.write("Use --repair to update.")
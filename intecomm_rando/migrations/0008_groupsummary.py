@@ -0,0 +1,155 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:36
+
+import _socket
+import django_audit_fields.fields.hostname_modification_field
+import django_audit_fields.fields.userfield
+import django_audit_fields.fields.uuid_auto_field
+import django_audit_fields.models.audit_model_mixin
+import django_revision.revision_field
+import intecomm_rando.models.group_summary
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("intecomm_rando", "0007_alter_historicalregisteredgroup_site_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GroupSummary",
+            fields=[
+                (
+                    "revision",
+                    django_revision.revision_field.RevisionField(
+                        blank=True,
+                        editable=False,
+                        help_text="System field. Git repository tag:branch:commit.",
+                        max_length=75,
+                        null=True,
+                        verbose_name="Revision",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        blank=True, default=django_audit_fields.models.audit_model_mixin.utcnow
+                    ),
+                ),
+                (
+                    "modified",
+                    models.DateTimeField(
+                        blank=True, default=django_audit_fields.models.audit_model_mixin.utcnow
+                    ),
+                ),
+                (
+                    "user_created",
+                    django_audit_fields.fields.userfield.UserField(
+                        blank=True,
+                        help_text="Updated by admin.save_model",
+                        max_length=50,
+                        verbose_name="user created",
+                    ),
+                ),
+                (
+                    "user_modified",
+                    django_audit_fields.fields.userfield.UserField(
+                        blank=True,
+                        help_text="Updated by admin.save_model",
+                        max_length=50,
+                        verbose_name="user modified",
+                    ),
+                ),
+                (
+                    "hostname_created",
+                    models.CharField(
+                        blank=True,
+                        default=_socket.gethostname,
+                        help_text="System field. (modified on create only)",
+                        max_length=60,
+                        verbose_name="Hostname created",
+                    ),
+                ),
+                (
+                    "hostname_modified",
+                    django_audit_fields.fields.hostname_modification_field.HostnameModificationField(
+                        blank=True,
+                        help_text="System field. (modified on every save)",
+                        max_length=50,
+                        verbose_name="Hostname modified",
+                    ),
+                ),
+                (
+                    "device_created",
+                    models.CharField(blank=True, max_length=10, verbose_name="Device created"),
+                ),
+                (
+                    "device_modified",
+                    models.CharField(
+                        blank=True, max_length=10, verbose_name="Device modified"
+                    ),
+                ),
+                (
+                    "locale_created",
+                    models.CharField(
+                        blank=True,
+                        help_text="Auto-updated by Modeladmin",
+                        max_length=10,
+                        null=True,
+                        verbose_name="Locale created",
+                    ),
+                ),
+                (
+                    "locale_modified",
+                    models.CharField(
+                        blank=True,
+                        help_text="Auto-updated by Modeladmin",
+                        max_length=10,
+                        null=True,
+                        verbose_name="Locale modified",
+                    ),
+                ),
+                (
+                    "id",
+                    django_audit_fields.fields.uuid_auto_field.UUIDAutoField(
+                        blank=True,
+                        editable=False,
+                        help_text="System auto field. UUID primary key.",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("group_identifier_as_pk", models.UUIDField(unique=True)),
+                ("size", models.IntegerField(default=0)),
+                ("stable", models.IntegerField(default=0)),
+                ("willing_to_screen", models.IntegerField(default=0)),
+                ("screened", models.IntegerField(default=0)),
+                ("consented", models.IntegerField(default=0)),
+                ("dm", models.IntegerField(default=0)),
+                ("htn", models.IntegerField(default=0)),
+                ("hiv", models.IntegerField(default=0)),
+                ("ncd_single", models.IntegerField(default=0)),
+                ("hiv_single", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Group Summary",
+                "verbose_name_plural": "Group Summaries",
+                "abstract": False,
+                "default_permissions": ("add", "change", "delete", "view", "export", "import"),
+                "default_manager_name": "objects",
+                "indexes": [
+                    models.Index(
+                        fields=["modified", "created"], name="intecomm_ra_modifie_218255_idx"
+                    ),
+                    models.Index(
+                        fields=["user_modified", "user_created"],
+                        name="intecomm_ra_user_mo_cd8b0e_idx",
+                    ),
+                ],
+            },
+            managers=[
+                ("objects", intecomm_rando.models.group_summary.GroupSummaryManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("intecomm_rando", "0008_groupsummary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="historicalregisteredgroup",
+            name="registration_status",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="Updated when group is randomized. If null, group is not yet allocated",
+                max_length=25,
+                null=True,
+                verbose_name="Registration status",
+            ),
+        ),
+        migrations.AddField(
+            model_name="registeredgroup",
+            name="registration_status",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="Updated when group is randomized. If null, group is not yet allocated",
+                max_length=25,
+                null=True,
+                verbose_name="Registration status",
+            ),
+        ),
+    ]
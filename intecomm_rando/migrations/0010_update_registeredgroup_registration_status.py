@@ -0,0 +1,25 @@
+from django.db import migrations
+from edc_constants.constants import UUID_PATTERN
+from edc_randomization.constants import RANDOMIZED
+
+
+def update_registration_status(apps, schema_editor):
+    """Set registration_status for groups already randomized.
+
+    Until now a group was unallocated if the SID was still the
+    default UUID.
+    """
+    model_cls = apps.get_model("intecomm_rando.registeredgroup")
+    model_cls.objects.filter(registration_status__isnull=True).exclude(
+        sid__regex=UUID_PATTERN.pattern
+    ).update(registration_status=RANDOMIZED)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("intecomm_rando", "0009_registeredgroup_registration_status"),
+    ]
+
+    operations = [
+        migrations.RunPython(update_registration_status, migrations.RunPython.noop),
+    ]
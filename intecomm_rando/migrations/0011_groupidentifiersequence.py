@@ -0,0 +1,166 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:46
+
+import _socket
+import django.db.models.deletion
+import django.db.models.manager
+import django_audit_fields.fields.hostname_modification_field
+import django_audit_fields.fields.userfield
+import django_audit_fields.fields.uuid_auto_field
+import django_audit_fields.models.audit_model_mixin
+import django_revision.revision_field
+import edc_sites.managers
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("intecomm_rando", "0010_update_registeredgroup_registration_status"),
+        ("sites", "0002_alter_domain_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GroupIdentifierSequence",
+            fields=[
+                (
+                    "revision",
+                    django_revision.revision_field.RevisionField(
+                        blank=True,
+                        editable=False,
+                        help_text="System field. Git repository tag:branch:commit.",
+                        max_length=75,
+                        null=True,
+                        verbose_name="Revision",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        blank=True, default=django_audit_fields.models.audit_model_mixin.utcnow
+                    ),
+                ),
+                (
+                    "modified",
+                    models.DateTimeField(
+                        blank=True, default=django_audit_fields.models.audit_model_mixin.utcnow
+                    ),
+                ),
+                (
+                    "user_created",
+                    django_audit_fields.fields.userfield.UserField(
+                        blank=True,
+                        help_text="Updated by admin.save_model",
+                        max_length=50,
+                        verbose_name="user created",
+                    ),
+                ),
+                (
+                    "user_modified",
+                    django_audit_fields.fields.userfield.UserField(
+                        blank=True,
+                        help_text="Updated by admin.save_model",
+                        max_length=50,
+                        verbose_name="user modified",
+                    ),
+                ),
+                (
+                    "hostname_created",
+                    models.CharField(
+                        blank=True,
+                        default=_socket.gethostname,
+                        help_text="System field. (modified on create only)",
+                        max_length=60,
+                        verbose_name="Hostname created",
+                    ),
+                ),
+                (
+                    "hostname_modified",
+                    django_audit_fields.fields.hostname_modification_field.HostnameModificationField(
+                        blank=True,
+                        help_text="System field. (modified on every save)",
+                        max_length=50,
+                        verbose_name="Hostname modified",
+                    ),
+                ),
+                (
+                    "device_created",
+                    models.CharField(blank=True, max_length=10, verbose_name="Device created"),
+                ),
+                (
+                    "device_modified",
+                    models.CharField(
+                        blank=True, max_length=10, verbose_name="Device modified"
+                    ),
+                ),
+                (
+                    "locale_created",
+                    models.CharField(
+                        blank=True,
+                        help_text="Auto-updated by Modeladmin",
+                        max_length=10,
+                        null=True,
+                        verbose_name="Locale created",
+                    ),
+                ),
+                (
+                    "locale_modified",
+                    models.CharField(
+                        blank=True,
+                        help_text="Auto-updated by Modeladmin",
+                        max_length=10,
+                        null=True,
+                        verbose_name="Locale modified",
+                    ),
+                ),
+                (
+                    "id",
+                    django_audit_fields.fields.uuid_auto_field.UUIDAutoField(
+                        blank=True,
+                        editable=False,
+                        help_text="System auto field. UUID primary key.",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("device_id", models.IntegerField()),
+                ("reserved_sequence_number", models.IntegerField(default=0)),
+                (
+                    "site",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="sites.site",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Group Identifier Sequence",
+                "verbose_name_plural": "Group Identifier Sequences",
+                "abstract": False,
+                "default_permissions": ("add", "change", "delete", "view", "export", "import"),
+                "default_manager_name": "objects",
+                "indexes": [
+                    models.Index(
+                        fields=["modified", "created"], name="intecomm_ra_modifie_1dc70a_idx"
+                    ),
+                    models.Index(
+                        fields=["user_modified", "user_created"],
+                        name="intecomm_ra_user_mo_b23c88_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("name", "site", "device_id"),
+                        name="intecomm_rando_groupidentifiersequence_name_site_device_uniq",
+                    )
+                ],
+            },
+            managers=[
+                ("on_site", edc_sites.managers.CurrentSiteManager()),
+                ("objects", django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -1,3 +1,13 @@
+from .group_identifier_sequence import GroupIdentifierSequence
+from .group_summary import GroupSummary
 from .randomization_list import RandomizationList
 from .registered_group import RegisteredGroup
-from .signals import randomize_patient_group_on_post_save
+from .signals import (
+    connect_randomize_patient_group_on_post_save,
+    connect_update_group_summary_receivers,
+    invalidate_assignment_cache_on_post_save,
+    randomize_patient_group_on_post_save,
+    update_group_summary_on_m2m_changed,
+    update_group_summary_on_post_save,
+)
+from .subject_randomization import SubjectRandomization
@@ -0,0 +1,31 @@
+from django.db import models
+from edc_model.models import BaseUuidModel
+from edc_sites.model_mixins import SiteModelMixin
+
+
+class GroupIdentifierSequence(SiteModelMixin, BaseUuidModel):
+    """Last sequence number reserved for group identifiers by
+    site and device.
+
+    Used by GroupIdentifier in hi/lo mode to reserve a block of
+    sequence numbers at a time.
+    """
+
+    name = models.CharField(max_length=100)
+
+    device_id = models.IntegerField()
+
+    reserved_sequence_number = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} {self.site_id} {self.device_id} {self.reserved_sequence_number}"
+
+    class Meta(BaseUuidModel.Meta):
+        verbose_name = "Group Identifier Sequence"
+        verbose_name_plural = "Group Identifier Sequences"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "site", "device_id"],
+                name="%(app_label)s_%(class)s_name_site_device_uniq",
+            )
+        ]
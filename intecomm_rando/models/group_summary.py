@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Iterable
+
+from django.apps import apps as django_apps
+from django.db import models
+from django.db.models import Count, F, Q
+from edc_constants.constants import DM, HIV, HTN, YES
+from edc_model.models import BaseUuidModel
+from edc_protocol.research_protocol_config import ResearchProtocolConfig
+
+if TYPE_CHECKING:
+    from intecomm_screening.models import PatientGroup, PatientLog
+
+COUNTER_FIELDS = [
+    "size",
+    "stable",
+    "willing_to_screen",
+    "screened",
+    "consented",
+    "dm",
+    "htn",
+    "hiv",
+    "ncd_single",
+    "hiv_single",
+]
+
+# PatientLog fields the counts are calculated from
+PATIENT_FIELDS = ["stable", "willing_to_screen", "screening_identifier", "subject_identifier"]
+
+
+def get_patient_counts(patients: Iterable[PatientLog]) -> Counter:
+    """Returns a Counter of the GroupSummary counter fields for
+    the given patients.
+
+    Prefetch `conditions` on the queryset passed in.
+    """
+    counts = Counter()
+    subject_identifier_pattern = ResearchProtocolConfig().subject_identifier_pattern
+    for patient in patients:
+        conditions = [condition.name for condition in patient.conditions.all()]
+        counts.update(
+            size=1,
+            stable=patient.stable == YES,
+            willing_to_screen=patient.willing_to_screen == YES,
+            screened=bool(re.match(r"^[A-Z0-9]{8}$", patient.screening_identifier or "")),
+            consented=bool(
+                re.match(subject_identifier_pattern, patient.subject_identifier or "")
+            ),
+            dm=conditions.count(DM),
+            htn=conditions.count(HTN),
+            hiv=conditions.count(HIV),
+            ncd_single=len(conditions) == 1 and conditions[0] in [DM, HTN],
+            hiv_single=len(conditions) == 1 and conditions[0] == HIV,
+        )
+    return counts
+
+
+def get_patient_field_counts(patients: models.QuerySet) -> dict[str, int]:
+    """Returns the counter fields calculated from PATIENT_FIELDS
+    in one aggregate query, without loading the patients.
+    """
+    subject_identifier_pattern = ResearchProtocolConfig().subject_identifier_pattern
+    return patients.aggregate(
+        size=Count("id"),
+        stable=Count("id", filter=Q(stable=YES)),
+        willing_to_screen=Count("id", filter=Q(willing_to_screen=YES)),
+        screened=Count("id", filter=Q(screening_identifier__regex=r"^[A-Z0-9]{8}$")),
+        consented=Count(
+            "id", filter=Q(subject_identifier__regex=rf"^({subject_identifier_pattern})")
+        ),
+    )
+
+
+class GroupSummaryManager(models.Manager):
+    use_in_migrations = True
+
+    def get_by_natural_key(self, group_identifier_as_pk):
+        return self.get(group_identifier_as_pk=group_identifier_as_pk)
+
+    def refresh(self, patient_group: PatientGroup) -> GroupSummary:
+        """Recalculates the summary for a group from its patients."""
+        counts = get_patient_counts(patient_group.patients.prefetch_related("conditions"))
+        obj, _ = self.update_or_create(
+            group_identifier_as_pk=patient_group.group_identifier_as_pk,
+            defaults={fld: counts[fld] for fld in COUNTER_FIELDS},
+        )
+        return obj
+
+    def get_current(self, patient_group: PatientGroup) -> GroupSummary | None:
+        """Returns the summary for a group, or None if there is none.
+
+        The summary is refreshed first if its patient counts differ
+        from those in the database, for example after
+        `queryset.update` on the patient log or a bulk change to the
+        membership, neither of which send the signals that maintain
+        the summary.
+        """
+        try:
+            obj = self.get(group_identifier_as_pk=patient_group.group_identifier_as_pk)
+        except self.model.DoesNotExist:
+            return None
+        counts = get_patient_field_counts(patient_group.patients.all())
+        if any(getattr(obj, fld) != value for fld, value in counts.items()):
+            obj = self.refresh(patient_group)
+        return obj
+
+    def backfill(self, patient_group_model: str | None = None) -> int:
+        """Recalculates the summary for all existing groups and
+        returns the number of groups.
+
+        For groups created before the summary was maintained.
+        """
+        patient_group_model_cls = django_apps.get_model(
+            patient_group_model or "intecomm_screening.patientgroup"
+        )
+        count = 0
+        for patient_group in patient_group_model_cls.objects.all().iterator():
+            self.refresh(patient_group)
+            count += 1
+        return count
+
+    def increment(self, patient_group: PatientGroup, patients: Iterable[PatientLog]) -> None:
+        self._update_counts(patient_group, get_patient_counts(patients), 1)
+
+    def decrement(self, patient_group: PatientGroup, patients: Iterable[PatientLog]) -> None:
+        self._update_counts(patient_group, get_patient_counts(patients), -1)
+
+    def _update_counts(self, patient_group: PatientGroup, counts: Counter, sign: int):
+        updated = self.filter(
+            group_identifier_as_pk=patient_group.group_identifier_as_pk
+        ).update(**{fld: F(fld) + sign * counts[fld] for fld in COUNTER_FIELDS})
+        if not updated:
+            self.refresh(patient_group)
+
+
+class GroupSummary(BaseUuidModel):
+    """Counts of the patients in a PatientGroup, maintained by the
+    patient membership signals.
+
+    Used by GroupEligibility to check size, condition makeup and
+    ratio without walking the patients.
+
+    Note: `dm`, `htn` and `hiv` count condition rows, as the
+    condition minimum checks do; `ncd_single` and `hiv_single`
+    count patients with only one condition, as the ratio check
+    does.
+    """
+
+    group_identifier_as_pk = models.UUIDField(max_length=36, unique=True)
+
+    size = models.IntegerField(default=0)
+
+    stable = models.IntegerField(default=0)
+
+    willing_to_screen = models.IntegerField(default=0)
+
+    screened = models.IntegerField(default=0)
+
+    consented = models.IntegerField(default=0)
+
+    dm = models.IntegerField(default=0)
+
+    htn = models.IntegerField(default=0)
+
+    hiv = models.IntegerField(default=0)
+
+    ncd_single = models.IntegerField(default=0)
+
+    hiv_single = models.IntegerField(default=0)
+
+    objects = GroupSummaryManager()
+
+    def __str__(self):
+        return f"{self.group_identifier_as_pk} size={self.size}"
+
+    @property
+    def all_patients_eligible(self) -> bool:
+        """Returns True if all patients are stable, willing to
+        screen, screened and consented.
+        """
+        return (
+            self.size
+            == self.stable
+            == self.willing_to_screen
+            == self.screened
+            == self.consented
+        )
+
+    class Meta(BaseUuidModel.Meta):
+        verbose_name = "Group Summary"
+        verbose_name_plural = "Group Summaries"
@@ -46,6 +46,15 @@ class RegisteredGroup(SiteModelMixin, BaseUuidModel):
         max_length=150, null=True, help_text="Updated when group is randomized"
     )
 
+    registration_status = models.CharField(
+        verbose_name="Registration status",
+        max_length=25,
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Updated when group is randomized. If null, group is not yet allocated",
+    )
+
     on_site = CurrentSiteManager()
 
     history = HistoricalRecords()
@@ -53,7 +62,7 @@ class RegisteredGroup(SiteModelMixin, BaseUuidModel):
     objects = RegisteredGroupManager()
 
     def save(self, *args, **kwargs):
-        if not self.id:
+        if not self.id and not self.group_identifier:
             self.group_identifier = self.group_identifier_as_pk
         super().save(*args, **kwargs)
 
@@ -1,50 +1,215 @@
 import re
 
-from django.db.models.signals import post_save
+from django.apps import apps as django_apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from edc_constants.constants import COMPLETE, UUID_PATTERN, YES
 from edc_randomization.randomizer import RandomizationError
-from edc_randomization.utils import get_object_for_subject
 
-from ..randomize_group import RandomizeGroup
-from ..utils import update_patient_in_newly_randomized_group
+from ..assignment_cache import assignment_cache
+from ..instrumentation import instrument
+from .group_summary import PATIENT_FIELDS, GroupSummary
+from .randomization_list import RandomizationList
+
+
+def is_patient_group(instance) -> bool:
+    return instance._meta.label_lower.split(".")[1] in ["patientgroup", "patientgrouprando"]
+
+
+def get_patient_groups_for_patient(patient_log) -> list:
+    """Returns the PatientGroups a PatientLog is a member of."""
+    patient_groups = []
+    for related_object in patient_log._meta.related_objects:
+        if related_object.many_to_many and is_patient_group(related_object.related_model):
+            patient_groups.extend(
+                getattr(patient_log, related_object.get_accessor_name()).all()
+            )
+    return patient_groups
+
+
+def get_patient_group_models() -> list:
+    """Returns the `patientgroup` and `patientgrouprando` model(s)."""
+    return [m for m in django_apps.get_models() if is_patient_group(m)]
+
+
+def get_patient_group_rando_models() -> list:
+    """Returns the `patientgrouprando` model(s) and any proxies
+    of them.
+    """
+    models = [m for m in django_apps.get_models() if m._meta.model_name == "patientgrouprando"]
+    return models + [
+        m
+        for m in django_apps.get_models()
+        if m._meta.proxy and m not in models and issubclass(m, tuple(models))
+    ]
+
+
+def connect_randomize_patient_group_on_post_save() -> None:
+    """Connects `randomize_patient_group_on_post_save` to
+    post_save for the `patientgrouprando` model(s) only.
+
+    Called from AppConfig.ready, once all models are loaded.
+    Raises ImproperlyConfigured if there is no such model, as
+    groups would never be randomized.
+    """
+    models = get_patient_group_rando_models()
+    if not models:
+        raise ImproperlyConfigured(
+            "No `patientgrouprando` model found. Groups cannot be randomized on "
+            "post_save. Is the app with the patient group models installed?"
+        )
+    for model in models:
+        post_save.connect(
+            randomize_patient_group_on_post_save,
+            sender=model,
+            weak=False,
+            dispatch_uid=f"randomize_group_on_post_save.{model._meta.label_lower}",
+        )
+
+
+def connect_update_group_summary_receivers() -> None:
+    """Connects the GroupSummary receivers to the patient group
+    membership and patient log conditions m2m models, to
+    post_save for the patient log model(s) and to post_delete
+    for the patient group model(s) only.
+
+    Called from AppConfig.ready, once all models are loaded.
+    """
+    for patient_group_model in get_patient_group_models():
+        patients_field = patient_group_model._meta.get_field("patients")
+        patient_log_model = patients_field.related_model
+        for through in [
+            patients_field.remote_field.through,
+            patient_log_model._meta.get_field("conditions").remote_field.through,
+        ]:
+            m2m_changed.connect(
+                update_group_summary_on_m2m_changed,
+                sender=through,
+                weak=False,
+                dispatch_uid=(
+                    f"update_group_summary_on_m2m_changed.{through._meta.label_lower}"
+                ),
+            )
+        post_save.connect(
+            update_group_summary_on_post_save,
+            sender=patient_log_model,
+            weak=False,
+            dispatch_uid=(
+                f"update_group_summary_on_post_save.{patient_log_model._meta.label_lower}"
+            ),
+        )
+        post_delete.connect(
+            delete_group_summary_on_post_delete,
+            sender=patient_group_model,
+            weak=False,
+            dispatch_uid=(
+                "delete_group_summary_on_post_delete."
+                f"{patient_group_model._meta.label_lower}"
+            ),
+        )
 
 
-@receiver(
-    post_save,
-    weak=False,
-    dispatch_uid="randomize_group_on_post_save",
-)
 def randomize_patient_group_on_post_save(sender, instance, raw, **kwargs):
     """Randomize a patient group if ready and not already randomized.
 
-    Note: may be called by the model or its proxy.
+    Note: may be called by the model or its proxy. Connected by
+    `connect_randomize_patient_group_on_post_save`.
     """
     if (
         not raw
         and instance
-        and instance._meta.label_lower.split(".")[1] == "patientgrouprando"
+        and not instance.randomized
+        and instance.randomize_now == YES
+        and instance.confirm_randomize_now == "RANDOMIZE"
+        and instance.status == COMPLETE
     ):
-        if (
-            not instance.randomized
-            and instance.randomize_now == YES
-            and instance.confirm_randomize_now == "RANDOMIZE"
-            and instance.status == COMPLETE
-        ):
-            if not re.match(UUID_PATTERN, str(instance.group_identifier)):
-                raise RandomizationError(
-                    "Failed to randomize group. Group identifier is not a uuid. "
-                    f"Has this group already been randomized? Got {instance.group_identifier}."
-                )
-
-            rando = RandomizeGroup(instance)
-            _, _, _, group_identifier = rando.randomize_group()
-
-            rando_obj = get_object_for_subject(
-                group_identifier, "default", identifier_fld="group_identifier"
+        if not re.match(UUID_PATTERN, str(instance.group_identifier)):
+            raise RandomizationError(
+                "Failed to randomize group. Group identifier is not a uuid. "
+                f"Has this group already been randomized? Got {instance.group_identifier}."
             )
-            randomization_datetime = rando_obj.allocated_datetime
-            for patient in instance.patients.all():
-                update_patient_in_newly_randomized_group(
-                    patient, rando_obj.assignment, randomization_datetime
-                )
+
+        # imported on use, randomize_group has heavy imports
+        from ..randomize_group import randomize_and_schedule_group
+
+        with instrument("post_save", group_identifier_as_pk=instance.group_identifier_as_pk):
+            randomize_and_schedule_group(instance)
+
+
+@receiver(
+    post_save,
+    sender=RandomizationList,
+    weak=False,
+    dispatch_uid="invalidate_assignment_cache_on_post_save",
+)
+def invalidate_assignment_cache_on_post_save(sender, instance, raw, **kwargs):
+    """Invalidate cached assignments for a group if its
+    RandomizationList row changes.
+    """
+    if not raw and instance and instance.group_identifier:
+        assignment_cache.invalidate_group(instance.group_identifier)
+
+
+def update_group_summary_on_m2m_changed(
+    sender, instance, action, reverse, model, pk_set, **kwargs
+):
+    """Keep the GroupSummary counts up to date as patients are
+    added to or removed from a group, or a patient's conditions
+    change.
+
+    Connected by `connect_update_group_summary_receivers`.
+    """
+    if action == "pre_clear" and instance._meta.model_name == "patientlog":
+        # groups are no longer linked to the patient on post_clear
+        instance._group_summary_patient_groups = get_patient_groups_for_patient(instance)
+    elif action not in ["post_add", "post_remove", "post_clear"]:
+        pass
+    elif is_patient_group(instance) and model._meta.model_name == "patientlog":
+        if action == "post_clear":
+            GroupSummary.objects.refresh(instance)
+        else:
+            patients = model.objects.filter(pk__in=pk_set).prefetch_related("conditions")
+            if action == "post_add":
+                GroupSummary.objects.increment(instance, patients)
+            else:
+                GroupSummary.objects.decrement(instance, patients)
+    elif instance._meta.model_name == "patientlog":
+        if action == "post_clear":
+            patient_groups = getattr(instance, "_group_summary_patient_groups", [])
+        elif is_patient_group(model):
+            patient_groups = model.objects.filter(pk__in=pk_set)
+        else:
+            patient_groups = get_patient_groups_for_patient(instance)
+        for patient_group in patient_groups:
+            GroupSummary.objects.refresh(patient_group)
+
+
+def update_group_summary_on_post_save(
+    sender, instance, raw, created, update_fields=None, **kwargs
+):
+    """Recalculate the GroupSummary for each group a patient is in
+    when the patient log changes.
+
+    Skipped if only fields the counts do not depend on were saved,
+    e.g. `group_identifier` on randomization.
+
+    Connected by `connect_update_group_summary_receivers`.
+    """
+    if (
+        not raw
+        and not created
+        and (not update_fields or not set(update_fields).isdisjoint(PATIENT_FIELDS))
+    ):
+        for patient_group in get_patient_groups_for_patient(instance):
+            GroupSummary.objects.refresh(patient_group)
+
+
+def delete_group_summary_on_post_delete(sender, instance, **kwargs):
+    """Delete the GroupSummary of a deleted patient group.
+
+    Connected by `connect_update_group_summary_receivers`.
+    """
+    GroupSummary.objects.filter(
+        group_identifier_as_pk=instance.group_identifier_as_pk
+    ).delete()
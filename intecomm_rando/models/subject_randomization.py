@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from itertools import islice
+from typing import TYPE_CHECKING
+
+from django.apps import apps as django_apps
+from django.db import connection, models
+from django_crypto_fields.fields import EncryptedCharField
+from edc_model.models import BaseUuidModel
+from edc_randomization.site_randomizers import site_randomizers
+from edc_sites.model_mixins import SiteModelMixin
+from edc_utils import get_utcnow
+
+if TYPE_CHECKING:
+    from django.contrib.sites.models import Site
+
+    from .randomization_list import RandomizationList
+
+
+class SubjectRandomizationManager(models.Manager):
+    use_in_migrations = True
+
+    def get_by_natural_key(self, subject_identifier):
+        return self.get(subject_identifier=subject_identifier)
+
+    def bulk_update_or_create(
+        self,
+        randomization_list_obj: RandomizationList,
+        patients: list[tuple[Site | int, str]],
+    ) -> None:
+        """Creates or updates, in one query, the rows for the
+        patients, as [(site or site_id, subject_identifier), ...],
+        of a randomized group.
+        """
+        assignment = self.encrypt_assignment(randomization_list_obj.assignment)
+        self.bulk_upsert(
+            [
+                self.model(
+                    subject_identifier=subject_identifier,
+                    group_identifier=randomization_list_obj.group_identifier,
+                    sid=randomization_list_obj.sid,
+                    assignment=assignment,
+                    allocated_datetime=randomization_list_obj.allocated_datetime,
+                    site_id=getattr(site, "id", site),
+                )
+                for site, subject_identifier in patients
+            ]
+        )
+
+    def encrypt_assignment(self, assignment: str) -> bytes:
+        """Returns the assignment encrypted.
+
+        Encrypted once and reused for all rows; an already encrypted
+        value is not encrypted again (or looked up in the Crypt
+        model) when saved.
+        """
+        return self.model._meta.get_field("assignment").field_cryptor.encrypt(assignment)
+
+    def bulk_upsert(
+        self, objs: list[SubjectRandomization], user_modified: str | None = None
+    ) -> None:
+        """Inserts the rows or, on conflict on subject_identifier,
+        updates them. If given, `user_modified` is also set (and
+        `user_created` on insert).
+        """
+        opts = dict(
+            update_conflicts=True,
+            update_fields=[
+                "group_identifier",
+                "sid",
+                "assignment",
+                "allocated_datetime",
+                "site",
+                "modified",
+            ],
+        )
+        if user_modified:
+            opts["update_fields"].append("user_modified")
+        if connection.features.supports_update_conflicts_with_target:
+            opts.update(unique_fields=["subject_identifier"])
+        modified = get_utcnow()
+        for obj in objs:
+            obj.modified = modified
+            if user_modified:
+                obj.user_created = obj.user_modified = user_modified
+        self.bulk_create(objs, **opts)
+
+    def backfill(
+        self,
+        randomizer_name: str | None = None,
+        patient_log_model: str | None = None,
+        batch_size: int | None = None,
+    ) -> int:
+        """Creates or updates the rows for all patients of
+        randomized groups and returns the number of rows.
+
+        Allocations are read in one query and patients in batches
+        of `batch_size`, one insert per batch.
+        """
+        batch_size = batch_size or 500
+        rando_model_cls = site_randomizers.get(randomizer_name or "default").model_cls()
+        patient_log_model_cls = django_apps.get_model(
+            patient_log_model or "intecomm_screening.patientlog"
+        )
+        allocations = {
+            obj.group_identifier: obj
+            for obj in rando_model_cls.objects.filter(
+                allocated=True, group_identifier__isnull=False
+            ).only("group_identifier", "sid", "assignment", "allocated_datetime")
+        }
+        assignments = {
+            assignment: self.encrypt_assignment(assignment)
+            for assignment in {obj.assignment for obj in allocations.values()}
+        }
+        patients = (
+            patient
+            for patient in (
+                patient_log_model_cls.objects.filter(group_identifier__isnull=False)
+                .values_list("site_id", "subject_identifier", "group_identifier")
+                .iterator(chunk_size=batch_size)
+            )
+            if patient[2] in allocations
+        )
+        count = 0
+        while batch := list(islice(patients, batch_size)):
+            self.bulk_upsert(
+                [
+                    self.model(
+                        subject_identifier=subject_identifier,
+                        group_identifier=group_identifier,
+                        sid=allocations[group_identifier].sid,
+                        assignment=assignments[allocations[group_identifier].assignment],
+                        allocated_datetime=allocations[group_identifier].allocated_datetime,
+                        site_id=site_id,
+                    )
+                    for site_id, subject_identifier, group_identifier in batch
+                ]
+            )
+            count += len(batch)
+        return count
+
+
+class SubjectRandomization(SiteModelMixin, BaseUuidModel):
+    """A read model of the randomization of each patient in a
+    randomized group, keyed by subject_identifier.
+
+    Populated by RandomizeGroup and the
+    `backfill_subject_randomizations` command, and checked and
+    repaired by the `reconcile_randomization` command. Used by
+    `get_assignment_for_subject` and reports to look up a
+    subject's assignment in one indexed query.
+    """
+
+    subject_identifier = models.CharField(max_length=50, unique=True)
+
+    group_identifier = models.CharField(max_length=50, db_index=True)
+
+    sid = models.IntegerField(verbose_name="SID")
+
+    assignment = EncryptedCharField()
+
+    allocated_datetime = models.DateTimeField()
+
+    objects = SubjectRandomizationManager()
+
+    def __str__(self):
+        return f"{self.subject_identifier} Group={self.group_identifier}"
+
+    class Meta(BaseUuidModel.Meta):
+        verbose_name = "Subject Randomization"
+        verbose_name_plural = "Subject Randomizations"
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import csv
+import sys
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from edc_randomization.randomization_list_importer import (
+    RandomizationListImporter as BaseRandomizationListImporter,
+)
+from edc_randomization.randomization_list_importer import (
+    RandomizationListImportError,
+    style,
+)
+from tqdm import tqdm
+
+from .randomization_list_verifier import RandomizationListVerifier
+
+
+def get_import_chunk_size() -> int:
+    """Returns the number of CSV rows read and inserted at a time
+    when importing a randomization list.
+
+    Opt-in. Default is 0 (disabled, the list is imported at once).
+    """
+    return getattr(settings, "INTECOMM_RANDO_IMPORT_CHUNK_SIZE", 0)
+
+
+class RandomizationListImporter(BaseRandomizationListImporter):
+    """Imports a formatted randomization CSV file into model
+    RandomizationList.
+
+    If `chunk_size` is set, the file is read, validated and
+    bulk created in chunks of `chunk_size` rows in a single pass
+    in one transaction. Memory used for model instances does not
+    depend on the size of the list.
+    """
+
+    verifier_cls = RandomizationListVerifier
+
+    def __init__(self, chunk_size: int | None = None, **kwargs):
+        self.chunk_size = get_import_chunk_size() if chunk_size is None else chunk_size
+        super().__init__(**kwargs)
+
+    def _raise_on_duplicates(self) -> None:
+        # if streaming, duplicates are checked in `_import_csv_to_model`
+        if not self.chunk_size:
+            super()._raise_on_duplicates()
+
+    def _import_csv_to_model(self) -> int:
+        if not self.chunk_size:
+            return super()._import_csv_to_model()
+        with transaction.atomic():
+            return self._import_csv_to_model_in_chunks()
+
+    def _import_csv_to_model_in_chunks(self) -> int:
+        """Imports the CSV in chunks, checking for duplicate SIDs
+        as it goes, and returns the record count.
+        """
+        sids: set[int] = set()
+        rec_count = 0
+        with self.randomizationlist_path.open(mode="r") as csvfile:
+            reader = csv.DictReader(csvfile)
+            if self.sid_count_for_tests is not None:
+                reader = islice(reader, self.sid_count_for_tests)
+            with tqdm(unit=" SIDs", disable=not self.verbose) as progress:
+                while chunk := list(islice(reader, self.chunk_size)):
+                    chunk = [{k: v.strip() for k, v in row.items()} for row in chunk]
+                    for row in chunk:
+                        sid = int(row["sid"])
+                        if sid in sids:
+                            raise RandomizationListImportError(
+                                f"Invalid file. Detected duplicate SIDs. Got {sid}."
+                            )
+                        sids.add(sid)
+                    if not self.dryrun:
+                        self.bulk_create_chunk(chunk)
+                    progress.update(len(chunk))
+        if not self.dryrun:
+            rec_count = self.randomizer_model_cls.objects.all().count()
+            if not len(sids) == rec_count:
+                raise RandomizationListImportError(
+                    "Incorrect record count on import. "
+                    f"Expected {len(sids)}. Got {rec_count}."
+                )
+        else:
+            sys.stdout.write(
+                style.MIGRATE_HEADING("\n ->> this is a dry run. No changes were saved. **\n")
+            )
+        return rec_count
+
+    def bulk_create_chunk(self, chunk: list[dict]) -> None:
+        """Creates model instances for rows whose SID is not
+        already in the model.
+        """
+        existing_sids = set()
+        if self.add:
+            existing_sids = set(
+                self.randomizer_model_cls.objects.filter(
+                    sid__in=[row["sid"] for row in chunk]
+                ).values_list("sid", flat=True)
+            )
+        objs = []
+        for row in chunk:
+            if int(row["sid"]) not in existing_sids:
+                opts = self.get_import_options(row)
+                opts.update(self.get_extra_import_options(row))
+                if self.user:
+                    opts.update(user_created=self.user)
+                if self.revision:
+                    opts.update(revision=self.revision)
+                objs.append(self.randomizer_model_cls(**opts))
+        self.randomizer_model_cls.objects.bulk_create(objs)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from edc_randomization.randomization_list_verifier import (
+    RandomizationListVerifier as BaseRandomizationListVerifier,
+)
+from edc_randomization.site_randomizers import site_randomizers
+
+
+class RandomizationListVerifier(BaseRandomizationListVerifier):
+    """Verifies the Randomization List against the CSV file.
+
+    Loads the CSV file and this randomizer's model data into
+    dataframes with one query and compares sid, assignment and
+    site_name (case insensitive) column by column instead of
+    querying the model for each row.
+
+    Extra CSV columns (see `Randomizer.extra_csv_fieldnames`) are
+    not stored on the model; they are checked for presence only
+    since values, e.g. `description`, may be blank.
+    """
+
+    # number of SIDs listed for each type of mismatch
+    max_sids_in_message = 10
+
+    def verify(self) -> str | None:
+        import pandas as pd  # imported on use, slow to import
+
+        randomizer_cls = site_randomizers.get(self.randomizer_name)
+        extra_fieldnames = getattr(randomizer_cls, "extra_csv_fieldnames", None) or []
+        df_csv = pd.read_csv(
+            self.randomizationlist_path, dtype=str, keep_default_na=False
+        ).apply(lambda col: col.str.strip())
+        if self.sid_count_for_tests:
+            df_csv = df_csv.head(self.sid_count_for_tests)
+        if missing := [
+            fieldname
+            for fieldname in ["sid", "assignment", "site_name", *extra_fieldnames]
+            if fieldname not in df_csv.columns
+        ]:
+            return (
+                f"Randomization list file is missing columns {missing}. See file "
+                f"{self.randomizationlist_path}. Resolve this issue before using the system."
+            )
+        df_model = pd.DataFrame.from_records(
+            self.randomizer_model_cls.objects.filter(randomizer_name=self.randomizer_name)
+            .values_list("sid", "assignment", "site_name")
+            .order_by("sid"),
+            columns=["sid", "assignment", "site_name"],
+        )
+        df_model["sid"] = df_model["sid"].astype(str)
+        df_csv["site_name"] = df_csv["site_name"].str.lower()
+        df_model["site_name"] = df_model["site_name"].str.lower()
+        df = df_csv.merge(
+            df_model, on="sid", how="outer", suffixes=("_csv", "_model"), indicator=True
+        )
+        both = df["_merge"] == "both"
+        mismatches = {
+            "SIDs not in model": df[df["_merge"] == "left_only"]["sid"],
+            "SIDs not in file": df[df["_merge"] == "right_only"]["sid"],
+            "invalid assignment in file": df_csv[
+                ~df_csv["assignment"].isin(list(self.assignment_map))
+            ]["sid"],
+            "assignment does not match": df[
+                both & (df["assignment_csv"] != df["assignment_model"])
+            ]["sid"],
+            "site_name does not match": df[
+                both & (df["site_name_csv"] != df["site_name_model"])
+            ]["sid"],
+        }
+        if errors := [
+            f"{label} (n={len(sids)}): {', '.join(sids.head(self.max_sids_in_message))}"
+            for label, sids in mismatches.items()
+            if len(sids)
+        ]:
+            return (
+                "Randomization list does not match model. File data does not match "
+                f"model data. See file {self.randomizationlist_path}. "
+                f"Resolve this issue before using the system. Got {'; '.join(errors)}."
+            )
+        return None
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import logging
+import time
 from datetime import datetime
 from typing import TYPE_CHECKING, Tuple, Type
 
 from django.apps import apps as django_apps
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import DatabaseError, connection, transaction
 from edc_constants.constants import COMPLETE, YES
 from edc_randomization.constants import RANDOMIZED
 from edc_randomization.site_randomizers import site_randomizers
@@ -14,10 +16,18 @@ from edc_sites import site_sites
 from edc_utils import get_utcnow
 from intecomm_form_validators import IN_FOLLOWUP
 
-from .constants import UGANDA
+from .assignment_cache import assignment_cache
+from .constants import TANZANIA, UGANDA
 from .exceptions import GroupAlreadyRandomized, GroupRandomizationError
 from .group_eligibility import assess_group_eligibility
 from .group_identifier import GroupIdentifier
+from .instrumentation import instrument, retry_counter
+from .retry import (
+    get_backoff_seconds,
+    get_randomize_max_attempts,
+    get_transient_error_reason,
+)
+from .utils import put_newly_randomized_group_on_schedule, update_with_history
 
 if TYPE_CHECKING:
     from intecomm_consent.models import SubjectConsentTz, SubjectConsentUg
@@ -25,15 +35,94 @@ if TYPE_CHECKING:
 
     from .models import RandomizationList
 
+logger = logging.getLogger(__name__)
+
+
+def randomize_and_schedule_group(
+    instance: PatientGroup,
+    randomize_group_cls: Type[RandomizeGroup] | None = None,
+    skip_get_current_site: bool | None = None,
+) -> RandomizeGroup:
+    """Randomizes a patient group and puts its patients on
+    schedule.
+
+    Called by the post_save signal and by BulkRandomizer.
+    """
+    rando = (randomize_group_cls or RandomizeGroup)(instance)
+    rando.randomize_group()
+
+    subject_identifiers = [patient.subject_identifier for patient in instance.patients.all()]
+    assignment_cache.invalidate_subjects(subject_identifiers)
+    assignment_cache.invalidate_group(instance.group_identifier)
+
+    with instrument("schedule", group_identifier_as_pk=instance.group_identifier_as_pk):
+        put_newly_randomized_group_on_schedule(
+            subject_identifiers,
+            rando.randomization_list_obj,
+            skip_get_current_site=skip_get_current_site,
+        )
+    return rando
+
+
+class SubjectConsentModelResolver:
+    """Maps a site to the subject consent model for the site's
+    country.
+
+    Each site is resolved once and the model class reused.
+    """
+
+    default_model = "intecomm_consent.subjectconsenttz"
+
+    def __init__(self, models: dict[str, str] | None = None):
+        self.models = models or {
+            UGANDA: "intecomm_consent.subjectconsentug",
+            TANZANIA: "intecomm_consent.subjectconsenttz",
+        }
+        self._model_cls_by_site: dict[int, Type[SubjectConsentUg, SubjectConsentTz]] = {}
+
+    def get(self, site: Site) -> Type[SubjectConsentUg, SubjectConsentTz]:
+        try:
+            return self._model_cls_by_site[site.id]
+        except KeyError:
+            country = site_sites.get(site.id).country
+            model_cls = django_apps.get_model(self.models.get(country, self.default_model))
+            self._model_cls_by_site[site.id] = model_cls
+            return model_cls
+
+    def clear(self) -> None:
+        self._model_cls_by_site = {}
+
+
+subject_consent_model_resolver = SubjectConsentModelResolver()
+
 
 class RandomizeGroup:
     min_group_size = 14
+    patient_log_model = "intecomm_screening.patientlog"
     subject_consent_model = "intecomm_consent.subjectconsent"
+    randomize_update_fields = [
+        "group_identifier",
+        "randomized",
+        "randomized_datetime",
+        "modified",
+        "status",
+    ]
 
     def __init__(self, instance: PatientGroup):
+        self._randomization_list_obj = None
         self.instance = instance
 
     def randomize_group(self) -> Tuple[bool, datetime, str, str]:
+        """Assesses, randomizes and updates the group and its
+        patients.
+
+        Stages are timed if instrumentation is enabled (see
+        `instrumentation.instrument`).
+        """
+        with self.instrument("randomize_group"):
+            return self._randomize_group()
+
+    def _randomize_group(self) -> Tuple[bool, datetime, str, str]:
         if self.instance.randomized:
             raise GroupAlreadyRandomized(f"Group is already randomized. Got {self.instance}.")
         if (
@@ -48,107 +137,231 @@ class RandomizeGroup:
         if self.instance.status != COMPLETE:
             raise GroupRandomizationError(f"Group is not complete. Got {self.instance}.")
 
-        assess_group_eligibility(self.instance, called_by_rando=True)
+        with self.instrument("eligibility"):
+            assess_group_eligibility(self.instance, called_by_rando=True)
 
         self.randomize()
 
         return True, get_utcnow(), self.instance.user_modified, self.instance.group_identifier
 
     def randomize(self) -> None:
-        identifier_instance = GroupIdentifier(
-            identifier_type="patient_group",
-            group_identifier_as_pk=self.instance.group_identifier_as_pk,
-            requesting_model=self.instance._meta.label_lower,
-            site=self.instance.site,
-        )
+        """Randomizes the group in a transaction (a savepoint if
+        already in one).
+
+        Retried on transient errors, such as a deadlock or a
+        conflict on the SID, up to
+        `INTECOMM_RANDO_RANDOMIZE_MAX_ATTEMPTS`. Retries are
+        counted by reason in `instrumentation.retry_counter`.
+
+        In a transaction, the retry is immediate and excludes
+        errors that can only be retried in a new transaction (see
+        `get_transient_error_reason`). Otherwise the retry waits
+        for a jittered backoff, after the transaction has ended.
+        """
+        max_attempts = get_randomize_max_attempts()
+        in_savepoint = connection.in_atomic_block
+        initial = {fld: getattr(self.instance, fld) for fld in self.randomize_update_fields}
+        for attempt in range(1, max_attempts + 1):
+            try:
+                with transaction.atomic():
+                    self._randomize()
+            except DatabaseError as e:
+                reason = get_transient_error_reason(e, in_savepoint=in_savepoint)
+                if not reason or attempt >= max_attempts:
+                    raise
+                for fld, value in initial.items():
+                    setattr(self.instance, fld, value)
+                retry_counter.increment(reason)
+                logger.warning(
+                    "Randomization of group %s failed (%s). Retrying, attempt %s of %s.",
+                    self.instance.group_identifier_as_pk,
+                    reason,
+                    attempt + 1,
+                    max_attempts,
+                    extra=dict(
+                        group_identifier_as_pk=self.instance.group_identifier_as_pk,
+                        reason=reason,
+                        attempt=attempt,
+                    ),
+                )
+                if not in_savepoint:
+                    # locks are released, the transaction has ended
+                    time.sleep(get_backoff_seconds(attempt))
+            else:
+                return
+
+    def _randomize(self) -> None:
+        self._randomization_list_obj = None
+        with self.instrument("group_identifier"):
+            identifier_instance = GroupIdentifier(
+                identifier_type="patient_group",
+                group_identifier_as_pk=self.instance.group_identifier_as_pk,
+                requesting_model=self.instance._meta.label_lower,
+                site=self.instance.site,
+            )
         report_datetime = get_utcnow()
-        site_randomizers.randomize(
-            "default",
-            identifier=identifier_instance.identifier,
-            report_datetime=report_datetime,
-            site=self.instance.site,
-            user=self.instance.user_created,
-        )
-        self.instance.group_identifier = identifier_instance.identifier
-        self.instance.randomized = True
-        self.instance.randomized_datetime = report_datetime
-        self.instance.modified = report_datetime
-        self.instance.status = IN_FOLLOWUP
-        self.instance.save(
-            update_fields=[
-                "group_identifier",
-                "randomized",
-                "randomized_datetime",
-                "modified",
-                "status",
-            ]
-        )
-        self.instance.refresh_from_db()
-        self.update_patient_logs_and_consents()
+        with self.instrument("allocation"):
+            site_randomizers.randomize(
+                "default",
+                identifier=identifier_instance.identifier,
+                report_datetime=report_datetime,
+                site=self.instance.site,
+                user=self.instance.user_created,
+            )
+        with self.instrument("patient_updates"):
+            self.instance.group_identifier = identifier_instance.identifier
+            self.instance.randomized = True
+            self.instance.randomized_datetime = report_datetime
+            self.instance.modified = report_datetime
+            self.instance.status = IN_FOLLOWUP
+            self.instance.save(update_fields=self.randomize_update_fields)
+            self.update_patient_logs_and_consents()
+
+    def instrument(self, stage: str):
+        return instrument(stage, group_identifier_as_pk=self.instance.group_identifier_as_pk)
 
     @property
     def randomization_list_obj(self) -> RandomizationList:
-        return get_object_for_subject(
-            self.instance.group_identifier,
-            "default",
-            identifier_fld="group_identifier",
-            label="group",
-        )
+        """Returns the allocated RandomizationList instance for
+        this group.
+
+        Fetched once per randomization and reused by the patient
+        updates and post-randomization scheduling.
+        """
+        if not self._randomization_list_obj:
+            self._randomization_list_obj = get_object_for_subject(
+                self.instance.group_identifier,
+                "default",
+                identifier_fld="group_identifier",
+                label="group",
+            )
+        return self._randomization_list_obj
 
     def update_patient_logs_and_consents(self):
-        for patient in self.instance.patients.all():
-            self._update_all_for_one_patient(patient, skip_lookup=True)
+        """Propagates the group identifier and SID to all patients
+        in the group.
 
-    def _update_all_for_one_patient(self, patient: PatientLog, skip_lookup: bool = None):
-        if not skip_lookup:
-            try:
-                patient = self.instance.patients.get(
-                    subject_identifier=patient.subject_identifier
-                )
-            except ObjectDoesNotExist:
-                raise GroupRandomizationError(
-                    f"Patient not in group. See group {self.instance.name}. Got {patient}."
-                )
-        self.update_patient_log(patient)
-        self.update_subject_consent(patient)
-        self.update_registered_subject(patient)
+        Updates are set-based; the number of queries per model is
+        fixed regardless of the number of patients in the group.
+        Audit fields are set and, for models with HistoricalRecords,
+        history is written in bulk (see `update_with_history`).
+        """
+        patients_by_site = self.get_patients_by_site()
+        subject_identifiers = [
+            subject_identifier
+            for site_subject_identifiers in patients_by_site.values()
+            for _, subject_identifier in site_subject_identifiers
+        ]
+        self.bulk_update_patient_logs(subject_identifiers)
+        self.bulk_update_subject_consents(patients_by_site)
+        self.bulk_update_registered_subjects(patients_by_site)
+        self.bulk_update_or_create_subject_randomizations(patients_by_site)
 
-    def update_patient_log(self, patient_log: PatientLog):
-        patient_log.group_identifier = self.instance.group_identifier
-        patient_log.save(update_fields=["group_identifier"])
+    def get_patients_by_site(self) -> dict[int, list[tuple[Site, str]]]:
+        """Returns a dict of [(site, subject_identifier), ...] by
+        site id for patients in the group.
 
-    def update_subject_consent(self, patient_log: PatientLog):
-        subject_consent = self.subject_consent_model_cls(patient_log.site).objects.get(
-            subject_identifier=patient_log.subject_identifier
-        )
-        subject_consent.group_identifier = self.instance.group_identifier
-        subject_consent.save(update_fields=["group_identifier"])
+        Uses prefetched patients, if any (see BulkRandomizer).
+        """
+        patients_by_site: dict[int, list[tuple[Site, str]]] = {}
+        if "patients" in (getattr(self.instance, "_prefetched_objects_cache", None) or {}):
+            patients = self.instance.patients.all()
+        else:
+            patients = self.instance.patients.select_related("site")
+        for patient in patients:
+            patients_by_site.setdefault(patient.site.id, []).append(
+                (patient.site, patient.subject_identifier)
+            )
+        return patients_by_site
 
-    def update_registered_subject(self, patient_log: PatientLog):
-        randomization_datetime = self.randomization_list_obj.allocated_datetime
-        rs_obj = RegisteredSubject.objects.get(
-            subject_identifier=patient_log.subject_identifier
+    def bulk_update_patient_logs(self, subject_identifiers: list[str]) -> None:
+        updated = update_with_history(
+            self.patient_log_model_cls.objects.filter(
+                subject_identifier__in=subject_identifiers
+            ),
+            user_modified=self.instance.user_modified,
+            group_identifier=self.instance.group_identifier,
         )
-        rs_obj.randomization_datetime = randomization_datetime
-        rs_obj.sid = self.randomization_list_obj.sid
-        rs_obj.registration_status = RANDOMIZED
-        rs_obj.randomization_list_model = self.randomization_list_obj._meta.label_lower
-        rs_obj.site = patient_log.site
-        rs_obj.save(
-            update_fields=[
-                "randomization_datetime",
-                "sid",
-                "registration_status",
-                "randomization_list_model",
-                "site",
+        self.raise_on_update_count(updated, subject_identifiers, "patient log")
+
+    def get_subject_identifiers_by_consent_model(
+        self, patients_by_site: dict[int, list[tuple[Site, str]]]
+    ) -> dict[Type[SubjectConsentUg, SubjectConsentTz], list[str]]:
+        """Returns a dict of [subject_identifier, ...] by subject
+        consent model class (one per country).
+        """
+        subject_identifiers_by_model: dict[Type[SubjectConsentUg, SubjectConsentTz], list] = {}
+        for site_patients in patients_by_site.values():
+            site, _ = site_patients[0]
+            subject_identifiers_by_model.setdefault(
+                self.subject_consent_model_cls(site), []
+            ).extend([subject_identifier for _, subject_identifier in site_patients])
+        return subject_identifiers_by_model
+
+    def bulk_update_subject_consents(
+        self, patients_by_site: dict[int, list[tuple[Site, str]]]
+    ) -> None:
+        for model_cls, subject_identifiers in self.get_subject_identifiers_by_consent_model(
+            patients_by_site
+        ).items():
+            updated = update_with_history(
+                model_cls.objects.filter(subject_identifier__in=subject_identifiers),
+                user_modified=self.instance.user_modified,
+                group_identifier=self.instance.group_identifier,
+            )
+            self.raise_on_update_count(
+                updated, subject_identifiers, model_cls._meta.verbose_name
+            )
+
+    def bulk_update_registered_subjects(
+        self, patients_by_site: dict[int, list[tuple[Site, str]]]
+    ) -> None:
+        randomization_list_obj = self.randomization_list_obj
+        for site_patients in patients_by_site.values():
+            site, _ = site_patients[0]
+            subject_identifiers = [
+                subject_identifier for _, subject_identifier in site_patients
             ]
+            updated = update_with_history(
+                RegisteredSubject.objects.filter(subject_identifier__in=subject_identifiers),
+                user_modified=self.instance.user_modified,
+                randomization_datetime=randomization_list_obj.allocated_datetime,
+                sid=randomization_list_obj.sid,
+                registration_status=RANDOMIZED,
+                randomization_list_model=randomization_list_obj._meta.label_lower,
+                site=site,
+            )
+            self.raise_on_update_count(updated, subject_identifiers, "registered subject")
+
+    def bulk_update_or_create_subject_randomizations(
+        self, patients_by_site: dict[int, list[tuple[Site, str]]]
+    ) -> None:
+        django_apps.get_model(
+            "intecomm_rando.subjectrandomization"
+        ).objects.bulk_update_or_create(
+            self.randomization_list_obj,
+            [
+                patient
+                for site_patients in patients_by_site.values()
+                for patient in site_patients
+            ],
         )
 
+    def raise_on_update_count(
+        self, updated: int, subject_identifiers: list[str], label: str
+    ) -> None:
+        if updated != len(subject_identifiers):
+            raise GroupRandomizationError(
+                f"Unable to update {label} for all patients in group. "
+                f"See group {self.instance.name}. "
+                f"Expected {len(subject_identifiers)}. Got {updated}."
+            )
+
+    @property
+    def patient_log_model_cls(self) -> Type[PatientLog]:
+        return django_apps.get_model(self.patient_log_model)
+
     def subject_consent_model_cls(
         self, site: Site
     ) -> Type[SubjectConsentUg, SubjectConsentTz]:
-        single_site = site_sites.get(site.id)
-        if single_site.country == UGANDA:
-            return django_apps.get_model("intecomm_consent.subjectconsentug")
-        else:
-            return django_apps.get_model("intecomm_consent.subjectconsenttz")
+        return subject_consent_model_resolver.get(site)
@@ -1,9 +1,18 @@
-from edc_constants.constants import UUID_PATTERN
+from __future__ import annotations
+
+from contextlib import contextmanager
+from threading import Lock
+
+from django.apps import apps as django_apps
+from django.db import connection, transaction
+from edc_randomization.randomizer import AllocationError
 from edc_randomization.randomizer import Randomizer as Base
 from edc_randomization.site_randomizers import site_randomizers
 
 from .constants import COMMUNITY_ARM, FACILITY_ARM
-from .models import RegisteredGroup
+from .randomization_list_importer import RandomizationListImporter
+
+allocation_lock = Lock()
 
 
 class Randomizer(Base):
@@ -23,18 +32,78 @@ class Randomizer(Base):
 
     extra_csv_fieldnames = ["description", "facility_type", "country", "version"]
 
+    # verifies the list in bulk, see RandomizationListVerifier
+    importer_cls = RandomizationListImporter
+
+    # lock the next available RandomizationList row so concurrent
+    # randomizations take different rows
+    skip_locked: bool = True
+
     def __init__(self, **kwargs):
         kwargs["identifier_attr"] = "group_identifier"
         kwargs["identifier_object_name"] = "patient group"
         super().__init__(**kwargs)
 
+    def randomize(self):
+        """Randomize a group in a transaction.
+
+        See `model_obj`.
+        """
+        with self.serialize_allocation(), transaction.atomic():
+            super().randomize()
+
+    @contextmanager
+    def serialize_allocation(self):
+        """Serializes allocation within this process if the
+        database does not support SELECT ... FOR UPDATE SKIP LOCKED
+        (e.g. SQLite).
+        """
+        if self.skip_locked and not connection.features.has_select_for_update_skip_locked:
+            with allocation_lock:
+                yield
+        else:
+            yield
+
+    @property
+    def model_obj(self):
+        """Returns a RandomizationList instance by selecting the
+        next available SID.
+
+        If `skip_locked`, the row is locked with
+        `select_for_update(skip_locked=True)`, where supported, so
+        that concurrent randomizations skip rows already taken
+        instead of selecting the same row.
+        """
+        if not self._model_obj and self.skip_locked:
+            if self.model_cls().objects.filter(**self.identifier_opts).exists():
+                return super().model_obj  # raises AlreadyRandomized
+            opts = dict(site_name=self.site.name, **self.extra_model_obj_options)
+            queryset = (
+                self.model_cls()
+                .objects.filter(**{f"{self.identifier_attr}__isnull": True}, **opts)
+                .order_by("sid")
+            )
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            self._model_obj = queryset.first()
+            if not self._model_obj:
+                fld_str = ", ".join([f"{k}=`{v}`" for k, v in opts.items()])
+                raise AllocationError(
+                    f"Randomization failed. No additional SIDs available for {fld_str}."
+                )
+        return super().model_obj
+
     @classmethod
     def get_registration_model_cls(cls):
-        return RegisteredGroup
+        return django_apps.get_model("intecomm_rando.registeredgroup")
 
     def get_unallocated_registration_obj(self):
+        """Returns an unallocated RegisteredGroup or raises.
+
+        `registration_status` is set to RANDOMIZED by `randomize`.
+        """
         return self.get_registration_model_cls().objects.get(
-            **dict(sid__regex=UUID_PATTERN.pattern), **self.identifier_opts
+            registration_status__isnull=True, **self.identifier_opts
         )
 
 
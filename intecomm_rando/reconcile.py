@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple, Type
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet, Subquery
+from edc_randomization.constants import RANDOMIZED
+from edc_randomization.site_randomizers import site_randomizers
+from edc_registration.models import RegisteredSubject
+
+from .utils import update_with_history
+
+if TYPE_CHECKING:
+    from intecomm_consent.models import SubjectConsentTz, SubjectConsentUg
+    from intecomm_screening.models import PatientGroupRando, PatientLog
+
+    from .models import RandomizationList, RegisteredGroup, SubjectRandomization
+
+
+class Expected(NamedTuple):
+    """The randomization expected for a patient of a randomized
+    group.
+    """
+
+    group_identifier: str
+    sid: int | None
+    assignment: str | None
+    allocated_datetime: datetime | None
+    site_id: int
+
+
+class RandomizationReconciler:
+    """Finds and repairs patients of randomized groups whose
+    PatientLog, subject consent, RegisteredSubject or
+    SubjectRandomization does not reflect the group's
+    randomization.
+
+    A group is randomized if its RegisteredGroup is RANDOMIZED. The
+    expected group identifier, SID, assignment and randomization
+    datetime are taken from the RegisteredGroup and the allocated
+    RandomizationList.
+
+    The patients of all randomized groups and their expected values
+    are read in one query (see `get_expected`). Each model is then
+    read once, `chunk_size` subjects per query, and compared in
+    memory. Each repair is one update per group, with the audit
+    fields and history set.
+    """
+
+    patient_group_model = "intecomm_screening.patientgrouprando"
+    patient_log_model = "intecomm_screening.patientlog"
+    registered_group_model = "intecomm_rando.registeredgroup"
+    subject_randomization_model = "intecomm_rando.subjectrandomization"
+    subject_consent_models = [
+        "intecomm_consent.subjectconsentug",
+        "intecomm_consent.subjectconsenttz",
+    ]
+    randomizer_name = "default"
+    chunk_size = 500
+    # set on randomization, see `get_registered_subject_values`
+    registered_subject_fields = [
+        "randomization_datetime",
+        "sid",
+        "registration_status",
+        "randomization_list_model",
+        "site",
+    ]
+
+    @property
+    def patient_group_model_cls(self) -> Type[PatientGroupRando]:
+        return django_apps.get_model(self.patient_group_model)
+
+    @property
+    def patient_log_model_cls(self) -> Type[PatientLog]:
+        return django_apps.get_model(self.patient_log_model)
+
+    @property
+    def registered_group_model_cls(self) -> Type[RegisteredGroup]:
+        return django_apps.get_model(self.registered_group_model)
+
+    @property
+    def subject_randomization_model_cls(self) -> Type[SubjectRandomization]:
+        return django_apps.get_model(self.subject_randomization_model)
+
+    @property
+    def subject_consent_model_clss(self) -> list[Type[SubjectConsentUg, SubjectConsentTz]]:
+        return [django_apps.get_model(model) for model in self.subject_consent_models]
+
+    @property
+    def randomization_list_model_cls(self) -> Type[RandomizationList]:
+        return site_randomizers.get(self.randomizer_name).model_cls()
+
+    def get_randomized_groups(self) -> QuerySet[PatientGroupRando]:
+        """Returns patient groups with a RANDOMIZED RegisteredGroup
+        annotated with the expected group identifier, SID,
+        assignment and allocated datetime.
+        """
+        registered_group = self.registered_group_model_cls.objects.filter(
+            group_identifier_as_pk=OuterRef("group_identifier_as_pk"),
+            registration_status=RANDOMIZED,
+        )
+        randomization_list = self.randomization_list_model_cls.objects.filter(
+            group_identifier=OuterRef("expected_group_identifier"), allocated=True
+        )
+        return (
+            self.patient_group_model_cls.objects.annotate(
+                expected_group_identifier=Subquery(
+                    registered_group.values("group_identifier")[:1]
+                )
+            )
+            .filter(expected_group_identifier__isnull=False)
+            .annotate(
+                expected_sid=Subquery(randomization_list.values("sid")[:1]),
+                expected_assignment=Subquery(randomization_list.values("assignment")[:1]),
+                expected_allocated_datetime=Subquery(
+                    randomization_list.values("allocated_datetime")[:1]
+                ),
+            )
+        )
+
+    def get_expected(self) -> dict[str, Expected]:
+        """Returns the expected randomization by subject identifier
+        for the patients of randomized groups.
+        """
+        return {
+            subject_identifier: Expected(*values)
+            for subject_identifier, *values in self.get_randomized_groups()
+            .filter(patients__subject_identifier__isnull=False)
+            .values_list(
+                "patients__subject_identifier",
+                "expected_group_identifier",
+                "expected_sid",
+                "expected_assignment",
+                "expected_allocated_datetime",
+                "patients__site_id",
+            )
+        }
+
+    def get_values(
+        self, model_cls, subject_identifiers: Iterable[str], *fields: str
+    ) -> Iterator[tuple]:
+        """Yields (subject_identifier, *fields) for the subjects,
+        one query per `chunk_size` subjects.
+        """
+        subject_identifiers = list(subject_identifiers)
+        for i in range(0, len(subject_identifiers), self.chunk_size):
+            yield from model_cls.objects.filter(
+                subject_identifier__in=subject_identifiers[i : i + self.chunk_size]
+            ).values_list("subject_identifier", *fields)
+
+    def get_patient_logs(self, expected: dict[str, Expected]) -> list[str]:
+        return self.get_without_group_identifier(self.patient_log_model_cls, expected)
+
+    def get_subject_consents(
+        self,
+        model_cls: Type[SubjectConsentUg, SubjectConsentTz],
+        expected: dict[str, Expected],
+    ) -> list[str]:
+        return self.get_without_group_identifier(model_cls, expected)
+
+    def get_without_group_identifier(
+        self, model_cls, expected: dict[str, Expected]
+    ) -> list[str]:
+        return sorted(
+            subject_identifier
+            for subject_identifier, group_identifier in self.get_values(
+                model_cls, expected, "group_identifier"
+            )
+            if group_identifier != expected[subject_identifier].group_identifier
+        )
+
+    def get_registered_subjects(self, expected: dict[str, Expected]) -> list[str]:
+        """Returns the subjects whose RegisteredSubject does not have
+        the values set on randomization (see
+        `RandomizeGroup.bulk_update_registered_subjects`).
+        """
+        allocated = {k: v for k, v in expected.items() if v.sid is not None}
+        return sorted(
+            subject_identifier
+            for subject_identifier, *values in self.get_values(
+                RegisteredSubject, allocated, *self.registered_subject_fields
+            )
+            if values != self.get_registered_subject_values(allocated[subject_identifier])
+        )
+
+    def get_registered_subject_values(self, group: Expected) -> list:
+        """Returns the expected values of `registered_subject_fields`."""
+        return [
+            group.allocated_datetime,
+            str(group.sid),
+            RANDOMIZED,
+            self.randomization_list_model_cls._meta.label_lower,
+            group.site_id,
+        ]
+
+    def get_subject_randomizations(self, expected: dict[str, Expected]) -> list[str]:
+        """Returns the subjects whose SubjectRandomization is missing
+        or does not match the group's randomization.
+        """
+        allocated = {k: v for k, v in expected.items() if v.sid is not None}
+        found = {
+            subject_identifier: values
+            for subject_identifier, *values in self.get_values(
+                self.subject_randomization_model_cls,
+                allocated,
+                "group_identifier",
+                "sid",
+                "allocated_datetime",
+            )
+        }
+        return sorted(
+            subject_identifier
+            for subject_identifier, v in allocated.items()
+            if found.get(subject_identifier)
+            != [v.group_identifier, v.sid, v.allocated_datetime]
+        )
+
+    def get_unallocated_groups(self) -> QuerySet[RegisteredGroup]:
+        """Returns RANDOMIZED groups without an allocated
+        RandomizationList row. Not repairable.
+        """
+        return self.registered_group_model_cls.objects.filter(
+            registration_status=RANDOMIZED
+        ).exclude(
+            Exists(
+                self.randomization_list_model_cls.objects.filter(
+                    group_identifier=OuterRef("group_identifier"), allocated=True
+                )
+            )
+        )
+
+    def get_unregistered_allocations(self) -> QuerySet[RandomizationList]:
+        """Returns allocated RandomizationList rows without a
+        RANDOMIZED group. Not repairable.
+        """
+        return self.randomization_list_model_cls.objects.filter(allocated=True).exclude(
+            Exists(
+                self.registered_group_model_cls.objects.filter(
+                    group_identifier=OuterRef("group_identifier"),
+                    registration_status=RANDOMIZED,
+                )
+            )
+        )
+
+    def inconsistencies(self) -> dict[str, list[str]]:
+        """Returns a dict of subject or group identifiers by
+        inconsistency.
+        """
+        expected = self.get_expected()
+        return {
+            "patient log": self.get_patient_logs(expected),
+            **{
+                model_cls._meta.label_lower: self.get_subject_consents(model_cls, expected)
+                for model_cls in self.subject_consent_model_clss
+            },
+            "registered subject": self.get_registered_subjects(expected),
+            "subject randomization": self.get_subject_randomizations(expected),
+            "unallocated group": list(
+                self.get_unallocated_groups().values_list("group_identifier", flat=True)
+            ),
+            "unregistered allocation": list(
+                self.get_unregistered_allocations().values_list("group_identifier", flat=True)
+            ),
+        }
+
+    @transaction.atomic
+    def repair(self, user_modified: str) -> dict[str, int]:
+        """Updates the repairable inconsistencies and returns the
+        number of rows updated by model.
+
+        `user_modified` is set on each row updated, e.g. the user
+        or the name of the management command.
+        """
+        expected = self.get_expected()
+        updated = {
+            "patient log": self.repair_group_identifier(
+                self.patient_log_model_cls,
+                self.get_patient_logs(expected),
+                expected,
+                user_modified,
+            )
+        }
+        for model_cls in self.subject_consent_model_clss:
+            updated[model_cls._meta.label_lower] = self.repair_group_identifier(
+                model_cls,
+                self.get_subject_consents(model_cls, expected),
+                expected,
+                user_modified,
+            )
+        updated["registered subject"] = self.repair_registered_subjects(
+            self.get_registered_subjects(expected), expected, user_modified
+        )
+        updated["subject randomization"] = self.repair_subject_randomizations(
+            self.get_subject_randomizations(expected), expected, user_modified
+        )
+        return updated
+
+    def repair_group_identifier(
+        self,
+        model_cls,
+        subject_identifiers: list[str],
+        expected: dict[str, Expected],
+        user_modified: str,
+    ) -> int:
+        updated = 0
+        for group, subject_identifiers in self.by_group(subject_identifiers, expected).items():
+            updated += update_with_history(
+                model_cls.objects.filter(subject_identifier__in=subject_identifiers),
+                user_modified=user_modified,
+                group_identifier=group.group_identifier,
+            )
+        return updated
+
+    def repair_registered_subjects(
+        self, subject_identifiers: list[str], expected: dict[str, Expected], user_modified: str
+    ) -> int:
+        updated = 0
+        for group, subject_identifiers in self.by_group(subject_identifiers, expected).items():
+            updated += update_with_history(
+                RegisteredSubject.objects.filter(subject_identifier__in=subject_identifiers),
+                user_modified=user_modified,
+                **dict(
+                    zip(
+                        self.registered_subject_fields,
+                        self.get_registered_subject_values(group),
+                    )
+                ),
+            )
+        return updated
+
+    def repair_subject_randomizations(
+        self, subject_identifiers: list[str], expected: dict[str, Expected], user_modified: str
+    ) -> int:
+        """Creates or updates the rows, one insert per `chunk_size`
+        subjects.
+        """
+        manager = self.subject_randomization_model_cls.objects
+        assignments = {}
+        for i in range(0, len(subject_identifiers), self.chunk_size):
+            objs = []
+            for subject_identifier in subject_identifiers[i : i + self.chunk_size]:
+                group = expected[subject_identifier]
+                if group.assignment not in assignments:
+                    assignments[group.assignment] = manager.encrypt_assignment(
+                        group.assignment
+                    )
+                objs.append(
+                    manager.model(
+                        subject_identifier=subject_identifier,
+                        group_identifier=group.group_identifier,
+                        sid=group.sid,
+                        assignment=assignments[group.assignment],
+                        allocated_datetime=group.allocated_datetime,
+                        site_id=group.site_id,
+                    )
+                )
+            manager.bulk_upsert(objs, user_modified=user_modified)
+        return len(subject_identifiers)
+
+    @staticmethod
+    def by_group(
+        subject_identifiers: list[str], expected: dict[str, Expected]
+    ) -> dict[Expected, list[str]]:
+        """Returns the subject identifiers grouped by their expected
+        randomization, i.e. by group.
+        """
+        groups = defaultdict(list)
+        for subject_identifier in subject_identifiers:
+            groups[expected[subject_identifier]].append(subject_identifier)
+        return groups
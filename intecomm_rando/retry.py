@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import random
+import re
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError
+
+# SQLSTATE (PostgreSQL) and error codes (MySQL) of transient errors
+TRANSIENT_SQLSTATES = {"40001": "serialization_failure", "40P01": "deadlock"}
+TRANSIENT_MYSQL_ERROR_CODES = {1205: "lock_timeout", 1213: "deadlock"}
+
+# errors that roll back (MySQL deadlock) or depend on the snapshot
+# of (serialization failure) the whole transaction. Not retried in
+# a savepoint.
+TOP_LEVEL_ONLY_SQLSTATES = ["40001"]
+TOP_LEVEL_ONLY_MYSQL_ERROR_CODES = [1213]
+
+UNIQUE_VIOLATION_SQLSTATE = "23505"
+
+# unique fields that may be hit by concurrent randomizations
+# (group identifier or SID allocation)
+TRANSIENT_UNIQUE_FIELDS = [
+    ("intecomm_rando.randomizationlist", "sid"),
+    ("intecomm_rando.randomizationlist", "group_identifier"),
+    ("intecomm_rando.registeredgroup", "sid"),
+    ("intecomm_rando.registeredgroup", "group_identifier"),
+]
+
+
+def get_randomize_max_attempts() -> int:
+    """Returns the number of times a group randomization is
+    attempted before a transient database error is raised.
+
+    Default is 3.
+    """
+    return getattr(settings, "INTECOMM_RANDO_RANDOMIZE_MAX_ATTEMPTS", 3)
+
+
+def get_randomize_retry_backoff() -> float:
+    """Returns the base backoff (seconds) between attempts.
+
+    Default is 0.1.
+    """
+    return getattr(settings, "INTECOMM_RANDO_RANDOMIZE_RETRY_BACKOFF", 0.1)
+
+
+def get_backoff_seconds(attempt: int) -> float:
+    """Returns a random backoff (full jitter) that doubles with
+    each attempt.
+    """
+    return random.uniform(0, get_randomize_retry_backoff() * 2 ** (attempt - 1))
+
+
+def get_transient_integrity_error_pattern() -> re.Pattern:
+    """Returns a pattern matching a unique violation on one of
+    `TRANSIENT_UNIQUE_FIELDS` in the error message.
+
+    Matches the table qualified column (SQLite, MySQL 8) or the
+    constraint name (PostgreSQL), e.g. `<table>.sid` or
+    `<table>_sid_key`.
+    """
+    names = [
+        rf"{re.escape(django_apps.get_model(model)._meta.db_table)}[._]{column}"
+        for model, column in TRANSIENT_UNIQUE_FIELDS
+    ]
+    return re.compile(rf"(?:{'|'.join(names)})(?:_key|_[0-9a-f]{{8}}_uniq)?(?![a-z0-9_])")
+
+
+def get_transient_error_reason(
+    e: DatabaseError, in_savepoint: bool | None = None
+) -> str | None:
+    """Returns the reason a database error is transient, or None
+    if it should not be retried.
+
+    If `in_savepoint`, errors that can only be retried in a new
+    transaction are not transient.
+    """
+    cause = e.__cause__
+    sqlstate = getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)
+    if isinstance(e, IntegrityError):
+        if sqlstate and sqlstate != UNIQUE_VIOLATION_SQLSTATE:
+            return None
+        if get_transient_integrity_error_pattern().search(str(e)):
+            return "integrity_error"
+        return None
+    if sqlstate:
+        if in_savepoint and sqlstate in TOP_LEVEL_ONLY_SQLSTATES:
+            return None
+        return TRANSIENT_SQLSTATES.get(sqlstate)
+    if args := getattr(cause, "args", None):
+        if in_savepoint and args[0] in TOP_LEVEL_ONLY_MYSQL_ERROR_CODES:
+            return None
+        if reason := TRANSIENT_MYSQL_ERROR_CODES.get(args[0]):
+            return reason
+    if "database is locked" in str(e) or "database table is locked" in str(e):
+        return "database_locked"
+    return None
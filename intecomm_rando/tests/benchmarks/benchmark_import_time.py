@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from .utils import (
+    get_benchmark_tolerance,
+    read_baselines,
+    update_baselines,
+    write_baselines,
+)
+
+# modules that importing intecomm_rando should not load
+heavy_modules = [
+    "pandas",
+    "intecomm_form_validators",
+    "edc_randomization.utils",
+    "intecomm_rando.randomize_group",
+]
+
+script = """
+import json, os, sys, time
+sys.argv = ["runtests.py"]
+os.environ["DJANGO_SETTINGS_MODULE"] = "intecomm_rando.tests.test_settings"
+start = time.perf_counter()
+import django
+django.setup()
+django_setup = time.perf_counter() - start
+start = time.perf_counter()
+import intecomm_rando.randomizers
+randomizers = time.perf_counter() - start
+print(json.dumps(dict(
+    django_setup=django_setup,
+    randomizers=randomizers,
+    loaded=[m for m in {heavy_modules} if m in sys.modules],
+)))
+"""
+
+
+class ImportTimeBenchmarks(SimpleTestCase):
+    """Benchmarks the cost of loading intecomm_rando in a new
+    process, e.g. a management command or worker cold start.
+
+    Stages are:
+        * django_setup: `django.setup()` for the test settings;
+        * models.signals: cumulative import time of
+          `intecomm_rando.models.signals` (from `-X importtime`);
+        * randomizers: import of `intecomm_rando.randomizers`
+          after setup, as by site_randomizers.autodiscover.
+    """
+
+    def test_import_time(self):
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                script.format(heavy_modules=heavy_modules),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parents[3],
+            env={**os.environ, "PYTHONPATH": str(Path(__file__).resolve().parents[3])},
+        )
+        data = json.loads(process.stdout.strip().splitlines()[-1])
+        self.assertEqual(data["loaded"], [])
+        stages = dict(
+            django_setup=data["django_setup"],
+            randomizers=data["randomizers"],
+        )
+        for line in process.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if line.startswith("import time:") and line.endswith(
+                "| intecomm_rando.models.signals"
+            ):
+                stages["models.signals"] = int(line.split("|")[1]) / 1_000_000
+        results = {
+            "import_time": {
+                stage: dict(seconds=round(seconds, 4)) for stage, seconds in stages.items()
+            }
+        }
+        for stage, seconds in stages.items():
+            sys.stdout.write(f"{'import_time':<24}{stage:<17}{seconds:>9.4f}s\n")
+        if update_baselines():
+            write_baselines({**read_baselines(), **results})
+        elif baseline := read_baselines().get("import_time"):
+            for stage, result in results["import_time"].items():
+                with self.subTest(stage=stage):
+                    # allow 50ms for timer noise on the fast stages
+                    self.assertLessEqual(
+                        result["seconds"],
+                        baseline[stage]["seconds"] * get_benchmark_tolerance() + 0.05,
+                    )
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import sys
+from itertools import count
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.sites.models import Site
+from django.db import transaction
+from django.test import TestCase, override_settings
+from edc_appointment.models import AppointmentType
+from edc_consent.site_consents import site_consents
+from edc_constants.constants import CLINIC, COMMUNITY, COMPLETE, DM, HIV, YES
+from edc_randomization.site_randomizers import site_randomizers
+from edc_registration.models import RegisteredSubject
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+from edc_visit_schedule.site_visit_schedules import site_visit_schedules
+
+from intecomm_rando.assignment_cache import assignment_cache
+from intecomm_rando.group_eligibility import assess_group_eligibility
+from intecomm_rando.randomize_group import RandomizeGroup as BaseRandomizeGroup
+from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+from intecomm_rando.utils import put_newly_randomized_group_on_schedule
+
+from ..consents import consent_v1
+from ..models import Conditions, PatientGroup, PatientLog, SubjectConsent
+from ..visit_schedules import visit_schedule
+from .utils import (
+    get_benchmark_tolerance,
+    measure,
+    read_baselines,
+    update_baselines,
+    write_baselines,
+)
+
+# {"randomize_group.014": {stage: {"seconds": ..., "queries": ..., "peak_memory": ...}}}
+results: dict[str, dict] = {}
+
+
+class Randomizer(BaseRandomizer):
+    randomizationlist_folder = Path(__file__).resolve().parent.parent / "etc"
+
+
+class RandomizeGroup(BaseRandomizeGroup):
+    patient_log_model = "tests.patientlog"
+
+    def subject_consent_model_cls(self, site: Site):
+        return SubjectConsent
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+class RandomizeGroupBenchmarks(TestCase):
+    """Benchmarks the group randomization pipeline by group size.
+
+    Stages are:
+        * eligibility: `assess_group_eligibility` (also called by
+          `randomize_group`);
+        * randomize_group: `RandomizeGroup.randomize_group`;
+        * schedule: `put_newly_randomized_group_on_schedule`.
+
+    Groups and patients are model instances so that each stage
+    includes its queries.
+
+    Run with `python runtests.py --benchmark [--update-baselines]`.
+    """
+
+    patient_counter = count(1)
+
+    @classmethod
+    def setUpTestData(cls):
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        site_randomizers._registry = {}
+        site_randomizers.loaded = False
+        site_randomizers.register(Randomizer)
+        Randomizer.import_list(overwrite=True)
+        site_consents.registry = {}
+        site_consents.loaded = False
+        site_consents.register(consent_v1)
+        site_visit_schedules._registry = {}
+        site_visit_schedules.loaded = False
+        site_visit_schedules.register(visit_schedule)
+        for name in [DM, HIV]:
+            Conditions.objects.create(name=name)
+        for name in [COMMUNITY, CLINIC]:
+            AppointmentType.objects.create(name=name, display_name=name)
+        # warm up once so the first benchmark does not pay for
+        # first-use costs (imports, content types, etc)
+        with transaction.atomic():
+            cls.run_pipeline(14)
+            transaction.set_rollback(True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for key, stages in sorted(results.items()):
+            for stage, result in stages.items():
+                sys.stdout.write(
+                    f"{key:<24}{stage:<17}{result['seconds']:>9.4f}s"
+                    f"{result['queries']:>6} queries"
+                    f"{result['peak_memory'] / 1024:>10.0f} KiB\n"
+                )
+        if update_baselines():
+            write_baselines({**read_baselines(), **results})
+
+    def setUp(self):
+        assignment_cache.clear()
+
+    @classmethod
+    def get_patient_group(cls, size: int) -> PatientGroup:
+        """Returns a patient group of `size` eligible patients
+        with a NCD:HIV ratio of about 2.4:1.
+
+        Also creates the model instances updated by the pipeline.
+        """
+        site = Site.objects.get(id=101)
+        conditions = {obj.name: obj for obj in Conditions.objects.all()}
+        hiv = size * 10 // 34
+        patient_group = PatientGroup.objects.create(
+            site=site,
+            status=COMPLETE,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            user_created="frisco",
+        )
+        patients = []
+        for i in range(0, size):
+            index = next(cls.patient_counter)
+            subject_identifier = f"101-101-{index:04d}-2"
+            patient = PatientLog.objects.create(
+                subject_identifier=subject_identifier,
+                screening_identifier=f"XYZ{index:05d}",
+                stable=YES,
+                willing_to_screen=YES,
+                site=site,
+            )
+            patient.conditions.add(conditions[DM if i < size - hiv else HIV])
+            SubjectConsent.objects.create(subject_identifier=subject_identifier, site=site)
+            RegisteredSubject.objects.create(subject_identifier=subject_identifier, site=site)
+            patients.append(patient)
+        patient_group.patients.add(*patients)
+        return patient_group
+
+    @classmethod
+    def run_pipeline(cls, size: int) -> dict[str, dict]:
+        """Returns the results for each stage for a group of
+        `size` patients.
+        """
+        stages = {}
+        patient_group = cls.get_patient_group(size)
+        subject_identifiers = [p.subject_identifier for p in patient_group.patients.all()]
+        with measure(stages, "eligibility"):
+            assess_group_eligibility(patient_group, called_by_rando=True)
+        rando = RandomizeGroup(patient_group)
+        with measure(stages, "randomize_group"):
+            rando.randomize_group()
+        with patch(
+            "intecomm_rando.utils.get_onschedule_model_for_assignment",
+            return_value="edc_visit_schedule.onschedule",
+        ):
+            with measure(stages, "schedule"):
+                put_newly_randomized_group_on_schedule(
+                    subject_identifiers, rando.randomization_list_obj
+                )
+        return stages
+
+    def run_benchmark(self, size: int):
+        key = f"randomize_group.{size:03d}"
+        results[key] = self.run_pipeline(size)
+        baseline = read_baselines().get(key)
+        if update_baselines() or not baseline:
+            return
+        tolerance = get_benchmark_tolerance()
+        for stage, result in results[key].items():
+            with self.subTest(stage=stage):
+                self.assertLessEqual(result["queries"], baseline[stage]["queries"])
+                # allow 50ms for timer noise on the fast stages
+                self.assertLessEqual(
+                    result["seconds"], baseline[stage]["seconds"] * tolerance + 0.05
+                )
+                self.assertLessEqual(
+                    result["peak_memory"], baseline[stage]["peak_memory"] * tolerance
+                )
+
+    def test_group_size_14(self):
+        self.run_benchmark(14)
+
+    def test_group_size_50(self):
+        self.run_benchmark(50)
+
+    def test_group_size_100(self):
+        self.run_benchmark(100)
+
+    def test_group_size_250(self):
+        self.run_benchmark(250)
+
+    def test_group_size_500(self):
+        self.run_benchmark(500)
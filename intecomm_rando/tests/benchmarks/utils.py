@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+
+baselines_path = Path(__file__).resolve().parent / "baselines.json"
+
+
+def get_benchmark_tolerance() -> float:
+    """Returns the factor by which wall time and peak memory may
+    exceed the baseline before a benchmark fails.
+
+    Query counts must not exceed the baseline.
+    """
+    return getattr(settings, "INTECOMM_RANDO_BENCHMARK_TOLERANCE", 2.0)
+
+
+def update_baselines() -> bool:
+    """Returns True if called as
+    `runtests.py --benchmark --update-baselines`.
+    """
+    return any(t.startswith("--update-baselines") for t in sys.argv)
+
+
+def read_baselines() -> dict:
+    try:
+        with baselines_path.open() as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_baselines(baselines: dict) -> None:
+    with baselines_path.open("w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+@contextmanager
+def measure(results: dict, stage: str):
+    """Records wall time, query count and peak traced memory
+    for the enclosed block in `results[stage]`.
+
+    Wall time includes the tracemalloc overhead.
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            yield
+            seconds = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    results[stage] = dict(
+        seconds=round(seconds, 4), queries=len(ctx.captured_queries), peak_memory=peak_memory
+    )
+
+
+def run_benchmarks(django_settings_module: str, *project_benchmarks: str):
+    """Runs the benchmark*.py modules. See `runtests.py --benchmark`."""
+    os.environ["DJANGO_SETTINGS_MODULE"] = django_settings_module
+    django.setup()
+    failfast = any([True for t in sys.argv if t.startswith("--failfast")])
+    opts = dict(failfast=failfast, pattern="benchmark*.py")
+    failures = DiscoverRunner(**opts).run_tests(project_benchmarks)
+    sys.exit(failures)
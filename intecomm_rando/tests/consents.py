@@ -0,0 +1,11 @@
+from edc_consent.consent_definition import ConsentDefinition
+from edc_constants.constants import FEMALE, MALE
+from edc_protocol.research_protocol_config import ResearchProtocolConfig
+
+consent_v1 = ConsentDefinition(
+    "tests.subjectconsentv1",
+    version="1",
+    start=ResearchProtocolConfig().study_open_datetime,
+    end=ResearchProtocolConfig().study_close_datetime,
+    gender=[MALE, FEMALE],
+)
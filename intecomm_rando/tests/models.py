@@ -1,9 +1,79 @@
+from uuid import uuid4
+
 from django.db import models
+from edc_consent.managers import ConsentObjectsByCdefManager, CurrentSiteByCdefManager
+from edc_constants.constants import NO
 from edc_model.models import BaseUuidModel
 from edc_sites.model_mixins import SiteModelMixin
+from edc_utils import get_utcnow
 
 
 class SubjectConsent(SiteModelMixin, BaseUuidModel):
     group_identifier = models.CharField(max_length=50)
 
     subject_identifier = models.CharField(max_length=50, unique=True)
+
+    consent_datetime = models.DateTimeField(default=get_utcnow)
+
+    version = models.CharField(max_length=10, default="1")
+
+
+class SubjectConsentV1(SubjectConsent):
+    on_site = CurrentSiteByCdefManager()
+    objects = ConsentObjectsByCdefManager()
+
+    class Meta:
+        proxy = True
+
+
+class Conditions(models.Model):
+    name = models.CharField(max_length=25, unique=True)
+
+
+class PatientLog(SiteModelMixin, BaseUuidModel):
+    group_identifier = models.CharField(max_length=50, null=True)
+
+    subject_identifier = models.CharField(max_length=50, unique=True)
+
+    screening_identifier = models.CharField(max_length=50, null=True)
+
+    stable = models.CharField(max_length=15, default=NO)
+
+    willing_to_screen = models.CharField(max_length=15, default=NO)
+
+    conditions = models.ManyToManyField(Conditions)
+
+    def get_changelist_url(self) -> str:
+        return "changelist_url"
+
+
+class PatientGroup(SiteModelMixin, BaseUuidModel):
+    group_identifier_as_pk = models.UUIDField(default=uuid4, unique=True)
+
+    group_identifier = models.CharField(max_length=36, null=True)
+
+    status = models.CharField(max_length=25, null=True)
+
+    randomize_now = models.CharField(max_length=15, default=NO)
+
+    confirm_randomize_now = models.CharField(max_length=15, null=True)
+
+    randomized = models.BooleanField(default=False)
+
+    randomized_datetime = models.DateTimeField(null=True)
+
+    bypass_group_size_min = models.BooleanField(default=False)
+
+    bypass_group_ratio = models.BooleanField(default=False)
+
+    patients = models.ManyToManyField(PatientLog)
+
+    def save(self, *args, **kwargs):
+        if not self.group_identifier:
+            self.group_identifier = str(self.group_identifier_as_pk)
+        super().save(*args, **kwargs)
+
+
+class PatientGroupRando(PatientGroup):
+    class Meta:
+        proxy = True
@@ -11,6 +11,7 @@ project_settings = DefaultTestSettings(
     calling_file=__file__,
     BASE_DIR=base_dir,
     APP_NAME=app_name,
+    ROOT_URLCONF=f"{app_name}.tests.urls",
     SILENCED_SYSTEM_CHECKS=[
         "sites.E101",
     ],
@@ -36,14 +37,17 @@ project_settings = DefaultTestSettings(
         "edc_appointment.apps.AppConfig",
         "edc_dashboard.apps.AppConfig",
         "edc_device.apps.AppConfig",
+        "edc_facility.apps.AppConfig",
         "edc_identifier.apps.AppConfig",
         "edc_lab.apps.AppConfig",
         "edc_lab_dashboard.apps.AppConfig",
         "edc_notification.apps.AppConfig",
+        "edc_offstudy.apps.AppConfig",
         "edc_registration.apps.AppConfig",
         "edc_review_dashboard.apps.AppConfig",
         "edc_sites.apps.AppConfig",
         "edc_subject_dashboard.apps.AppConfig",
+        "edc_timepoint.apps.AppConfig",
         "edc_visit_schedule.apps.AppConfig",
         "edc_visit_tracking.apps.AppConfig",
         "intecomm_rando.tests",
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.contrib.sites.models import Site
+from django.test import TestCase, override_settings
+from edc_randomization.site_randomizers import site_randomizers
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+from edc_utils import get_utcnow
+
+from intecomm_rando.assignment_cache import AssignmentCache, assignment_cache
+from intecomm_rando.constants import COMMUNITY_ARM, FACILITY_ARM
+from intecomm_rando.models import RandomizationList
+from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+from intecomm_rando.utils import get_assignment_for_subject
+
+from ..models import PatientLog
+
+
+class AssignmentCacheTests(TestCase):
+    def test_disabled_by_default(self):
+        cache = AssignmentCache()
+        cache.set_group("G1", COMMUNITY_ARM)
+        self.assertIsNone(cache.get_group("G1"))
+        self.assertEqual(cache.info()["hits"], 0)
+
+    def test_lru(self):
+        cache = AssignmentCache(maxsize=2)
+        cache.set_group("G1", COMMUNITY_ARM)
+        cache.set_group("G2", FACILITY_ARM)
+        self.assertEqual(cache.get_group("G1"), COMMUNITY_ARM)
+        cache.set_group("G3", FACILITY_ARM)
+        self.assertIsNone(cache.get_group("G2"))
+        self.assertEqual(cache.get_group("G1"), COMMUNITY_ARM)
+        self.assertEqual(cache.get_group("G3"), FACILITY_ARM)
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(cache.misses, 1)
+
+    def test_invalidate_group_invalidates_subjects(self):
+        cache = AssignmentCache(maxsize=10)
+        cache.set_group("G1", COMMUNITY_ARM)
+        cache.set_subject("S1", "G1", COMMUNITY_ARM)
+        cache.set_subject("S2", "G2", FACILITY_ARM)
+        cache.invalidate_group("G1")
+        self.assertIsNone(cache.get_group("G1"))
+        self.assertIsNone(cache.get_subject("S1"))
+        self.assertEqual(cache.get_subject("S2"), ("G2", FACILITY_ARM))
+
+
+@override_settings(
+    SITE_ID=101,
+    EDC_SITES_AUTODISCOVER_SITES=False,
+    INTECOMM_RANDO_ASSIGNMENT_CACHE_SIZE=10,
+)
+class AssignmentCacheLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        class Randomizer(BaseRandomizer):
+            randomizationlist_folder = Path(__file__).resolve().parent.parent / "etc"
+
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        site_randomizers._registry = {}
+        site_randomizers.loaded = False
+        site_randomizers.register(Randomizer)
+
+    def setUp(self):
+        assignment_cache.clear()
+        site = Site.objects.get(id=101)
+        self.rando_obj = RandomizationList.objects.create(
+            sid=1,
+            assignment=COMMUNITY_ARM,
+            site_name="kasangati",
+            randomizer_name="default",
+            group_identifier="G1",
+            allocated=True,
+            allocated_datetime=get_utcnow(),
+            allocated_site=site,
+        )
+        PatientLog.objects.create(subject_identifier="S1", group_identifier="G1", site=site)
+
+    def test_cached(self):
+        self.assertEqual(
+            get_assignment_for_subject("S1", patient_log_model="tests.patientlog"),
+            COMMUNITY_ARM,
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_assignment_for_subject("S1", patient_log_model="tests.patientlog"),
+                COMMUNITY_ARM,
+            )
+        self.assertEqual(assignment_cache.hits, 1)
+
+    def test_invalidated_on_randomization_list_post_save(self):
+        get_assignment_for_subject("S1", patient_log_model="tests.patientlog")
+        self.rando_obj.assignment = FACILITY_ARM
+        self.rando_obj.save()
+        self.assertIsNone(assignment_cache.get_subject("S1"))
+        self.assertEqual(
+            get_assignment_for_subject("S1", patient_log_model="tests.patientlog"),
+            FACILITY_ARM,
+        )
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.sites.models import Site
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from edc_constants.constants import COMPLETE, DM, HIV, YES
+from edc_randomization.site_randomizers import site_randomizers
+from edc_registration.models import RegisteredSubject
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+
+from intecomm_rando.bulk_randomize import BulkRandomizer as BaseBulkRandomizer
+from intecomm_rando.models import RandomizationList
+from intecomm_rando.randomize_group import RandomizeGroup as BaseRandomizeGroup
+from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+
+from ..models import Conditions, PatientGroup, PatientLog, SubjectConsent
+
+
+class RandomizeGroup(BaseRandomizeGroup):
+    patient_log_model = "tests.patientlog"
+
+    def subject_consent_model_cls(self, site: Site):
+        return SubjectConsent
+
+
+class BulkRandomizer(BaseBulkRandomizer):
+    patient_group_model = "tests.patientgroup"
+    randomize_group_cls = RandomizeGroup
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+@patch("intecomm_rando.randomize_group.put_newly_randomized_group_on_schedule")
+class BulkRandomizeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        class Randomizer(BaseRandomizer):
+            randomizationlist_folder = Path(__file__).resolve().parent.parent / "etc"
+
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        site_randomizers._registry = {}
+        site_randomizers.loaded = False
+        site_randomizers.register(Randomizer)
+        for name in [DM, HIV]:
+            Conditions.objects.create(name=name)
+
+    def create_group(self, index: int, size: int = 14) -> PatientGroup:
+        site = Site.objects.get(id=101)
+        patient_group = PatientGroup.objects.create(
+            site=site,
+            status=COMPLETE,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            user_created="frisco",
+        )
+        for i in range(0, size):
+            subject_identifier = f"101-101-{index}{i:03d}-2"
+            patient = PatientLog.objects.create(
+                subject_identifier=subject_identifier,
+                screening_identifier=f"XYZ{index}{i:04d}",
+                stable=YES,
+                willing_to_screen=YES,
+                site=site,
+            )
+            patient.conditions.add(Conditions.objects.get(name=DM if i < 10 else HIV))
+            SubjectConsent.objects.create(subject_identifier=subject_identifier, site=site)
+            RegisteredSubject.objects.create(subject_identifier=subject_identifier, site=site)
+            patient_group.patients.add(patient)
+        return patient_group
+
+    def test_randomizes_groups(self, mock_schedule):
+        patient_groups = [self.create_group(i) for i in range(1, 4)]
+        not_ready = self.create_group(4, size=13)
+        bulk_randomizer = BulkRandomizer(country="uganda", batch_size=2)
+        results = list(bulk_randomizer.run())
+        self.assertEqual(len(results), 4)
+        self.assertEqual(len(bulk_randomizer.randomized), 3)
+        self.assertEqual(list(bulk_randomizer.failed), [str(not_ready.group_identifier_as_pk)])
+        self.assertIn(
+            "GroupRandomizationError",
+            bulk_randomizer.failed[str(not_ready.group_identifier_as_pk)],
+        )
+        self.assertEqual(mock_schedule.call_count, 3)
+        for patient_group in patient_groups:
+            patient_group.refresh_from_db()
+            self.assertTrue(patient_group.randomized)
+            self.assertEqual(
+                PatientLog.objects.filter(
+                    group_identifier=patient_group.group_identifier
+                ).count(),
+                14,
+            )
+        not_ready.refresh_from_db()
+        self.assertFalse(not_ready.randomized)
+        self.assertEqual(RandomizationList.objects.filter(allocated=True).count(), 3)
+        self.assertEqual(
+            [obj for obj, _, _ in BulkRandomizer(site_ids=[101]).run()], [not_ready]
+        )
+
+    def test_yields_after_batch_is_committed(self, mock_schedule):
+        for i in range(1, 4):
+            self.create_group(i)
+        atomic_blocks = len(connection.atomic_blocks)
+        for _ in BulkRandomizer(site_ids=[101], batch_size=2).run():
+            self.assertEqual(len(connection.atomic_blocks), atomic_blocks)
+
+    def test_command_requires_site_or_country(self, mock_schedule):
+        with self.assertRaises(CommandError):
+            call_command("randomize_groups")
+        with self.assertRaises(CommandError):
+            call_command("randomize_groups", country="neverland")
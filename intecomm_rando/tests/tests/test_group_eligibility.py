@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from django.test import override_settings
+from django_mock_queries.query import MockSet
+from intecomm_form_validators.tests.mock_models import PatientGroupMockModel
+from intecomm_form_validators.tests.test_case_mixin import TestCaseMixin
+from intecomm_form_validators.utils import (
+    PatientGroupMakeupError,
+    PatientGroupRatioError,
+    PatientGroupSizeError,
+    PatientNotConsentedError,
+    PatientNotScreenedError,
+    PatientNotStableError,
+    confirm_patient_group_minimum_of_each_condition_or_raise,
+    confirm_patient_group_ratio_or_raise,
+    confirm_patient_group_size_or_raise,
+    confirm_patients_stable_and_screened_and_consented_or_raise,
+)
+
+from intecomm_rando.exceptions import GroupRandomizationError
+from intecomm_rando.group_eligibility import GroupEligibility
+
+
+def assess_legacy(group_eligibility: GroupEligibility):
+    """Reference assessment using the upstream validators, each
+    wrapped as GroupEligibility did before the single-pass
+    assessment.
+    """
+    instance = group_eligibility.instance
+    for func, kwargs, exceptions in [
+        (
+            confirm_patients_stable_and_screened_and_consented_or_raise,
+            dict(patients=instance.patients),
+            (PatientNotStableError, PatientNotScreenedError, PatientNotConsentedError),
+        ),
+        (
+            confirm_patient_group_size_or_raise,
+            dict(
+                bypass_group_size_min=instance.bypass_group_size_min,
+                patients=instance.patients,
+            ),
+            (PatientGroupSizeError,),
+        ),
+        (
+            confirm_patient_group_minimum_of_each_condition_or_raise,
+            dict(patients=instance.patients),
+            (PatientGroupMakeupError,),
+        ),
+        (
+            confirm_patient_group_ratio_or_raise,
+            dict(
+                patients=instance.patients.all(),
+                bypass_group_ratio=instance.bypass_group_ratio,
+            ),
+            (PatientGroupRatioError,),
+        ),
+    ]:
+        try:
+            func(**kwargs)
+        except exceptions as e:
+            if group_eligibility.called_by_rando:
+                raise GroupRandomizationError(e)
+            raise
+
+
+@override_settings(SITE_ID=101)
+class GroupEligibilityTests(TestCaseMixin):
+    scenarios = [
+        dict(dm=10, htn=0, hiv=4, stable=True, screen=True, consent=True),
+        dict(dm=10, htn=0, hiv=4, stable=False, screen=True, consent=True),
+        dict(dm=10, htn=0, hiv=4, stable=True, screen=False, consent=True),
+        dict(dm=10, htn=0, hiv=4, stable=True, screen=True, consent=False),
+        dict(dm=8, htn=0, hiv=4, stable=True, screen=True, consent=True),
+        dict(dm=14, htn=0, hiv=1, stable=True, screen=True, consent=True),
+        dict(dm=0, htn=0, hiv=14, stable=True, screen=True, consent=True),
+        dict(dm=6, htn=0, hiv=8, stable=True, screen=True, consent=True),
+        dict(dm=2, htn=2, hiv=4, ncd=6, stable=True, screen=True, consent=True),
+        dict(dm=0, stable=True, screen=True, consent=True),
+    ]
+
+    @staticmethod
+    def get_exception(func, *args) -> tuple:
+        try:
+            func(*args)
+        except Exception as e:
+            return e.__class__, str(e)
+        return None, None
+
+    def test_same_as_individual_validators(self):
+        for called_by_rando in [True, False]:
+            for bypass in [True, False]:
+                for scenario in self.scenarios:
+                    with self.subTest(
+                        scenario=scenario, called_by_rando=called_by_rando, bypass=bypass
+                    ):
+                        patient_group = PatientGroupMockModel(
+                            patients=MockSet(*self.get_mock_patients(**scenario)),
+                            bypass_group_size_min=bypass,
+                            bypass_group_ratio=bypass,
+                        )
+                        group_eligibility = GroupEligibility(
+                            patient_group, called_by_rando=called_by_rando
+                        )
+                        self.assertEqual(
+                            self.get_exception(group_eligibility.assess),
+                            self.get_exception(assess_legacy, group_eligibility),
+                        )
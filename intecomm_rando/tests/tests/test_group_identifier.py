@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+from django.contrib.sites.models import Site
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from edc_identifier.models import IdentifierModel
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+
+from intecomm_rando.group_identifier import GroupIdentifier, sequence_blocks
+from intecomm_rando.models import GroupIdentifierSequence, RegisteredGroup
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+class GroupIdentifierTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+
+    def setUp(self):
+        sequence_blocks.clear()
+
+    @staticmethod
+    def get_identifier() -> GroupIdentifier:
+        return GroupIdentifier(
+            identifier_type="patient_group",
+            group_identifier_as_pk=uuid4(),
+            requesting_model="intecomm_screening.patientgroup",
+            site=Site.objects.get(id=101),
+        )
+
+    def test_default(self):
+        identifiers = [self.get_identifier().identifier for _ in range(0, 3)]
+        self.assertEqual(
+            list(IdentifierModel.objects.values_list("sequence_number", flat=True)),
+            [1, 2, 3],
+        )
+        self.assertEqual(len(set(identifiers)), 3)
+        self.assertEqual(GroupIdentifierSequence.objects.count(), 0)
+
+    def test_registered_group_created_in_one_insert(self):
+        group_identifier = self.get_identifier()
+        obj = RegisteredGroup.objects.get(
+            group_identifier_as_pk=group_identifier.group_identifier_as_pk
+        )
+        self.assertEqual(obj.group_identifier, group_identifier.identifier)
+        self.assertEqual(obj.history.count(), 1)
+        self.assertEqual(obj.history.get().group_identifier, group_identifier.identifier)
+
+    @override_settings(INTECOMM_RANDO_GROUP_IDENTIFIER_BLOCK_SIZE=3)
+    def test_hilo(self):
+        with override_settings(INTECOMM_RANDO_GROUP_IDENTIFIER_BLOCK_SIZE=0):
+            self.get_identifier()
+        self.get_identifier()
+        with CaptureQueriesContext(connection) as ctx:
+            self.get_identifier()
+        # no sequence number lookup or reservation
+        self.assertFalse(
+            [
+                q
+                for q in ctx.captured_queries
+                if "identifiermodel" in q["sql"]
+                and q["sql"].startswith("SELECT")
+                or "groupidentifiersequence" in q["sql"]
+            ]
+        )
+        self.get_identifier()
+        self.get_identifier()
+        self.assertEqual(
+            GroupIdentifierSequence.objects.get().reserved_sequence_number, 1 + 3 + 3
+        )
+        # another worker reserves the next block
+        sequence_blocks.clear()
+        self.get_identifier()
+        self.assertEqual(
+            list(
+                IdentifierModel.objects.order_by("sequence_number").values_list(
+                    "sequence_number", flat=True
+                )
+            ),
+            [1, 2, 3, 4, 5, 8],
+        )
+        self.assertEqual(RegisteredGroup.objects.count(), 6)
+
+    @override_settings(INTECOMM_RANDO_GROUP_IDENTIFIER_BLOCK_SIZE=3)
+    def test_hilo_savepoint_rolled_back(self):
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    self.get_identifier()
+                    raise ValueError()
+            except ValueError:
+                pass
+            # the reservation was rolled back with the savepoint
+            self.assertFalse(GroupIdentifierSequence.objects.exists())
+            self.get_identifier()
+            self.get_identifier()
+            self.assertEqual(GroupIdentifierSequence.objects.get().reserved_sequence_number, 3)
+        # another worker reserves the next block
+        sequence_blocks.clear()
+        self.get_identifier()
+        self.assertEqual(
+            list(
+                IdentifierModel.objects.order_by("sequence_number").values_list(
+                    "sequence_number", flat=True
+                )
+            ),
+            [1, 2, 4],
+        )
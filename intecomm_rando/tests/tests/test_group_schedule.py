@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from edc_appointment.models import Appointment, AppointmentType
+from edc_consent.exceptions import (
+    ConsentDefinitionNotConfiguredForUpdate,
+    NotConsentedError,
+)
+from edc_consent.site_consents import site_consents
+from edc_constants.constants import COMMUNITY
+from edc_registration.models import RegisteredSubject
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+from edc_utils import get_utcnow
+from edc_visit_schedule.models import OnSchedule, SubjectScheduleHistory
+from edc_visit_schedule.site_visit_schedules import site_visit_schedules
+
+from intecomm_rando.constants import COMMUNITY_ARM
+from intecomm_rando.exceptions import GroupScheduleError
+from intecomm_rando.group_schedule import GroupSchedule
+from intecomm_rando.utils import (
+    update_appt_type_on_new_group_appointments,
+)
+
+from ..consents import consent_v1
+from ..models import SubjectConsent
+from ..visit_schedules import schedule, visit_schedule
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+class GroupScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        site_consents.registry = {}
+        site_consents.loaded = False
+        site_consents.register(consent_v1)
+        site_visit_schedules._registry = {}
+        site_visit_schedules.loaded = False
+        site_visit_schedules.register(visit_schedule)
+
+    @staticmethod
+    def register_subjects(
+        count: int, start: int = 100, consent: bool | None = None
+    ) -> list[str]:
+        consent = True if consent is None else consent
+        subject_identifiers = []
+        for i in range(start, start + count):
+            subject_identifier = f"101-101-{i:04d}-2"
+            RegisteredSubject.objects.create(
+                subject_identifier=subject_identifier, site=Site.objects.get(id=101)
+            )
+            if consent:
+                SubjectConsent.objects.create(
+                    subject_identifier=subject_identifier,
+                    consent_datetime=get_utcnow() - relativedelta(days=1),
+                    site=Site.objects.get(id=101),
+                )
+            subject_identifiers.append(subject_identifier)
+        return subject_identifiers
+
+    def test_put_group_on_schedule(self):
+        subject_identifiers = self.register_subjects(14)
+        onschedule_datetime = get_utcnow()
+        GroupSchedule(
+            subject_identifiers, "edc_visit_schedule.onschedule", onschedule_datetime
+        ).put_on_schedule()
+        self.assertEqual(OnSchedule.objects.count(), 14)
+        self.assertEqual(OnSchedule.history.count(), 14)
+        self.assertEqual(SubjectScheduleHistory.objects.count(), 14)
+        self.assertEqual(Appointment.objects.count(), 14 * 4)
+        self.assertEqual(Appointment.history.count(), 14 * 4)
+        for subject_identifier in subject_identifiers:
+            self.assertEqual(
+                list(
+                    Appointment.objects.filter(subject_identifier=subject_identifier)
+                    .order_by("timepoint")
+                    .values_list("visit_code", "appt_datetime")
+                ),
+                list(
+                    Appointment.objects.filter(subject_identifier=subject_identifiers[0])
+                    .order_by("timepoint")
+                    .values_list("visit_code", "appt_datetime")
+                ),
+            )
+        self.assertEqual(
+            Appointment.objects.get(
+                subject_identifier=subject_identifiers[0], visit_code="1000"
+            ).appt_datetime,
+            onschedule_datetime,
+        )
+
+    def test_query_count_does_not_depend_on_group_size(self):
+        counts = []
+        for start, count in [(100, 14), (200, 28)]:
+            subject_identifiers = self.register_subjects(count, start=start)
+            with CaptureQueriesContext(connection) as ctx:
+                GroupSchedule(
+                    subject_identifiers, "edc_visit_schedule.onschedule", get_utcnow()
+                ).put_on_schedule()
+            counts.append(
+                len([q for q in ctx.captured_queries if 'appointment" (' not in q["sql"]])
+            )
+        self.assertEqual(counts[0], counts[1])
+
+    def test_raises_if_not_registered(self):
+        subject_identifiers = self.register_subjects(13)
+        subject_identifiers.append("101-101-9999-2")
+        with self.assertRaises(GroupScheduleError) as cm:
+            GroupSchedule(
+                subject_identifiers, "edc_visit_schedule.onschedule", get_utcnow()
+            ).put_on_schedule()
+        self.assertIn("101-101-9999-2", str(cm.exception))
+        self.assertEqual(OnSchedule.objects.count(), 0)
+
+    def test_raises_if_not_consented(self):
+        subject_identifiers = self.register_subjects(13)
+        subject_identifiers.extend(self.register_subjects(1, start=200, consent=False))
+        with self.assertRaises(NotConsentedError) as cm:
+            GroupSchedule(
+                subject_identifiers, "edc_visit_schedule.onschedule", get_utcnow()
+            ).put_on_schedule()
+        self.assertIn("101-101-0200-2", str(cm.exception))
+        self.assertEqual(OnSchedule.objects.count(), 0)
+        self.assertEqual(SubjectScheduleHistory.objects.count(), 0)
+        self.assertEqual(Appointment.objects.count(), 0)
+
+    def test_raises_if_consented_after_onschedule_datetime(self):
+        subject_identifiers = self.register_subjects(14)
+        SubjectConsent.objects.filter(subject_identifier=subject_identifiers[0]).update(
+            consent_datetime=get_utcnow() + relativedelta(days=1)
+        )
+        with self.assertRaises(ConsentDefinitionNotConfiguredForUpdate):
+            GroupSchedule(
+                subject_identifiers, "edc_visit_schedule.onschedule", get_utcnow()
+            ).put_on_schedule()
+        self.assertEqual(OnSchedule.objects.count(), 0)
+
+    def test_same_as_put_on_schedule(self):
+        """Assert the bulk inserted instances match those created
+        by edc's `schedule.put_on_schedule`.
+        """
+        subject_identifier, other_subject_identifier = self.register_subjects(2)
+        onschedule_datetime = get_utcnow()
+        GroupSchedule(
+            [subject_identifier], "edc_visit_schedule.onschedule", onschedule_datetime
+        ).put_on_schedule()
+        schedule.put_on_schedule(
+            subject_identifier=other_subject_identifier,
+            onschedule_datetime=onschedule_datetime,
+        )
+        for model_cls, order_by in [
+            (OnSchedule, ["id"]),
+            (SubjectScheduleHistory, ["id"]),
+            (Appointment, ["timepoint"]),
+            (OnSchedule.history.model, ["history_date"]),
+            (Appointment.history.model, ["timepoint", "history_date"]),
+        ]:
+            with self.subTest(model_cls=model_cls):
+                self.assertEqual(
+                    self.get_values(model_cls, subject_identifier, order_by),
+                    self.get_values(model_cls, other_subject_identifier, order_by),
+                )
+
+    @staticmethod
+    def get_values(model_cls, subject_identifier: str, order_by: list[str]) -> list[dict]:
+        """Returns the field values of each instance for a subject
+        less those unique to the instance or to the save.
+
+        For historical models, only the last historical record of
+        each instance is returned since `put_on_schedule` saves
+        each appointment more than once.
+        """
+        exclude = [
+            "id",
+            "subject_identifier",
+            "created",
+            "modified",
+            "hostname_created",
+            "hostname_modified",
+            "revision",
+            "history_id",
+            "history_date",
+            "history_type",
+        ]
+        fields = [f.attname for f in model_cls._meta.concrete_fields if f.name not in exclude]
+        values = {}
+        for obj in (
+            model_cls.objects.filter(subject_identifier=subject_identifier)
+            .order_by(*order_by)
+            .values("id", *fields)
+        ):
+            values[obj.pop("id")] = obj
+        return list(values.values())
+
+    def test_update_appt_type_for_group(self):
+        subject_identifiers = self.register_subjects(14)
+        group_schedule = GroupSchedule(
+            subject_identifiers, "edc_visit_schedule.onschedule", get_utcnow()
+        )
+        group_schedule.put_on_schedule()
+        Appointment.objects.update(appt_type=None)
+        AppointmentType.objects.get_or_create(
+            name=COMMUNITY, defaults=dict(display_name=COMMUNITY)
+        )
+        with self.assertNumQueries(2):
+            updated = update_appt_type_on_new_group_appointments(
+                subject_identifiers=subject_identifiers,
+                visit_schedule_name=group_schedule.visit_schedule.name,
+                schedule_name=group_schedule.schedule.name,
+                assignment=COMMUNITY_ARM,
+            )
+        self.assertEqual(updated, 14 * 4)
+        self.assertEqual(Appointment.objects.filter(appt_type__name=COMMUNITY).count(), 14 * 4)
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from io import StringIO
+
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from edc_constants.constants import DM, HIV, HTN, YES
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+from intecomm_form_validators.utils import (
+    PatientGroupRatioError,
+    PatientGroupSizeError,
+    PatientNotStableError,
+)
+
+from intecomm_rando.exceptions import GroupRandomizationError
+from intecomm_rando.group_eligibility import GroupEligibility
+from intecomm_rando.models import GroupSummary
+from intecomm_rando.models.group_summary import COUNTER_FIELDS
+
+from ..models import Conditions, PatientGroup, PatientLog
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+class GroupSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        for name in [DM, HTN, HIV]:
+            Conditions.objects.create(name=name)
+
+    def setUp(self):
+        self.site = Site.objects.get(id=101)
+        self.patient_group = PatientGroup.objects.create(site=self.site)
+
+    def get_patients(self, dm: int = 0, hiv: int = 0, start: int = 0) -> list[PatientLog]:
+        patients = []
+        for i, name in enumerate([DM] * dm + [HIV] * hiv, start=start):
+            patient = PatientLog.objects.create(
+                subject_identifier=f"101-101-{i:04d}-2",
+                screening_identifier=f"XYZ{i:05d}",
+                stable=YES,
+                willing_to_screen=YES,
+                site=self.site,
+            )
+            patient.conditions.add(Conditions.objects.get(name=name))
+            patients.append(patient)
+        return patients
+
+    def assertSummaryCurrent(self):
+        summary = GroupSummary.objects.get(
+            group_identifier_as_pk=self.patient_group.group_identifier_as_pk
+        )
+        expected = GroupSummary.objects.refresh(self.patient_group)
+        for fld in COUNTER_FIELDS:
+            self.assertEqual(getattr(summary, fld), getattr(expected, fld), fld)
+        return expected
+
+    def test_counts_maintained_on_add_and_remove(self):
+        patients = self.get_patients(dm=10, hiv=4)
+        self.patient_group.patients.add(*patients[:5])
+        self.assertEqual(self.assertSummaryCurrent().size, 5)
+        self.patient_group.patients.add(*patients[5:])
+        summary = self.assertSummaryCurrent()
+        self.assertEqual(summary.size, 14)
+        self.assertEqual(summary.ncd_single, 10)
+        self.assertEqual(summary.hiv_single, 4)
+        self.assertTrue(summary.all_patients_eligible)
+        self.patient_group.patients.remove(patients[0], patients[13])
+        self.assertEqual(self.assertSummaryCurrent().size, 12)
+        patients[1].conditions.add(Conditions.objects.get(name=HTN))
+        self.assertEqual(self.assertSummaryCurrent().ncd_single, 8)
+        patients[2].stable = "NO"
+        patients[2].save()
+        self.assertFalse(self.assertSummaryCurrent().all_patients_eligible)
+        self.patient_group.patients.clear()
+        self.assertEqual(self.assertSummaryCurrent().size, 0)
+
+    def test_assess_does_not_walk_patients(self):
+        self.patient_group.patients.add(*self.get_patients(dm=10, hiv=4))
+        # the summary and the aggregate that confirms it is current
+        with self.assertNumQueries(2):
+            GroupEligibility(self.patient_group).assess()
+        self.patient_group.patients.add(*self.get_patients(dm=18, hiv=8, start=100))
+        with self.assertNumQueries(2):
+            GroupEligibility(self.patient_group).assess()
+
+    def test_summary_refreshed_after_queryset_update(self):
+        patients = self.get_patients(dm=10, hiv=4)
+        self.patient_group.patients.add(*patients)
+        GroupEligibility(self.patient_group).assess()
+        PatientLog.objects.filter(id=patients[3].id).update(stable="NO")
+        with self.assertRaises(PatientNotStableError):
+            GroupEligibility(self.patient_group).assess()
+        self.assertFalse(self.assertSummaryCurrent().all_patients_eligible)
+
+    def test_summary_refreshed_after_bulk_membership_change(self):
+        patients = self.get_patients(dm=10, hiv=4)
+        self.patient_group.patients.add(*patients)
+        PatientGroup.patients.through.objects.filter(patientlog_id=patients[0].id).delete()
+        with self.assertRaises(PatientGroupSizeError):
+            GroupEligibility(self.patient_group).assess()
+        self.assertEqual(self.assertSummaryCurrent().size, 13)
+
+    def test_summary_deleted_with_group(self):
+        self.patient_group.patients.add(*self.get_patients(dm=10, hiv=4))
+        self.patient_group.delete()
+        self.assertFalse(
+            GroupSummary.objects.filter(
+                group_identifier_as_pk=self.patient_group.group_identifier_as_pk
+            ).exists()
+        )
+
+    def test_rando_does_not_trust_summary(self):
+        self.patient_group.patients.add(*self.get_patients(dm=12, hiv=2))
+        GroupSummary.objects.filter(
+            group_identifier_as_pk=self.patient_group.group_identifier_as_pk
+        ).update(ncd_single=10, hiv_single=4)
+        GroupEligibility(self.patient_group).assess()
+        with self.assertRaises(GroupRandomizationError):
+            GroupEligibility(self.patient_group, called_by_rando=True).assess()
+
+    def test_backfill(self):
+        self.patient_group.patients.add(*self.get_patients(dm=10, hiv=4))
+        GroupSummary.objects.all().delete()
+        out = StringIO()
+        call_command(
+            "backfill_group_summaries", patient_group_model="tests.patientgroup", stdout=out
+        )
+        self.assertIn("Backfilled 1 group summaries.", out.getvalue())
+        self.assertEqual(self.assertSummaryCurrent().size, 14)
+
+    @override_settings(INTECOMM_RANDO_ELIGIBILITY_CACHE_TIMEOUT=300)
+    def test_passed_assessment_is_cached(self):
+        patients = self.get_patients(dm=10, hiv=4)
+        self.patient_group.patients.add(*patients)
+        group_eligibility = GroupEligibility(self.patient_group)
+        group_eligibility.assess()
+        cache_key = group_eligibility.get_cache_key()
+        with self.assertNumQueries(1):
+            GroupEligibility(self.patient_group).assess()
+
+        self.patient_group.bypass_group_ratio = True
+        self.assertNotEqual(cache_key, group_eligibility.get_cache_key())
+        self.patient_group.bypass_group_ratio = False
+        patients[0].conditions.add(Conditions.objects.get(name=HIV))
+        self.assertNotEqual(cache_key, group_eligibility.get_cache_key())
+        patients[0].conditions.remove(Conditions.objects.get(name=HIV))
+        self.assertEqual(cache_key, group_eligibility.get_cache_key())
+        patients[3].stable = "NO"
+        patients[3].save()
+        self.assertNotEqual(cache_key, group_eligibility.get_cache_key())
+        with self.assertRaises(GroupRandomizationError):
+            GroupEligibility(self.patient_group, called_by_rando=True).assess()
+
+    @override_settings(INTECOMM_RANDO_ELIGIBILITY_CACHE_TIMEOUT=300)
+    def test_cache_not_read_by_rando(self):
+        self.patient_group.patients.add(*self.get_patients(dm=12, hiv=2))
+        GroupSummary.objects.filter(
+            group_identifier_as_pk=self.patient_group.group_identifier_as_pk
+        ).update(ncd_single=10, hiv_single=4)
+        GroupEligibility(self.patient_group).assess()
+        self.assertIsNone(
+            GroupEligibility(self.patient_group, called_by_rando=True).get_cache_key()
+        )
+        with self.assertRaises(GroupRandomizationError):
+            GroupEligibility(self.patient_group, called_by_rando=True).assess()
+
+    def test_cache_disabled_by_default(self):
+        self.patient_group.patients.add(*self.get_patients(dm=10, hiv=4))
+        self.assertIsNone(GroupEligibility(self.patient_group).get_cache_key())
+
+    def test_assess_raises_same_as_without_summary(self):
+        patients = self.get_patients(dm=12, hiv=2)
+        self.patient_group.patients.add(*patients)
+        for called_by_rando, exception_cls in [
+            (False, PatientGroupRatioError),
+            (True, GroupRandomizationError),
+        ]:
+            group_eligibility = GroupEligibility(
+                self.patient_group, called_by_rando=called_by_rando
+            )
+            with self.assertRaises(exception_cls) as cm:
+                group_eligibility.assess()
+            with self.assertRaises(exception_cls) as cm_patients:
+                group_eligibility.assess_from_patients()
+            self.assertEqual(str(cm.exception), str(cm_patients.exception))
+        patients[3].stable = "NO"
+        patients[3].save()
+        with self.assertRaises(PatientNotStableError):
+            GroupEligibility(self.patient_group).assess()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sites.models import Site
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from intecomm_rando.instrumentation import (
+    instrument,
+    randomization_stage_timed,
+    retry_counter,
+    stage_histogram,
+)
+from intecomm_rando.views import metrics_view
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        stage_histogram.clear()
+        self.timed = []
+
+        def receiver(sender, **kwargs):
+            self.timed.append(kwargs)
+
+        randomization_stage_timed.connect(receiver, weak=False, dispatch_uid="test_timed")
+        self.addCleanup(randomization_stage_timed.disconnect, dispatch_uid="test_timed")
+
+    def test_disabled_by_default(self):
+        with instrument("allocation"):
+            Site.objects.count()
+        self.assertEqual(stage_histogram.snapshot(), {})
+        self.assertEqual(self.timed, [])
+
+    @override_settings(INTECOMM_RANDO_INSTRUMENTATION=True)
+    def test_instrument(self):
+        with self.assertLogs("intecomm_rando.instrumentation", level="INFO") as cm:
+            with instrument("allocation", group_identifier_as_pk="abc"):
+                Site.objects.count()
+                Site.objects.count()
+        self.assertIn("allocation completed", cm.output[0])
+        self.assertEqual(cm.records[0].queries, 2)
+        self.assertEqual(cm.records[0].group_identifier_as_pk, "abc")
+        self.assertEqual(len(self.timed), 1)
+        self.assertEqual(self.timed[0]["stage"], "allocation")
+        self.assertEqual(self.timed[0]["queries"], 2)
+        self.assertFalse(self.timed[0]["failed"])
+        snapshot = stage_histogram.snapshot()["allocation"]
+        self.assertEqual(snapshot["count"], 1)
+        self.assertEqual(snapshot["queries"], 2)
+        self.assertEqual(snapshot["buckets"][float("inf")], 1)
+        self.assertIn(
+            'intecomm_rando_stage_seconds_count{stage="allocation"} 1',
+            stage_histogram.render(),
+        )
+
+    @override_settings(INTECOMM_RANDO_INSTRUMENTATION=True)
+    def test_instrument_failed(self):
+        with self.assertLogs("intecomm_rando.instrumentation", level="INFO"):
+            with self.assertRaises(ValueError):
+                with instrument("eligibility"):
+                    raise ValueError()
+        self.assertTrue(self.timed[0]["failed"])
+        self.assertEqual(stage_histogram.snapshot()["eligibility"]["count"], 1)
+
+    @override_settings(INTECOMM_RANDO_INSTRUMENTATION=True)
+    def test_metrics_view(self):
+        retry_counter.clear()
+        with self.assertLogs("intecomm_rando.instrumentation", level="INFO"):
+            with instrument("allocation"):
+                pass
+        retry_counter.increment("deadlock")
+        self.addCleanup(retry_counter.clear)
+        request = RequestFactory().get(reverse("intecomm_rando:metrics"))
+        request.user = User.objects.create_user("erik", is_staff=False)
+        self.assertEqual(metrics_view(request).status_code, 302)
+        request.user.is_staff = True
+        response = metrics_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        content = response.content.decode()
+        self.assertIn('intecomm_rando_stage_seconds_count{stage="allocation"} 1', content)
+        self.assertIn('intecomm_rando_randomize_retries_total{reason="deadlock"} 1', content)
+
+    @override_settings(INTECOMM_RANDO_METRICS_TOKEN="secret")
+    def test_metrics_view_with_token(self):
+        self.assertEqual(reverse("intecomm_rando:metrics"), "/intecomm_rando/metrics/")
+        for authorization, status_code in [
+            ("Bearer secret", 200),
+            ("Bearer wrong", 302),
+            ("", 302),
+        ]:
+            with self.subTest(authorization=authorization):
+                request = RequestFactory().get(
+                    reverse("intecomm_rando:metrics"), HTTP_AUTHORIZATION=authorization
+                )
+                request.user = AnonymousUser()
+                self.assertEqual(metrics_view(request).status_code, status_code)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from uuid import uuid4
+
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from edc_randomization.constants import RANDOMIZED
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+from edc_utils import get_utcnow
+
+from intecomm_rando.list_forecast import get_list_exhaustion_forecast
+from intecomm_rando.models import RandomizationList, RegisteredGroup
+from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+
+
+class Randomizer(BaseRandomizer):
+    randomizationlist_folder = Path(__file__).resolve().parent.parent / "etc"
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+class ListForecastTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        Randomizer.import_list(overwrite=True)
+
+    def allocate(self, sid: int, days_ago: int):
+        randomization_datetime = get_utcnow() - timedelta(days=days_ago)
+        RandomizationList.objects.filter(sid=sid).update(
+            allocated=True, allocated_datetime=randomization_datetime
+        )
+        RegisteredGroup.objects.create(
+            group_identifier_as_pk=uuid4(),
+            site=Site.objects.get(id=101),
+            sid=sid,
+            registration_status=RANDOMIZED,
+            randomization_datetime=randomization_datetime,
+        )
+
+    def test_no_allocations(self):
+        forecast = get_list_exhaustion_forecast()
+        self.assertEqual(len(forecast), 1)
+        self.assertEqual(forecast[0]["unallocated"], 7)
+        self.assertIsNone(forecast[0]["exhaustion_datetime"])
+
+    def test_forecast(self):
+        self.allocate(10101, days_ago=30)
+        self.allocate(10102, days_ago=3)
+        self.allocate(10103, days_ago=1)
+        report_datetime = get_utcnow()
+        with self.assertNumQueries(2):
+            forecast = get_list_exhaustion_forecast(days=10, report_datetime=report_datetime)
+        self.assertEqual(forecast[0]["site_name"], "kasangati")
+        self.assertEqual(forecast[0]["total"], 7)
+        self.assertEqual(forecast[0]["unallocated"], 4)
+        self.assertEqual(forecast[0]["allocations"], 2)
+        self.assertEqual(forecast[0]["days_remaining"], 20)
+        self.assertEqual(
+            forecast[0]["exhaustion_datetime"], report_datetime + timedelta(days=20)
+        )
+
+    def test_command(self):
+        self.allocate(10101, days_ago=1)
+        out = StringIO()
+        call_command("forecast_randomization_list", "--days=7", stdout=out)
+        self.assertIn("kasangati: 6/7 unallocated", out.getvalue())
+        self.assertIn("Runs out in 42 days", out.getvalue())
+
+    def test_exhausted(self):
+        RandomizationList.objects.update(allocated=True)
+        report_datetime = get_utcnow()
+        forecast = get_list_exhaustion_forecast(report_datetime=report_datetime)
+        self.assertEqual(forecast[0]["unallocated"], 0)
+        self.assertEqual(forecast[0]["allocations"], 0)
+        self.assertEqual(forecast[0]["days_remaining"], 0)
+        self.assertEqual(forecast[0]["exhaustion_datetime"], report_datetime)
+        out = StringIO()
+        call_command("forecast_randomization_list", stdout=out)
+        self.assertIn("kasangati: 0/7 unallocated", out.getvalue())
+        self.assertIn("Exhausted.", out.getvalue())
+        self.assertNotIn("No recent allocations.", out.getvalue())
@@ -2,36 +2,50 @@ from __future__ import annotations
 
 import re
 from pathlib import Path
+from unittest.mock import patch
 from uuid import uuid4
 
 from django.conf import settings
 from django.contrib.sites.models import Site
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import OperationalError
+from django.db.models.signals import post_save
 from django.test import override_settings
 from django_mock_queries.query import MockSet
 from edc_constants.constants import COMPLETE, NO, UUID_PATTERN, YES
+from edc_randomization.constants import RANDOMIZED
 from edc_randomization.site_randomizers import site_randomizers
 from edc_registration.models import RegisteredSubject
+from edc_sites import site_sites
 from edc_sites.single_site import SingleSite
 from edc_sites.site import sites
 from edc_sites.utils import add_or_update_django_sites
 from intecomm_form_validators.tests.mock_models import PatientGroupMockModel
 from intecomm_form_validators.tests.test_case_mixin import TestCaseMixin
 
+from intecomm_rando.constants import UGANDA
+from intecomm_rando.instrumentation import retry_counter, stage_histogram
 from intecomm_rando.models import RandomizationList, RegisteredGroup
 from intecomm_rando.randomize_group import (
     GroupAlreadyRandomized,
     GroupRandomizationError,
 )
 from intecomm_rando.randomize_group import RandomizeGroup as BaseRandomizeGroup
+from intecomm_rando.randomize_group import SubjectConsentModelResolver
 from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+from intecomm_rando.utils import get_assignments_for_subjects
 
-from ..models import SubjectConsent
+from ..models import PatientLog, SubjectConsent
 
 
 class RandomizeGroup(BaseRandomizeGroup):
+    patient_log_model = None
     subject_consent_model = None
 
+    @property
+    def patient_log_model_cls(self):
+        return PatientLog
+
     def subject_consent_model_cls(self, site: Site):
         return SubjectConsent
 
@@ -88,6 +102,10 @@ class RandoTests(TestCaseMixin):
             site=Site.objects.get(id=settings.SITE_ID),
         )
         for patient in patient_group.patients.all():
+            PatientLog.objects.create(
+                subject_identifier=patient.subject_identifier,
+                site=Site.objects.get(id=settings.SITE_ID),
+            )
             SubjectConsent.objects.create(
                 subject_identifier=patient.subject_identifier,
                 site=Site.objects.get(id=settings.SITE_ID),
@@ -101,15 +119,245 @@ class RandoTests(TestCaseMixin):
         self.assertIsNotNone(patient_group.group_identifier)
         self.assertFalse(re.match(UUID_PATTERN, patient_group.group_identifier))
         try:
-            RegisteredGroup.objects.get(group_identifier=patient_group.group_identifier)
+            registered_group = RegisteredGroup.objects.get(
+                group_identifier=patient_group.group_identifier
+            )
         except ObjectDoesNotExist:
             self.fail("ObjectDoesNotExist unexpectedly raised (RegisteredGroup)")
+        else:
+            self.assertEqual(registered_group.registration_status, RANDOMIZED)
 
         try:
             RandomizationList.objects.get(group_identifier=patient_group.group_identifier)
         except ObjectDoesNotExist:
             self.fail("ObjectDoesNotExist unexpectedly raised (RandomizationList)")
 
+    @override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+    def test_updates_all_patients_in_group(self):
+        group_identifier_as_pk = str(uuid4())
+        site = Site.objects.get(id=settings.SITE_ID)
+        patients = self.get_mock_patients(
+            dm=10, htn=0, hiv=4, stable=True, screen=True, consent=True, site=site
+        )
+        patient_group = PatientGroupMockModel(
+            randomized=False,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            group_identifier=group_identifier_as_pk,
+            group_identifier_as_pk=group_identifier_as_pk,
+            status=COMPLETE,
+            patients=MockSet(*patients),
+            site=site,
+        )
+        for patient in patient_group.patients.all():
+            PatientLog.objects.create(subject_identifier=patient.subject_identifier, site=site)
+            SubjectConsent.objects.create(
+                subject_identifier=patient.subject_identifier, site=site
+            )
+            RegisteredSubject.objects.create(subject_identifier=patient.subject_identifier)
+        stage_histogram.clear()
+        saved = []
+
+        def receiver(sender, instance, update_fields, **kwargs):
+            saved.append((sender, frozenset(update_fields or [])))
+
+        post_save.connect(receiver, weak=False, dispatch_uid="test_updates_all_patients")
+        self.addCleanup(post_save.disconnect, dispatch_uid="test_updates_all_patients")
+        with override_settings(INTECOMM_RANDO_INSTRUMENTATION=True):
+            with self.assertLogs("intecomm_rando.instrumentation", level="INFO"):
+                RandomizeGroup(patient_group).randomize_group()
+        for model_cls, update_field in [
+            (PatientLog, "group_identifier"),
+            (SubjectConsent, "group_identifier"),
+            (RegisteredSubject, "sid"),
+        ]:
+            self.assertEqual(
+                len([s for s, fields in saved if s == model_cls and update_field in fields]),
+                14,
+            )
+        self.assertEqual(
+            sorted(stage_histogram.snapshot()),
+            [
+                "allocation",
+                "eligibility",
+                "group_identifier",
+                "patient_updates",
+                "randomize_group",
+            ],
+        )
+
+        rando_obj = RandomizationList.objects.get(
+            group_identifier=patient_group.group_identifier
+        )
+        self.assertEqual(
+            PatientLog.objects.filter(group_identifier=patient_group.group_identifier).count(),
+            14,
+        )
+        self.assertEqual(
+            SubjectConsent.objects.filter(
+                group_identifier=patient_group.group_identifier
+            ).count(),
+            14,
+        )
+        self.assertEqual(RegisteredSubject.history.filter(history_type="~").count(), 14)
+        self.assertFalse(
+            PatientLog.objects.filter(modified__lt=rando_obj.allocated_datetime).exists()
+        )
+        for obj in RegisteredSubject.objects.all():
+            self.assertEqual(obj.sid, str(rando_obj.sid))
+            self.assertEqual(obj.registration_status, RANDOMIZED)
+            self.assertEqual(obj.randomization_datetime, rando_obj.allocated_datetime)
+            self.assertEqual(obj.randomization_list_model, "intecomm_rando.randomizationlist")
+            self.assertEqual(obj.site, site)
+
+    @override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+    def test_get_assignments_for_subjects(self):
+        group_identifier_as_pk = str(uuid4())
+        site = Site.objects.get(id=settings.SITE_ID)
+        patients = self.get_mock_patients(
+            dm=10, htn=0, hiv=4, stable=True, screen=True, consent=True, site=site
+        )
+        patient_group = PatientGroupMockModel(
+            randomized=False,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            group_identifier=group_identifier_as_pk,
+            group_identifier_as_pk=group_identifier_as_pk,
+            status=COMPLETE,
+            patients=MockSet(*patients),
+            site=site,
+        )
+        for patient in patient_group.patients.all():
+            PatientLog.objects.create(subject_identifier=patient.subject_identifier, site=site)
+            SubjectConsent.objects.create(
+                subject_identifier=patient.subject_identifier, site=site
+            )
+            RegisteredSubject.objects.create(subject_identifier=patient.subject_identifier)
+        PatientLog.objects.create(subject_identifier="not-randomized", site=site)
+        RandomizeGroup(patient_group).randomize_group()
+
+        rando_obj = RandomizationList.objects.get(
+            group_identifier=patient_group.group_identifier
+        )
+        subject_identifiers = [p.subject_identifier for p in patient_group.patients.all()]
+        with self.assertNumQueries(3):
+            assignments = get_assignments_for_subjects(
+                subject_identifiers + ["not-randomized"],
+                patient_log_model="tests.patientlog",
+                chunk_size=5,
+            )
+        self.assertEqual(assignments, {s: rando_obj.assignment for s in subject_identifiers})
+
+    @override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+    def test_randomization_list_obj_fetched_once(self):
+        group_identifier_as_pk = str(uuid4())
+        site = Site.objects.get(id=settings.SITE_ID)
+        patients = self.get_mock_patients(
+            dm=10, htn=0, hiv=4, stable=True, screen=True, consent=True, site=site
+        )
+        patient_group = PatientGroupMockModel(
+            randomized=False,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            group_identifier=group_identifier_as_pk,
+            group_identifier_as_pk=group_identifier_as_pk,
+            status=COMPLETE,
+            patients=MockSet(*patients),
+            site=site,
+        )
+        for patient in patient_group.patients.all():
+            PatientLog.objects.create(subject_identifier=patient.subject_identifier, site=site)
+            SubjectConsent.objects.create(
+                subject_identifier=patient.subject_identifier, site=site
+            )
+            RegisteredSubject.objects.create(subject_identifier=patient.subject_identifier)
+        randomize_group = RandomizeGroup(patient_group)
+        randomize_group.randomize_group()
+        with self.assertNumQueries(0):
+            rando_obj = randomize_group.randomization_list_obj
+        self.assertEqual(rando_obj.group_identifier, patient_group.group_identifier)
+
+    @override_settings(
+        SITE_ID=101,
+        EDC_SITES_AUTODISCOVER_SITES=False,
+        INTECOMM_RANDO_RANDOMIZE_RETRY_BACKOFF=0,
+    )
+    def test_randomize_retried_on_transient_error(self):
+        group_identifier_as_pk = str(uuid4())
+        site = Site.objects.get(id=settings.SITE_ID)
+        patients = self.get_mock_patients(
+            dm=10, htn=0, hiv=4, stable=True, screen=True, consent=True, site=site
+        )
+        patient_group = PatientGroupMockModel(
+            randomized=False,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            group_identifier=group_identifier_as_pk,
+            group_identifier_as_pk=group_identifier_as_pk,
+            status=COMPLETE,
+            patients=MockSet(*patients),
+            site=site,
+        )
+        for patient in patient_group.patients.all():
+            PatientLog.objects.create(subject_identifier=patient.subject_identifier, site=site)
+            SubjectConsent.objects.create(
+                subject_identifier=patient.subject_identifier, site=site
+            )
+            RegisteredSubject.objects.create(subject_identifier=patient.subject_identifier)
+        retry_counter.clear()
+        randomize = site_randomizers.randomize
+        side_effect = [OperationalError("database is locked"), randomize]
+
+        def randomize_once_locked(*args, **kwargs):
+            if isinstance(error_or_randomize := side_effect.pop(0), Exception):
+                raise error_or_randomize
+            return error_or_randomize(*args, **kwargs)
+
+        with patch.object(site_randomizers, "randomize", side_effect=randomize_once_locked):
+            with self.assertLogs("intecomm_rando.randomize_group", level="WARNING"):
+                with patch("intecomm_rando.randomize_group.time.sleep") as sleep:
+                    RandomizeGroup(patient_group).randomize_group()
+        self.assertEqual(retry_counter.snapshot(), {"database_locked": 1})
+        # in the test's transaction, no backoff while holding locks
+        sleep.assert_not_called()
+        self.assertEqual(
+            RegisteredGroup.objects.filter(
+                group_identifier_as_pk=group_identifier_as_pk
+            ).count(),
+            1,
+        )
+        self.assertEqual(
+            RandomizationList.objects.filter(
+                group_identifier=patient_group.group_identifier
+            ).count(),
+            1,
+        )
+        self.assertTrue(patient_group.randomized)
+
+    @override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+    def test_raises_if_patient_not_updated(self):
+        group_identifier_as_pk = str(uuid4())
+        site = Site.objects.get(id=settings.SITE_ID)
+        patients = self.get_mock_patients(
+            dm=10, htn=0, hiv=4, stable=True, screen=True, consent=True, site=site
+        )
+        patient_group = PatientGroupMockModel(
+            randomized=False,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            group_identifier=group_identifier_as_pk,
+            group_identifier_as_pk=group_identifier_as_pk,
+            status=COMPLETE,
+            patients=MockSet(*patients),
+            site=site,
+        )
+        for patient in patient_group.patients.all():
+            PatientLog.objects.create(subject_identifier=patient.subject_identifier, site=site)
+            RegisteredSubject.objects.create(subject_identifier=patient.subject_identifier)
+        with self.assertRaises(GroupRandomizationError) as cm:
+            RandomizeGroup(patient_group).randomize_group()
+        self.assertIn("Unable to update", str(cm.exception))
+
     @override_settings(SITE_ID=101)
     def test_already_randomized(self):
         patients = self.get_mock_patients(
@@ -268,6 +516,7 @@ class RandoTests(TestCaseMixin):
             site=Site.objects.get(id=settings.SITE_ID),
         )
         for patient in patient_group.patients.all():
+            PatientLog.objects.create(subject_identifier=patient.subject_identifier)
             SubjectConsent.objects.create(subject_identifier=patient.subject_identifier)
             RegisteredSubject.objects.create(subject_identifier=patient.subject_identifier)
         randomizer = RandomizeGroup(patient_group)
@@ -300,6 +549,7 @@ class RandoTests(TestCaseMixin):
             site=Site.objects.get(id=settings.SITE_ID),
         )
         for patient in patient_group.patients.all():
+            PatientLog.objects.create(subject_identifier=patient.subject_identifier)
             SubjectConsent.objects.create(subject_identifier=patient.subject_identifier)
             RegisteredSubject.objects.create(subject_identifier=patient.subject_identifier)
         randomize_group = RandomizeGroup(patient_group)
@@ -336,3 +586,14 @@ class RandoTests(TestCaseMixin):
             randomize_group.randomize_group()
         self.assertIn("Expected YES", str(cm.exception))
         self.assertFalse(patient_group.randomized)
+
+    @override_settings(SITE_ID=101)
+    def test_subject_consent_model_resolver(self):
+        site = Site.objects.get(id=settings.SITE_ID)
+        resolver = SubjectConsentModelResolver(models={UGANDA: "tests.subjectconsent"})
+        with patch(
+            "intecomm_rando.randomize_group.site_sites.get", wraps=site_sites.get
+        ) as mock_get:
+            self.assertEqual(resolver.get(site), SubjectConsent)
+            self.assertEqual(resolver.get(site), SubjectConsent)
+        mock_get.assert_called_once_with(site.id)
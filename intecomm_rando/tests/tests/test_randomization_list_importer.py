@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+from tempfile import mkdtemp
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from edc_randomization.randomization_list_importer import RandomizationListImportError
+from edc_randomization.site_randomizers import site_randomizers
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+
+from intecomm_rando.models import RandomizationList
+from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+
+
+class Randomizer(BaseRandomizer):
+    randomizationlist_folder = Path(__file__).resolve().parent.parent / "etc"
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+class RandomizationListImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        site_randomizers._registry = {}
+        site_randomizers.loaded = False
+        site_randomizers.register(Randomizer)
+
+    def test_import_in_chunks(self):
+        importer = Randomizer.importer_cls(
+            assignment_map=Randomizer.assignment_map,
+            randomizationlist_path=Randomizer.get_randomizationlist_path(),
+            randomizer_model_cls=RandomizationList,
+            randomizer_name=Randomizer.name,
+            verbose=False,
+            chunk_size=3,
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(importer._import_csv_to_model(), 7)
+        self.assertEqual(
+            len(
+                [
+                    q
+                    for q in ctx.captured_queries
+                    if q["sql"].startswith('INSERT INTO "intecomm_rando_randomizationlist"')
+                ]
+            ),
+            3,
+        )
+
+    @override_settings(INTECOMM_RANDO_IMPORT_CHUNK_SIZE=3)
+    def test_import_list_in_chunks(self):
+        Randomizer.import_list(overwrite=True)
+        self.assertEqual(
+            list(RandomizationList.objects.values_list("sid", flat=True).order_by("sid")),
+            list(range(10101, 10108)),
+        )
+        self.assertEqual(Randomizer.verify_list(), [])
+
+    @override_settings(INTECOMM_RANDO_IMPORT_CHUNK_SIZE=3)
+    def test_import_list_in_chunks_raises_on_duplicate_sid(self):
+        folder = Path(mkdtemp())
+        self.addCleanup(shutil.rmtree, folder)
+        with Randomizer.get_randomizationlist_path().open() as f:
+            lines = f.readlines()
+        with (folder / Randomizer.filename).open("w") as f:
+            f.writelines(lines + [lines[1]])
+
+        class DuplicateRandomizer(Randomizer):
+            randomizationlist_folder = folder
+
+        with self.assertRaises(RandomizationListImportError) as cm:
+            DuplicateRandomizer.import_list(overwrite=True)
+        self.assertIn("duplicate SIDs. Got 10101", str(cm.exception))
+        self.assertEqual(RandomizationList.objects.count(), 0)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from django.test import TestCase, override_settings
+from edc_randomization.randomization_list_verifier import RandomizationListError
+from edc_randomization.site_randomizers import site_randomizers
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+
+from intecomm_rando.constants import CLINIC_CONTROL
+from intecomm_rando.models import RandomizationList
+from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+
+
+class Randomizer(BaseRandomizer):
+    randomizationlist_folder = Path(__file__).resolve().parent.parent / "etc"
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+class RandomizationListVerifierTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        site_randomizers._registry = {}
+        site_randomizers.loaded = False
+        site_randomizers.register(Randomizer)
+        Randomizer.import_list(overwrite=True)
+
+    def test_ok(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(Randomizer.verify_list(), [])
+
+    def test_mismatches(self):
+        obj = RandomizationList.objects.get(sid=10101)
+        obj.assignment = CLINIC_CONTROL
+        obj.save()
+        RandomizationList.objects.filter(sid=10102).update(site_name="amana")
+        RandomizationList.objects.filter(sid=10103).delete()
+        with self.assertRaises(RandomizationListError) as cm:
+            Randomizer.verify_list()
+        self.assertIn("SIDs not in model (n=1): 10103", str(cm.exception))
+        self.assertIn("assignment does not match (n=1): 10101", str(cm.exception))
+        self.assertIn("site_name does not match (n=1): 10102", str(cm.exception))
+
+    def test_site_name_case_and_other_randomizers_ignored(self):
+        RandomizationList.objects.filter(sid=10101).update(site_name="Kasangati")
+        obj = RandomizationList.objects.create(
+            sid=99999, assignment=CLINIC_CONTROL, site_name="kasangati"
+        )
+        RandomizationList.objects.filter(id=obj.id).update(randomizer_name="other")
+        self.assertEqual(Randomizer.verify_list(), [])
+
+    def test_blank_extra_column_values_ok(self):
+        folder = Path(mkdtemp())
+        self.addCleanup(rmtree, folder)
+        with (Randomizer.randomizationlist_folder / "randomization_list.csv").open() as f:
+            rows = f.read().splitlines()
+        rows[1] = ",".join(rows[1].split(",")[:3] + ["", "", "", ""])
+        (folder / "randomization_list.csv").write_text("\n".join(rows) + "\n")
+
+        class OtherRandomizer(Randomizer):
+            randomizationlist_folder = folder
+
+        self.assertEqual(OtherRandomizer.verify_list(), [])
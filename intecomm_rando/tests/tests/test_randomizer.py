@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from pathlib import Path
+from threading import Thread
+from uuid import uuid4
+
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from edc_randomization.site_randomizers import site_randomizers
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+from edc_utils import get_utcnow
+
+from intecomm_rando.models import RandomizationList, RegisteredGroup
+from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+
+
+class Randomizer(BaseRandomizer):
+    randomizationlist_folder = Path(__file__).resolve().parent.parent / "etc"
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+class RandomizerTests(TransactionTestCase):
+    def setUp(self):
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        site_randomizers._registry = {}
+        site_randomizers.loaded = False
+        site_randomizers.register(Randomizer)
+        Randomizer.import_list(overwrite=True)
+
+    def test_concurrent_randomizations_take_different_rows(self):
+        site = Site.objects.get(id=101)
+        group_identifiers = []
+        for i in range(0, 5):
+            obj = RegisteredGroup.objects.create(group_identifier_as_pk=uuid4(), site=site)
+            obj.group_identifier = f"101000{i}-9"
+            obj.save()
+            group_identifiers.append(obj.group_identifier)
+
+        errors = []
+
+        def randomize(group_identifier):
+            try:
+                site_randomizers.randomize(
+                    "default",
+                    identifier=group_identifier,
+                    report_datetime=get_utcnow(),
+                    site=site,
+                    user="frisco",
+                )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=randomize, args=(x,)) for x in group_identifiers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        allocated = RandomizationList.objects.filter(allocated=True)
+        self.assertEqual(
+            sorted(allocated.values_list("group_identifier", flat=True)), group_identifiers
+        )
+        self.assertEqual(len(set(allocated.values_list("sid", flat=True))), 5)
+        self.assertEqual(
+            RegisteredGroup.objects.filter(registration_status__isnull=True).count(), 0
+        )
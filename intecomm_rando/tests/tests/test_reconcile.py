@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from edc_constants.constants import COMPLETE, DM, HIV, YES
+from edc_randomization.constants import RANDOMIZED
+from edc_randomization.site_randomizers import site_randomizers
+from edc_registration.models import RegisteredSubject
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+
+from intecomm_rando.bulk_randomize import BulkRandomizer as BaseBulkRandomizer
+from intecomm_rando.models import (
+    RandomizationList,
+    RegisteredGroup,
+    SubjectRandomization,
+)
+from intecomm_rando.randomize_group import RandomizeGroup as BaseRandomizeGroup
+from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+from intecomm_rando.reconcile import (
+    RandomizationReconciler as BaseRandomizationReconciler,
+)
+
+from ..models import Conditions, PatientGroup, PatientLog, SubjectConsent
+
+
+class RandomizeGroup(BaseRandomizeGroup):
+    patient_log_model = "tests.patientlog"
+
+    def subject_consent_model_cls(self, site: Site):
+        return SubjectConsent
+
+
+class BulkRandomizer(BaseBulkRandomizer):
+    patient_group_model = "tests.patientgroup"
+    randomize_group_cls = RandomizeGroup
+
+
+class RandomizationReconciler(BaseRandomizationReconciler):
+    patient_group_model = "tests.patientgroup"
+    patient_log_model = "tests.patientlog"
+    subject_consent_models = ["tests.subjectconsent"]
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+@patch("intecomm_rando.randomize_group.put_newly_randomized_group_on_schedule")
+class ReconcileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        class Randomizer(BaseRandomizer):
+            randomizationlist_folder = Path(__file__).resolve().parent.parent / "etc"
+
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        site_randomizers._registry = {}
+        site_randomizers.loaded = False
+        site_randomizers.register(Randomizer)
+        for name in [DM, HIV]:
+            Conditions.objects.create(name=name)
+
+    def create_group(self, index: int, size: int = 14) -> PatientGroup:
+        site = Site.objects.get(id=101)
+        patient_group = PatientGroup.objects.create(
+            site=site,
+            status=COMPLETE,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            user_created="frisco",
+        )
+        for i in range(0, size):
+            subject_identifier = f"101-101-{index}{i:03d}-2"
+            patient = PatientLog.objects.create(
+                subject_identifier=subject_identifier,
+                screening_identifier=f"XYZ{index}{i:04d}",
+                stable=YES,
+                willing_to_screen=YES,
+                site=site,
+            )
+            patient.conditions.add(Conditions.objects.get(name=DM if i < 10 else HIV))
+            SubjectConsent.objects.create(subject_identifier=subject_identifier, site=site)
+            RegisteredSubject.objects.create(subject_identifier=subject_identifier, site=site)
+            patient_group.patients.add(patient)
+        return patient_group
+
+    def break_randomizations(self):
+        for index in [1, 2]:
+            self.create_group(index)
+        self.create_group(3, size=13)
+        list(BulkRandomizer(site_ids=[101]).run())
+        PatientLog.objects.filter(subject_identifier="101-101-1000-2").update(
+            group_identifier=None
+        )
+        SubjectConsent.objects.filter(
+            subject_identifier__in=["101-101-1001-2", "101-101-2001-2"]
+        ).update(group_identifier="")
+        RegisteredSubject.objects.filter(subject_identifier="101-101-2002-2").update(
+            registration_status=None, sid=None, randomization_datetime=None
+        )
+        RegisteredSubject.objects.filter(subject_identifier="101-101-2004-2").update(
+            randomization_datetime=None
+        )
+        RegisteredSubject.objects.filter(subject_identifier="101-101-2005-2").update(site=None)
+        SubjectRandomization.objects.filter(subject_identifier="101-101-1003-2").delete()
+        SubjectRandomization.objects.filter(subject_identifier="101-101-2003-2").update(sid=0)
+
+    def test_inconsistencies(self, mock_schedule):
+        self.break_randomizations()
+        patient_group = PatientGroup.objects.get(patients__subject_identifier="101-101-2000-2")
+        rando_obj = RandomizationList.objects.get(
+            group_identifier=patient_group.group_identifier
+        )
+        RegisteredGroup.objects.filter(group_identifier=rando_obj.group_identifier).update(
+            registration_status=None
+        )
+        with self.assertNumQueries(7):
+            inconsistencies = RandomizationReconciler().inconsistencies()
+        self.assertEqual(
+            inconsistencies["unregistered allocation"], [rando_obj.group_identifier]
+        )
+        self.assertEqual(inconsistencies["unallocated group"], [])
+        self.assertEqual(inconsistencies["patient log"], ["101-101-1000-2"])
+        self.assertEqual(inconsistencies["registered subject"], [])
+        self.assertEqual(inconsistencies["subject randomization"], ["101-101-1003-2"])
+
+    def test_repair(self, mock_schedule):
+        self.break_randomizations()
+        reconciler = RandomizationReconciler()
+        inconsistencies = reconciler.inconsistencies()
+        self.assertEqual(inconsistencies["patient log"], ["101-101-1000-2"])
+        self.assertEqual(
+            sorted(inconsistencies["tests.subjectconsent"]),
+            ["101-101-1001-2", "101-101-2001-2"],
+        )
+        self.assertEqual(
+            inconsistencies["registered subject"],
+            ["101-101-2002-2", "101-101-2004-2", "101-101-2005-2"],
+        )
+        self.assertEqual(
+            inconsistencies["subject randomization"], ["101-101-1003-2", "101-101-2003-2"]
+        )
+        self.assertEqual(
+            reconciler.repair(user_modified="frisco"),
+            {
+                "patient log": 1,
+                "tests.subjectconsent": 2,
+                "registered subject": 3,
+                "subject randomization": 2,
+            },
+        )
+        self.assertFalse(any(reconciler.inconsistencies().values()))
+        patient_group = PatientGroup.objects.get(patients__subject_identifier="101-101-2002-2")
+        rando_obj = RandomizationList.objects.get(
+            group_identifier=patient_group.group_identifier
+        )
+        rs_obj = RegisteredSubject.objects.get(subject_identifier="101-101-2002-2")
+        self.assertGreater(rs_obj.modified, rs_obj.created)
+        self.assertEqual(rs_obj.history.latest("history_date").sid, str(rando_obj.sid))
+        self.assertEqual(rs_obj.registration_status, RANDOMIZED)
+        self.assertEqual(rs_obj.sid, str(rando_obj.sid))
+        self.assertEqual(rs_obj.randomization_datetime, rando_obj.allocated_datetime)
+        self.assertEqual(rs_obj.randomization_list_model, rando_obj._meta.label_lower)
+        self.assertEqual(rs_obj.site_id, 101)
+        self.assertEqual(rs_obj.user_modified, "frisco")
+        self.assertEqual(
+            RegisteredSubject.objects.get(subject_identifier="101-101-2005-2").site_id, 101
+        )
+        self.assertEqual(
+            PatientLog.objects.get(subject_identifier="101-101-1000-2").user_modified, "frisco"
+        )
+        sr_obj = SubjectRandomization.objects.get(subject_identifier="101-101-2003-2")
+        self.assertEqual(sr_obj.sid, rando_obj.sid)
+        self.assertEqual(sr_obj.assignment, rando_obj.assignment)
+        self.assertEqual(
+            SubjectRandomization.objects.get(subject_identifier="101-101-1003-2").assignment,
+            RandomizationList.objects.get(
+                group_identifier=PatientLog.objects.get(
+                    subject_identifier="101-101-1003-2"
+                ).group_identifier
+            ).assignment,
+        )
+        self.assertEqual(
+            PatientLog.objects.get(subject_identifier="101-101-1000-2").group_identifier,
+            PatientGroup.objects.get(
+                patients__subject_identifier="101-101-1000-2"
+            ).group_identifier,
+        )
+        self.assertIsNone(
+            PatientLog.objects.get(subject_identifier="101-101-3000-2").group_identifier
+        )
+
+    @patch(
+        "intecomm_rando.management.commands.reconcile_randomization.RandomizationReconciler",
+        RandomizationReconciler,
+    )
+    def test_command(self, mock_schedule):
+        self.break_randomizations()
+        out = StringIO()
+        call_command("reconcile_randomization", stdout=out)
+        self.assertIn("patient log: 1 (101-101-1000-2)", out.getvalue())
+        self.assertIn("Use --repair", out.getvalue())
+        out = StringIO()
+        call_command("reconcile_randomization", repair=True, stdout=out)
+        self.assertIn("Repaired 2 tests.subjectconsent(s).", out.getvalue())
+        self.assertEqual(
+            PatientLog.objects.get(subject_identifier="101-101-1000-2").user_modified,
+            "reconcile_randomization",
+        )
+        out = StringIO()
+        call_command("reconcile_randomization", stdout=out)
+        self.assertNotIn("Use --repair", out.getvalue())
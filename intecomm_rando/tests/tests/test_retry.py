@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from django.db import DatabaseError, IntegrityError, OperationalError
+from django.test import SimpleTestCase, override_settings
+
+from intecomm_rando.instrumentation import retry_counter
+from intecomm_rando.retry import get_backoff_seconds, get_transient_error_reason
+
+
+class DriverError(Exception):
+    def __init__(self, *args, sqlstate: str | None = None):
+        super().__init__(*args)
+        self.sqlstate = sqlstate
+
+
+def database_error(error_cls, *args, sqlstate: str | None = None):
+    try:
+        raise error_cls(*args) from DriverError(*args, sqlstate=sqlstate)
+    except DatabaseError as e:
+        return e
+
+
+class RetryTests(SimpleTestCase):
+    def test_transient_error_reason(self):
+        for e, reason in [
+            (database_error(OperationalError, "x", sqlstate="40001"), "serialization_failure"),
+            (database_error(OperationalError, "x", sqlstate="40P01"), "deadlock"),
+            (database_error(OperationalError, 1213, "Deadlock found"), "deadlock"),
+            (database_error(OperationalError, 1205, "Lock wait timeout"), "lock_timeout"),
+            (database_error(OperationalError, "database is locked"), "database_locked"),
+            (
+                database_error(
+                    IntegrityError,
+                    "UNIQUE constraint failed: intecomm_rando_randomizationlist.sid",
+                ),
+                "integrity_error",
+            ),
+            (
+                database_error(
+                    IntegrityError,
+                    "duplicate key value violates unique constraint "
+                    '"intecomm_rando_registeredgroup_sid_key"',
+                    sqlstate="23505",
+                ),
+                "integrity_error",
+            ),
+            (
+                database_error(
+                    IntegrityError,
+                    "duplicate key value violates unique constraint "
+                    '"intecomm_rando_randomizationlist_group_identifier_key"',
+                    sqlstate="23505",
+                ),
+                "integrity_error",
+            ),
+            (
+                database_error(
+                    IntegrityError,
+                    "Duplicate entry '1' for key "
+                    "'intecomm_rando_registeredgroup.group_identifier'",
+                ),
+                "integrity_error",
+            ),
+            (
+                database_error(
+                    IntegrityError,
+                    "duplicate key value violates unique constraint "
+                    '"intecomm_rando_registeredgroup_group_identifier_as_pk_key"',
+                    sqlstate="23505",
+                ),
+                None,
+            ),
+            (
+                database_error(
+                    IntegrityError,
+                    'duplicate key value violates unique constraint "x_name_key"',
+                    sqlstate="23505",
+                ),
+                None,
+            ),
+            (
+                database_error(
+                    IntegrityError,
+                    'null value in column "subject_identifier" violates not-null constraint',
+                    sqlstate="23502",
+                ),
+                None,
+            ),
+            (database_error(IntegrityError, "NOT NULL constraint failed: x.site_id"), None),
+            (database_error(OperationalError, "x", sqlstate="42P01"), None),
+            (database_error(OperationalError, "no such table: x"), None),
+        ]:
+            with self.subTest(e=e):
+                self.assertEqual(get_transient_error_reason(e), reason)
+
+    def test_subject_identifier_unique_violation_not_transient(self):
+        for e in [
+            database_error(
+                IntegrityError,
+                "UNIQUE constraint failed: intecomm_rando_subjectrandomization"
+                ".subject_identifier",
+            ),
+            database_error(
+                IntegrityError,
+                "duplicate key value violates unique constraint "
+                '"tests_patientlog_subject_identifier_key"',
+                sqlstate="23505",
+            ),
+        ]:
+            with self.subTest(e=e):
+                self.assertIsNone(get_transient_error_reason(e))
+
+    def test_transient_error_reason_in_savepoint(self):
+        for e, reason in [
+            (database_error(OperationalError, "x", sqlstate="40001"), None),
+            (database_error(OperationalError, "x", sqlstate="40P01"), "deadlock"),
+            (database_error(OperationalError, 1213, "Deadlock found"), None),
+            (database_error(OperationalError, 1205, "Lock wait timeout"), "lock_timeout"),
+            (database_error(OperationalError, "database is locked"), "database_locked"),
+        ]:
+            with self.subTest(e=e):
+                self.assertEqual(get_transient_error_reason(e, in_savepoint=True), reason)
+
+    @override_settings(INTECOMM_RANDO_RANDOMIZE_RETRY_BACKOFF=0.5)
+    def test_backoff_seconds(self):
+        for attempt in range(1, 4):
+            self.assertLessEqual(get_backoff_seconds(attempt), 0.5 * 2 ** (attempt - 1))
+
+    def test_retry_counter_render(self):
+        retry_counter.clear()
+        retry_counter.increment("deadlock")
+        retry_counter.increment("deadlock")
+        self.assertIn(
+            'intecomm_rando_randomize_retries_total{reason="deadlock"} 2',
+            retry_counter.render(),
+        )
+        retry_counter.clear()
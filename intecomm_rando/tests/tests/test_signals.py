@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from django.contrib.sites.models import Site
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import m2m_changed, post_save
+from django.test import TestCase, override_settings
+from edc_constants.constants import COMPLETE, YES
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+
+from intecomm_rando.models import (
+    RandomizationList,
+    invalidate_assignment_cache_on_post_save,
+    randomize_patient_group_on_post_save,
+    update_group_summary_on_m2m_changed,
+    update_group_summary_on_post_save,
+)
+from intecomm_rando.models.signals import (
+    connect_randomize_patient_group_on_post_save,
+    get_patient_group_rando_models,
+)
+
+from ..models import Conditions, PatientGroup, PatientGroupRando, PatientLog
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+class SignalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+
+    def test_randomize_receiver_connected_to_patientgrouprando_only(self):
+        self.assertEqual(get_patient_group_rando_models(), [PatientGroupRando])
+        for model, connected in [
+            (PatientGroupRando, True),
+            (PatientGroup, False),
+            (PatientLog, False),
+        ]:
+            with self.subTest(model=model):
+                sync_receivers, _ = post_save._live_receivers(model)
+                self.assertEqual(
+                    randomize_patient_group_on_post_save in sync_receivers, connected
+                )
+
+    @patch("intecomm_rando.models.signals.get_patient_group_rando_models", return_value=[])
+    def test_randomize_receiver_requires_patientgrouprando(self, mock_models):
+        with self.assertRaises(ImproperlyConfigured):
+            connect_randomize_patient_group_on_post_save()
+
+    def test_invalidate_receiver_connected_to_randomizationlist_only(self):
+        for model, connected in [
+            (RandomizationList, True),
+            (PatientLog, False),
+            (Site, False),
+        ]:
+            with self.subTest(model=model):
+                sync_receivers, _ = post_save._live_receivers(model)
+                self.assertEqual(
+                    invalidate_assignment_cache_on_post_save in sync_receivers, connected
+                )
+
+    def test_group_summary_receivers_connected_to_patients_and_conditions_only(self):
+        for signal, receiver, model, connected in [
+            (
+                m2m_changed,
+                update_group_summary_on_m2m_changed,
+                PatientGroup.patients.through,
+                True,
+            ),
+            (
+                m2m_changed,
+                update_group_summary_on_m2m_changed,
+                PatientLog.conditions.through,
+                True,
+            ),
+            (m2m_changed, update_group_summary_on_m2m_changed, Conditions, False),
+            (post_save, update_group_summary_on_post_save, PatientLog, True),
+            (post_save, update_group_summary_on_post_save, PatientGroup, False),
+            (post_save, update_group_summary_on_post_save, RandomizationList, False),
+        ]:
+            with self.subTest(signal=signal, model=model):
+                sync_receivers, _ = signal._live_receivers(model)
+                self.assertEqual(receiver in sync_receivers, connected)
+
+    @patch("intecomm_rando.randomize_group.randomize_and_schedule_group")
+    def test_randomize_on_post_save(self, mock_randomize):
+        opts = dict(
+            site=Site.objects.get(id=101),
+            status=COMPLETE,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+        )
+        PatientGroup.objects.create(**opts)
+        mock_randomize.assert_not_called()
+        patient_group = PatientGroupRando.objects.create(**opts)
+        mock_randomize.assert_called_once_with(patient_group)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.sites.models import Site
+from django.test import TestCase, override_settings
+from edc_constants.constants import COMPLETE, DM, HIV, YES
+from edc_randomization.site_randomizers import site_randomizers
+from edc_registration.models import RegisteredSubject
+from edc_sites.single_site import SingleSite
+from edc_sites.site import sites
+from edc_sites.utils import add_or_update_django_sites
+
+from intecomm_rando.bulk_randomize import BulkRandomizer as BaseBulkRandomizer
+from intecomm_rando.models import RandomizationList, SubjectRandomization
+from intecomm_rando.randomize_group import RandomizeGroup as BaseRandomizeGroup
+from intecomm_rando.randomizers import Randomizer as BaseRandomizer
+from intecomm_rando.utils import get_assignment_for_subject
+
+from ..models import Conditions, PatientGroup, PatientLog, SubjectConsent
+
+
+class RandomizeGroup(BaseRandomizeGroup):
+    patient_log_model = "tests.patientlog"
+
+    def subject_consent_model_cls(self, site: Site):
+        return SubjectConsent
+
+
+class BulkRandomizer(BaseBulkRandomizer):
+    patient_group_model = "tests.patientgroup"
+    randomize_group_cls = RandomizeGroup
+
+
+@override_settings(SITE_ID=101, EDC_SITES_AUTODISCOVER_SITES=False)
+@patch("intecomm_rando.randomize_group.put_newly_randomized_group_on_schedule")
+class SubjectRandomizationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        class Randomizer(BaseRandomizer):
+            randomizationlist_folder = Path(__file__).resolve().parent.parent / "etc"
+
+        sites.initialize(initialize_site_model=True)
+        sites.register(
+            SingleSite(
+                101,
+                "kasangati",
+                country_code="ug",
+                country="uganda",
+                language_codes=["en"],
+                domain="kasangati.ug.example.com",
+            )
+        )
+        add_or_update_django_sites(verbose=False)
+        site_randomizers._registry = {}
+        site_randomizers.loaded = False
+        site_randomizers.register(Randomizer)
+        for name in [DM, HIV]:
+            Conditions.objects.create(name=name)
+
+    def create_group(self, index: int, size: int = 14) -> PatientGroup:
+        site = Site.objects.get(id=101)
+        patient_group = PatientGroup.objects.create(
+            site=site,
+            status=COMPLETE,
+            randomize_now=YES,
+            confirm_randomize_now="RANDOMIZE",
+            user_created="frisco",
+        )
+        for i in range(0, size):
+            subject_identifier = f"101-101-{index}{i:03d}-2"
+            patient = PatientLog.objects.create(
+                subject_identifier=subject_identifier,
+                screening_identifier=f"XYZ{index}{i:04d}",
+                stable=YES,
+                willing_to_screen=YES,
+                site=site,
+            )
+            patient.conditions.add(Conditions.objects.get(name=DM if i < 10 else HIV))
+            SubjectConsent.objects.create(subject_identifier=subject_identifier, site=site)
+            RegisteredSubject.objects.create(subject_identifier=subject_identifier, site=site)
+            patient_group.patients.add(patient)
+        return patient_group
+
+    def test_populated_when_randomized(self, mock_schedule):
+        for index in [1, 2]:
+            self.create_group(index)
+        list(BulkRandomizer(site_ids=[101]).run())
+        self.assertEqual(SubjectRandomization.objects.count(), 28)
+        for rando_obj in RandomizationList.objects.filter(allocated=True):
+            for obj in SubjectRandomization.objects.filter(
+                group_identifier=rando_obj.group_identifier
+            ):
+                self.assertEqual(obj.sid, rando_obj.sid)
+                self.assertEqual(obj.assignment, rando_obj.assignment)
+                self.assertEqual(obj.allocated_datetime, rando_obj.allocated_datetime)
+                self.assertEqual(obj.site_id, 101)
+                self.assertEqual(
+                    PatientLog.objects.get(
+                        subject_identifier=obj.subject_identifier
+                    ).group_identifier,
+                    rando_obj.group_identifier,
+                )
+
+    def test_get_assignment_for_subject(self, mock_schedule):
+        self.create_group(1)
+        list(BulkRandomizer(site_ids=[101]).run())
+        rando_obj = RandomizationList.objects.get(allocated=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                get_assignment_for_subject(
+                    "101-101-1000-2", patient_log_model="tests.patientlog"
+                ),
+                rando_obj.assignment,
+            )
+        SubjectRandomization.objects.all().delete()
+        self.assertEqual(
+            get_assignment_for_subject("101-101-1000-2", patient_log_model="tests.patientlog"),
+            rando_obj.assignment,
+        )
+
+    def test_backfill(self, mock_schedule):
+        for index in [1, 2]:
+            self.create_group(index)
+        self.create_group(3, size=13)
+        list(BulkRandomizer(site_ids=[101]).run())
+        SubjectRandomization.objects.filter(subject_identifier="101-101-1000-2").delete()
+        SubjectRandomization.objects.filter(subject_identifier="101-101-2000-2").update(sid=0)
+        self.assertEqual(
+            SubjectRandomization.objects.backfill(
+                patient_log_model="tests.patientlog", batch_size=10
+            ),
+            28,
+        )
+        self.assertEqual(SubjectRandomization.objects.count(), 28)
+        self.assertFalse(SubjectRandomization.objects.filter(sid=0).exists())
+        self.assertFalse(
+            SubjectRandomization.objects.filter(subject_identifier="101-101-3000-2").exists()
+        )
@@ -0,0 +1,36 @@
+from dateutil.relativedelta import relativedelta
+from edc_visit_schedule.schedule import Schedule
+from edc_visit_schedule.visit import Visit
+from edc_visit_schedule.visit_schedule import VisitSchedule
+
+from .consents import consent_v1
+
+visit_schedule = VisitSchedule(
+    name="visit_schedule",
+    offstudy_model="edc_offstudy.subjectoffstudy",
+    death_report_model="edc_adverse_event.deathreport",
+    locator_model="edc_locator.subjectlocator",
+)
+
+schedule = Schedule(
+    name="schedule",
+    onschedule_model="edc_visit_schedule.onschedule",
+    offschedule_model="edc_visit_schedule.offschedule",
+    appointment_model="edc_appointment.appointment",
+    consent_definitions=[consent_v1],
+)
+
+for index, code in enumerate(["1000", "1010", "1020", "1030"]):
+    schedule.add_visit(
+        Visit(
+            code=code,
+            title=f"Visit {code}",
+            timepoint=index,
+            rbase=relativedelta(months=index),
+            rlower=relativedelta(days=0),
+            rupper=relativedelta(days=6),
+            facility_name="7-day-clinic",
+        )
+    )
+
+visit_schedule.add_schedule(schedule)
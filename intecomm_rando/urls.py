@@ -1,6 +1,9 @@
-from django.contrib import admin
 from django.urls import path
 
+from .views import metrics_view
+
+app_name = "intecomm_rando"
+
 urlpatterns = [
-    path("admin/", admin.site.urls),
+    path("metrics/", metrics_view, name="metrics"),
 ]
@@ -1,43 +1,186 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import TYPE_CHECKING
+from socket import gethostname
+from typing import TYPE_CHECKING, Iterable, Iterator
 
 from django.apps import apps as django_apps
+from django.db.models import OuterRef, QuerySet, Subquery
+from django.db.models.signals import post_save
 from edc_appointment.constants import NEW_APPT
 from edc_appointment.models import Appointment, AppointmentType
 from edc_constants.constants import CLINIC, COMMUNITY
-from edc_randomization.utils import get_object_for_subject
+from edc_randomization.site_randomizers import site_randomizers
+from edc_utils import get_utcnow
 from edc_visit_schedule.site_visit_schedules import site_visit_schedules
 
 from intecomm_rando.constants import COMMUNITY_ARM, FACILITY_ARM
 
+from .assignment_cache import assignment_cache
+from .group_schedule import GroupSchedule
+
 if TYPE_CHECKING:
     from intecomm_screening.models import PatientLog
 
+    from .models import RandomizationList
+
 
-def get_assignment_for_subject(subject_identifier: str):
+def get_assignment_for_subject(subject_identifier: str, patient_log_model: str | None = None):
     """Replaces default get_assignment_for_subject.
 
     Note: INTECOMM randomizes by group, not subject
+
+    Uses the assignment cache, if enabled, then SubjectRandomization.
+    Falls back to PatientLog -> RandomizationList for subjects not
+    yet backfilled.
     """
-    patient_log_model_cls = django_apps.get_model("intecomm_screening.patientlog")
+    if cached := assignment_cache.get_subject(subject_identifier):
+        return cached[1]
+    if obj := (
+        django_apps.get_model("intecomm_rando.subjectrandomization")
+        .objects.filter(subject_identifier=subject_identifier)
+        .values_list("group_identifier", "assignment")
+        .first()
+    ):
+        assignment_cache.set_subject(subject_identifier, *obj)
+        return obj[1]
+    patient_log_model_cls = django_apps.get_model(
+        patient_log_model or "intecomm_screening.patientlog"
+    )
     patient_log = patient_log_model_cls.objects.get(subject_identifier=subject_identifier)
+    assignment = get_assignment_for_group(patient_log.group_identifier)
+    assignment_cache.set_subject(subject_identifier, patient_log.group_identifier, assignment)
+    return assignment
+
+
+def get_assignment_for_group(group_identifier: str):
+    """Returns the assignment for a randomized group.
+
+    Uses the assignment cache, if enabled.
+    """
+    if assignment := assignment_cache.get_group(group_identifier):
+        return assignment
+    # imported on use, edc_randomization.utils imports pandas
+    from edc_randomization.utils import get_object_for_subject
+
     rando_obj = get_object_for_subject(
-        patient_log.group_identifier, "default", identifier_fld="group_identifier"
+        group_identifier, "default", identifier_fld="group_identifier"
     )
+    assignment_cache.set_group(group_identifier, rando_obj.assignment)
     return rando_obj.assignment
 
 
+def get_assignments_for_subjects(
+    subject_identifiers: Iterable[str],
+    randomizer_name: str | None = None,
+    patient_log_model: str | None = None,
+    chunk_size: int | None = None,
+) -> dict[str, str]:
+    """Returns a dict of {subject_identifier: assignment} for
+    many subjects.
+
+    Bulk version of `get_assignment_for_subject`. Subjects in a
+    group that is not yet randomized are not included.
+    """
+    return dict(
+        iter_assignments_for_subjects(
+            subject_identifiers,
+            randomizer_name=randomizer_name,
+            patient_log_model=patient_log_model,
+            chunk_size=chunk_size,
+        )
+    )
+
+
+def iter_assignments_for_subjects(
+    subject_identifiers: Iterable[str],
+    randomizer_name: str | None = None,
+    patient_log_model: str | None = None,
+    chunk_size: int | None = None,
+) -> Iterator[tuple[str, str]]:
+    """Yields (subject_identifier, assignment) for many subjects.
+
+    The PatientLog is joined to the RandomizationList on
+    group_identifier, one query per `chunk_size` subjects.
+    """
+    randomizer_name = randomizer_name or "default"
+    chunk_size = chunk_size or 500
+    patient_log_model_cls = django_apps.get_model(
+        patient_log_model or "intecomm_screening.patientlog"
+    )
+    rando_model_cls = site_randomizers.get(randomizer_name).model_cls()
+    assignment = Subquery(
+        rando_model_cls.objects.filter(
+            group_identifier=OuterRef("group_identifier"),
+            randomizer_name=randomizer_name,
+            allocated=True,
+            allocated_datetime__isnull=False,
+        ).values("assignment")[:1]
+    )
+    subject_identifiers = iter(subject_identifiers)
+    while chunk := [s for _, s in zip(range(chunk_size), subject_identifiers)]:
+        yield from (
+            patient_log_model_cls.objects.filter(
+                subject_identifier__in=chunk, group_identifier__isnull=False
+            )
+            .annotate(assignment=assignment)
+            .filter(assignment__isnull=False)
+            .values_list("subject_identifier", "assignment")
+            .iterator()
+        )
+
+
+def update_with_history(queryset: QuerySet, user_modified: str | None = None, **values) -> int:
+    """Updates the rows of `queryset` with `values` and the audit
+    fields and returns the number of rows updated.
+
+    If the model has HistoricalRecords, one historical record per
+    row is created in bulk. post_save is then sent for each row,
+    with `update_fields`, as `save(update_fields=...)` would. The
+    per-row history receiver is skipped. `queryset` must still
+    select the updated rows after the update.
+    """
+    values.update(modified=get_utcnow(), hostname_modified=gethostname()[:50])
+    if user_modified:
+        values.update(user_modified=user_modified)
+    updated = queryset.update(**values)
+    objs = list(queryset.all())
+    manager_name = getattr(queryset.model._meta, "simple_history_manager_attribute", None)
+    if manager_name:
+        getattr(queryset.model, manager_name).bulk_history_create(objs, update=True)
+    for obj in objs:
+        obj.skip_history_when_saving = True
+        post_save.send(
+            sender=queryset.model,
+            instance=obj,
+            created=False,
+            update_fields=frozenset(values),
+            raw=False,
+            using=queryset.db,
+        )
+        del obj.skip_history_when_saving
+    return updated
+
+
 def get_assignment_as_appt_type(assignment: str):
     return COMMUNITY if assignment == COMMUNITY_ARM else CLINIC
 
 
+def get_onschedule_model_for_assignment(assignment: str) -> str:
+    return (
+        "intecomm_prn.onschedulecomm"
+        if assignment == COMMUNITY_ARM
+        else "intecomm_prn.onscheduleinte"
+    )
+
+
 def update_appt_type_on_new_appointments(
-    subject_identifier: str, visit_schedule_name: str, schedule_name: str
+    subject_identifier: str,
+    visit_schedule_name: str,
+    schedule_name: str,
+    assignment: str | None = None,
 ):
     """Update appt_type to match rando"""
-    assignment = get_assignment_for_subject(subject_identifier)
+    assignment = assignment or get_assignment_for_subject(subject_identifier)
     Appointment.objects.filter(
         subject_identifier=subject_identifier,
         appt_status=NEW_APPT,
@@ -49,26 +192,81 @@ def update_appt_type_on_new_appointments(
     )
 
 
+def update_appt_type_on_new_group_appointments(
+    subject_identifiers: list[str],
+    visit_schedule_name: str,
+    schedule_name: str,
+    assignment: str,
+) -> int:
+    """Update appt_type to match rando for all patients in a group.
+
+    Group variant of `update_appt_type_on_new_appointments`.
+    """
+    return Appointment.objects.filter(
+        subject_identifier__in=subject_identifiers,
+        appt_status=NEW_APPT,
+        visit_schedule_name=visit_schedule_name,
+        schedule_name=schedule_name,
+        appt_type__isnull=True,
+    ).update(appt_type=get_appt_type_for_assignment(assignment))
+
+
+def get_appt_type_for_assignment(assignment: str) -> AppointmentType:
+    """Returns the AppointmentType instance for an assignment.
+
+    Not cached; called once per group, see
+    `update_appt_type_on_new_group_appointments`.
+    """
+    return AppointmentType.objects.get(name=get_assignment_as_appt_type(assignment))
+
+
 def update_patient_in_newly_randomized_group(
     patient: PatientLog,
-    assignment: str,
-    randomization_datetime: datetime,
+    randomization_list_obj: RandomizationList,
     skip_get_current_site: bool | None = None,
 ):
+    """Puts a patient on schedule for the assignment of the group's
+    allocated RandomizationList instance.
+    """
+    assignment = randomization_list_obj.assignment
     if assignment in [COMMUNITY_ARM, FACILITY_ARM]:
-        model_name = (
-            "intecomm_prn.onschedulecomm"
-            if assignment == COMMUNITY_ARM
-            else "intecomm_prn.onscheduleinte"
-        )
+        model_name = get_onschedule_model_for_assignment(assignment)
         visit_schedule, schedule = site_visit_schedules.get_by_onschedule_model(model_name)
         schedule.put_on_schedule(
             subject_identifier=patient.subject_identifier,
-            onschedule_datetime=randomization_datetime,
+            onschedule_datetime=randomization_list_obj.allocated_datetime,
             skip_get_current_site=skip_get_current_site,
         )
         update_appt_type_on_new_appointments(
             subject_identifier=patient.subject_identifier,
             visit_schedule_name=visit_schedule.name,
             schedule_name=schedule.name,
+            assignment=assignment,
+        )
+
+
+def put_newly_randomized_group_on_schedule(
+    subject_identifiers: list[str],
+    randomization_list_obj: RandomizationList,
+    skip_get_current_site: bool | None = None,
+):
+    """Puts all patients in a newly randomized group on schedule
+    for the group's assignment.
+
+    See also `update_patient_in_newly_randomized_group`.
+    """
+    assignment = randomization_list_obj.assignment
+    if assignment in [COMMUNITY_ARM, FACILITY_ARM]:
+        group_schedule = GroupSchedule(
+            subject_identifiers=subject_identifiers,
+            onschedule_model=get_onschedule_model_for_assignment(assignment),
+            onschedule_datetime=randomization_list_obj.allocated_datetime,
+            skip_get_current_site=skip_get_current_site,
+        )
+        group_schedule.put_on_schedule()
+        update_appt_type_on_new_group_appointments(
+            subject_identifiers=subject_identifiers,
+            visit_schedule_name=group_schedule.visit_schedule.name,
+            schedule_name=group_schedule.schedule.name,
+            assignment=assignment,
         )
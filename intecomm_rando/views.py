@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from .instrumentation import retry_counter, stage_histogram
+
+
+def get_metrics_token() -> str | None:
+    """Returns the bearer token a scraper, e.g. Prometheus, sends
+    in the Authorization header to read the metrics view without
+    a staff session.
+
+    Opt-in. Default is None (staff session only).
+    """
+    return getattr(settings, "INTECOMM_RANDO_METRICS_TOKEN", None)
+
+
+def metrics_view(request):
+    """Returns this process's randomization stage timings and
+    retry counts in the Prometheus text format.
+
+    Readable by a logged in staff member or, if
+    INTECOMM_RANDO_METRICS_TOKEN is set, by a request with header
+    `Authorization: Bearer <token>`.
+
+    Stage timings are only collected if
+    INTECOMM_RANDO_INSTRUMENTATION is set. Counts are per process.
+    """
+    token = get_metrics_token()
+    if token and constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return render_metrics(request)
+    return staff_member_required(render_metrics)(request)
+
+
+def render_metrics(request):
+    return HttpResponse(
+        stage_histogram.render() + retry_counter.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
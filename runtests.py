@@ -1,5 +1,12 @@
 #!/usr/bin/env python
+import sys
+
 from edc_test_settings.func_main import func_main2
 
 if __name__ == "__main__":
-    func_main2("intecomm_rando.tests.test_settings", "intecomm_rando.tests")
+    if "--benchmark" in sys.argv:
+        from intecomm_rando.tests.benchmarks.utils import run_benchmarks
+
+        run_benchmarks("intecomm_rando.tests.test_settings", "intecomm_rando.tests.benchmarks")
+    else:
+        func_main2("intecomm_rando.tests.test_settings", "intecomm_rando.tests")